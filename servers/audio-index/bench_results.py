@@ -0,0 +1,93 @@
+"""Measure the per-query cost of formatting query results through pandas versus iterating the result set.
+
+Usage:
+    python bench_results.py --rows 10000 --top-n 5 --repeat 200
+
+Builds a scratch table shaped like the sentence view query_audio reads (without transcription or
+embedding), runs the same top_n select and formats the rows the way query_audio does: once through
+to_pandas().itertuples(), as query tools used to, and once by iterating the result set directly.
+The scratch table is dropped afterwards.
+"""
+import argparse
+import statistics
+import time
+
+import pixeltable as pxt
+
+DIRECTORY = 'bench_results'
+
+
+def format_pandas(results) -> str:
+    result_str = ""
+    for i, row in enumerate(results.to_pandas().itertuples(), 1):
+        result_str += f"{i}. Score: {row.sim:.4f}\n   Text: {row.text}\n   From audio: {row.audio_file}\n"
+        result_str += f"   Chunk: {row.start_time_sec:.3f}s - {row.end_time_sec:.3f}s, sentence {row.position}\n\n"
+    return result_str
+
+
+def format_rows(results) -> str:
+    result_str = ""
+    for i, row in enumerate(results, 1):
+        result_str += f"{i}. Score: {row['sim']:.4f}\n   Text: {row['text']}\n   From audio: {row['audio_file']}\n"
+        result_str += (f"   Chunk: {row['start_time_sec']:.3f}s - {row['end_time_sec']:.3f}s, "
+                       f"sentence {row['position']}\n\n")
+    return result_str
+
+
+def timed(fn, results, repeat: int) -> list[float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(results)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark query result formatting")
+    parser.add_argument("--rows", type=int, default=10000, help="Rows in the scratch table")
+    parser.add_argument("--top-n", type=int, default=5, help="Rows returned per query")
+    parser.add_argument("--repeat", type=int, default=200, help="Formatting runs per method")
+    args = parser.parse_args()
+
+    pxt.drop_dir(DIRECTORY, force=True, if_not_exists='ignore')
+    pxt.create_dir(DIRECTORY)
+    try:
+        # Audio references are not fetched, as in an index whose files live in object storage
+        sentences = pxt.create_table(
+            f'{DIRECTORY}.sentences',
+            {'audio_file': pxt.Audio, 'start_time_sec': pxt.Float, 'end_time_sec': pxt.Float, 'pos': pxt.Int,
+             'text': pxt.String, 'score': pxt.Float},
+            media_validation='on_read'
+        )
+        sentences.insert([
+            {'audio_file': f'https://example.com/audio/{i // 100}.mp3', 'start_time_sec': (i % 100) * 28.0,
+             'end_time_sec': (i % 100) * 28.0 + 30.0, 'pos': i % 7,
+             'text': f"Sentence {i} of a transcript, long enough to look like speech.",
+             'score': (i * 7919 % 10007) / 10007}
+            for i in range(args.rows)
+        ])
+
+        # The same projection as query_audio, with a stored score standing in for similarity
+        query = (sentences.order_by(sentences.score, asc=False)
+                 .select(sentences.text, sim=sentences.score, audio_file=sentences.audio_file.fileurl,
+                         start_time_sec=sentences.start_time_sec, end_time_sec=sentences.end_time_sec,
+                         position=sentences.pos)
+                 .limit(args.top_n))
+        collect_ms = timed(lambda _: query.collect(), None, 20)
+        results = query.collect()
+        assert format_pandas(results) == format_rows(results)
+
+        print(f"{args.rows} rows, top {args.top_n}, {args.repeat} runs\n")
+        print(f"{'step':<28}{'median (ms)':>12}{'p95 (ms)':>12}")
+        for name, timings in (('collect (reference)', collect_ms),
+                              ('to_pandas().itertuples()', timed(format_pandas, results, args.repeat)),
+                              ('result set rows', timed(format_rows, results, args.repeat))):
+            p95 = sorted(timings)[int(len(timings) * 0.95) - 1]
+            print(f"{name:<28}{statistics.median(timings):>12.3f}{p95:>12.3f}")
+    finally:
+        pxt.drop_dir(DIRECTORY, force=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""Rebuilding embedding indexes without taking them offline.
+
+Rebuilding builds a shadow index on the same column under a new name, switches queries over to
+it and then drops the old one. Queries therefore always name the index they search (see
+active_index), since the column briefly carries two indexes. Rebuilding gives the vector index a
+fresh layout after many inserts and deletes. It does not recompute embeddings any faster than
+the initial build.
+
+Only one rebuild runs per column at a time, so a manual and a scheduled rebuild cannot drop each
+other's indexes. If the process dies between building the shadow index and dropping the old one,
+the column is left with two indexes and no pin. The first active_index call for the column after
+a restart keeps the newest index and drops the others. add_embedding_index commits the index only
+once it is built, so the newest one is complete.
+
+A scheduler can run maintenance periodically in a background thread.
+"""
+import logging
+import re
+import threading
+import time
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger('index_maintenance')
+
+# Index currently used by queries, for each (table path, column) rebuilt or recovered since the server started
+_active: dict[tuple[str, str], str] = {}
+# Columns already checked for indexes left behind by an interrupted rebuild
+_checked: set[tuple[str, str]] = set()
+_lock = threading.Lock()
+# Serializes rebuilds (and the recovery check) of each column
+_column_locks: dict[tuple[str, str], threading.Lock] = {}
+
+
+def index_names(table: Any, column: str) -> list[str]:
+    """Names of the embedding indexes on a column."""
+    indices = table.get_metadata().get('indices') or {}
+    return [name for name, info in indices.items()
+            if column in info.get('columns', [column]) and info.get('index_type', 'embedding') == 'embedding']
+
+
+def _column_lock(key: tuple[str, str]) -> threading.Lock:
+    with _lock:
+        return _column_locks.setdefault(key, threading.Lock())
+
+
+def _built_at(name: str) -> int:
+    """When a rebuilt index was built, from the timestamp in its name; 0 for the column's original index."""
+    match = re.search(r'_idx_(\d+)$', name)
+    return int(match.group(1)) if match else 0
+
+
+def _recover(table_path: str, column: str) -> None:
+    """Keep only the newest index of a column left with several by a rebuild that did not finish."""
+    key = (table_path, column)
+    with _column_lock(key):
+        with _lock:
+            if key in _checked:
+                return
+        try:
+            import pixeltable as pxt
+
+            table = pxt.get_table(table_path)
+            names = index_names(table, column)
+            if len(names) > 1:
+                newest = max(names, key=_built_at)
+                with _lock:
+                    _active[key] = newest
+                logger.warning(f"{table_path}.{column} has indexes {names} from an interrupted rebuild; "
+                               f"keeping '{newest}'")
+                for name in names:
+                    if name != newest:
+                        table.drop_embedding_index(idx_name=name)
+        except Exception as e:
+            # Queries keep working on the pinned index; the extra index is dropped by the next rebuild
+            logger.error(f"Checking the indexes of {table_path}.{column} failed: {e}")
+        with _lock:
+            _checked.add(key)
+
+
+def active_index(table_path: str, column: str) -> Optional[str]:
+    """The index queries on a column should use; None means the column's only index."""
+    key = (table_path, column)
+    with _lock:
+        checked = key in _checked or key in _active
+    if not checked:
+        _recover(table_path, column)
+    with _lock:
+        return _active.get(key)
+
+
+def rebuild_embedding_index(table_path: str, column: str, dims: int, **embed_kwargs: Any) -> dict:
+    """Build a shadow embedding index on table_path.column, switch queries to it and drop the old ones.
+
+    Args:
+        table_path: Path of the table or view holding the column.
+        column: The indexed column.
+        dims: Embedding dimensionality, for the size estimate.
+        embed_kwargs: Embedding functions, as passed to add_embedding_index (string_embed, image_embed).
+
+    Returns:
+        A report with 'index', 'replaced', 'rows', 'size_mb' (vector payload) and 'build_sec'.
+    """
+    # Imported here, so the scheduler can be imported without loading Pixeltable (see lazy_imports.py)
+    import pixeltable as pxt
+
+    key = (table_path, column)
+    with _column_lock(key):
+        table = pxt.get_table(table_path)
+        old_names = index_names(table, column)
+        with _lock:
+            # Whatever an interrupted rebuild left behind is replaced below
+            _checked.add(key)
+            current = _active.get(key)
+            if current is not None and current not in old_names:
+                old_names.append(current)
+            # Pin queries to the current index while the shadow index exists alongside it
+            if old_names and current is None:
+                _active[key] = max(old_names, key=_built_at)
+
+        # Nanoseconds, so back-to-back rebuilds never reuse a name; _built_at orders by it
+        new_name = f'{column}_idx_{time.time_ns()}'
+        start = time.perf_counter()
+        table.add_embedding_index(column=column, idx_name=new_name, **embed_kwargs)
+        build_sec = time.perf_counter() - start
+
+        with _lock:
+            _active[key] = new_name
+        for name in old_names:
+            table.drop_embedding_index(idx_name=name)
+
+    rows = table.count()
+    report = {
+        'index': new_name, 'replaced': old_names, 'rows': rows,
+        'size_mb': rows * dims * 4 / 2**20, 'build_sec': build_sec,
+    }
+    logger.info(f"Rebuilt embedding index on {table_path}.{column}: {report}")
+    return report
+
+
+def format_report(table_path: str, column: str, report: dict) -> str:
+    return (f"{table_path}.{column}: index '{report['index']}' built in {report['build_sec']:.1f}s over "
+            f"{report['rows']} rows (~{report['size_mb']:.1f} MB of vectors), "
+            f"replaced {', '.join(report['replaced']) or 'nothing'}")
+
+
+class MaintenanceScheduler:
+    """Runs a maintenance job every interval_hours in a daemon thread."""
+
+    def __init__(self):
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.interval_hours = 0.0
+        self.last_run: Optional[str] = None
+
+    def start(self, interval_hours: float, job: Callable[[], None]) -> None:
+        self.stop()
+        if interval_hours <= 0:
+            return
+        self.interval_hours = interval_hours
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, args=(job, self._stop), daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread = None
+        self.interval_hours = 0.0
+
+    def _loop(self, job: Callable[[], None], stop: threading.Event) -> None:
+        while not stop.wait(self.interval_hours * 3600):
+            try:
+                job()
+                self.last_run = time.strftime('%Y-%m-%dT%H:%M:%S')
+            except Exception as e:
+                logger.error(f"Scheduled index maintenance failed: {e}")
+
+    def describe(self) -> str:
+        if self._thread is None:
+            return "scheduled maintenance off"
+        return f"scheduled maintenance every {self.interval_hours:g}h, last run {self.last_run or 'never'}"
+
+
+scheduler = MaintenanceScheduler()
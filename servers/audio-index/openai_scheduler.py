@@ -0,0 +1,243 @@
+"""Rate-limited, adaptive-concurrency scheduler for OpenAI requests made from computed columns.
+
+Every OpenAI call made by this server goes through one shared RequestScheduler, which
+  - keeps requests and tokens within per-minute budgets (token buckets),
+  - adapts the number of in-flight requests: halved on every 429, grown by one after a run of successes,
+  - retries rate limits, timeouts and 5xx errors with exponential backoff (honoring Retry-After),
+  - remembers successful results by request key, so recomputing a partially failed batch only
+    re-sends the requests that failed.
+
+Budgets come from OPENAI_RPM, OPENAI_TPM and OPENAI_MAX_CONCURRENCY and can be changed at runtime
+with configure(). The OpenAI client honors OPENAI_BASE_URL, so everything here can be exercised
+against a local mock server (see mock_openai.py).
+"""
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Hashable, Optional
+
+DEFAULT_RPM = int(os.environ.get('OPENAI_RPM', '500'))
+DEFAULT_TPM = int(os.environ.get('OPENAI_TPM', '200000'))
+DEFAULT_MAX_CONCURRENCY = int(os.environ.get('OPENAI_MAX_CONCURRENCY', '8'))
+MAX_RETRIES = 6
+BASE_BACKOFF_SEC = 1.0
+MAX_BACKOFF_SEC = 60.0
+# Number of consecutive successes before the concurrency limit is raised by one
+SUCCESSES_PER_INCREASE = 10
+MAX_CACHED_RESULTS = 10000
+
+
+class _TokenBucket:
+    """Token bucket refilled continuously at capacity-per-minute."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.capacity / 60.0)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Return how long to wait until amount is available (0 if it is available now)."""
+        self._refill(now)
+        # Requests larger than the whole budget are let through once the bucket is full
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) * 60.0 / self.capacity
+
+    def take(self, amount: float) -> None:
+        self.tokens -= amount
+
+
+@dataclass
+class SchedulerStats:
+    requests: int = 0
+    retries: int = 0
+    rate_limited: int = 0
+    failures: int = 0
+    cache_hits: int = 0
+    tokens: int = 0
+
+
+def _retry_after(e: Exception) -> Optional[float]:
+    response = getattr(e, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_rate_limit(e: Exception) -> bool:
+    return getattr(e, 'status_code', None) == 429 or type(e).__name__ == 'RateLimitError'
+
+
+def _is_retryable(e: Exception) -> bool:
+    status = getattr(e, 'status_code', None)
+    return _is_rate_limit(e) or (status is not None and status >= 500) or type(e).__name__ in (
+        'APITimeoutError', 'APIConnectionError', 'InternalServerError'
+    )
+
+
+class RequestScheduler:
+    """Runs request callables within RPM/TPM budgets with adaptive concurrency and retries."""
+
+    def __init__(self, rpm: int = DEFAULT_RPM, tpm: int = DEFAULT_TPM,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY):
+        self._lock = threading.Condition()
+        self._results: OrderedDict[Hashable, Any] = OrderedDict()
+        self._in_flight = 0
+        self._successes = 0
+        self.stats = SchedulerStats()
+        self.configure(rpm, tpm, max_concurrency)
+
+    def configure(self, rpm: int, tpm: int, max_concurrency: int) -> None:
+        """Set new budgets; in-flight requests are not affected."""
+        if rpm < 1 or tpm < 1:
+            raise ValueError("Requests and tokens per minute must be at least 1")
+        with self._lock:
+            self._requests = _TokenBucket(rpm)
+            self._tokens = _TokenBucket(tpm)
+            self.max_concurrency = max(1, max_concurrency)
+            self.concurrency = self.max_concurrency
+            self._lock.notify_all()
+
+    def _acquire(self, tokens: int) -> None:
+        with self._lock:
+            while True:
+                now = time.monotonic()
+                if self._in_flight < self.concurrency:
+                    wait = max(self._requests.wait_time(1, now), self._tokens.wait_time(tokens, now))
+                    if wait == 0.0:
+                        self._requests.take(1)
+                        self._tokens.take(tokens)
+                        self._in_flight += 1
+                        return
+                else:
+                    wait = None
+                self._lock.wait(timeout=wait)
+
+    def _release(self, rate_limited: bool, token_correction: int = 0) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            # Charge or refund the difference between the estimate and actual usage
+            self._tokens.take(token_correction)
+            if rate_limited:
+                self.concurrency = max(1, self.concurrency // 2)
+                self._successes = 0
+            else:
+                self._successes += 1
+                if self._successes >= SUCCESSES_PER_INCREASE and self.concurrency < self.max_concurrency:
+                    self.concurrency += 1
+                    self._successes = 0
+            self._lock.notify_all()
+
+    def _cached(self, key: Hashable) -> tuple[bool, Any]:
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                self.stats.cache_hits += 1
+                return True, self._results[key]
+            return False, None
+
+    def _remember(self, key: Hashable, result: Any) -> None:
+        with self._lock:
+            self._results[key] = result
+            if len(self._results) > MAX_CACHED_RESULTS:
+                self._results.popitem(last=False)
+
+    def run(self, key: Hashable, request: Callable[[], Any], estimated_tokens: int = 0,
+            usage: Optional[Callable[[Any], int]] = None) -> Any:
+        """Run one request, waiting for budget and retrying transient failures.
+
+        Args:
+            key: Identifies the request; a successful result is reused for the same key (None to never reuse).
+            request: Performs the request and returns its result.
+            estimated_tokens: Tokens to reserve against the TPM budget before sending.
+            usage: Extracts the actual token usage from the result, to correct the estimate.
+        """
+        if key is not None:
+            hit, result = self._cached(key)
+            if hit:
+                return result
+        for attempt in range(MAX_RETRIES + 1):
+            self._acquire(estimated_tokens)
+            try:
+                result = request()
+            except Exception as e:
+                rate_limited = _is_rate_limit(e)
+                self._release(rate_limited)
+                with self._lock:
+                    self.stats.requests += 1
+                    self.stats.rate_limited += rate_limited
+                    if attempt == MAX_RETRIES or not _is_retryable(e):
+                        self.stats.failures += 1
+                        raise
+                    self.stats.retries += 1
+                delay = _retry_after(e) or min(BASE_BACKOFF_SEC * 2 ** attempt, MAX_BACKOFF_SEC)
+                time.sleep(delay * random.uniform(1.0, 1.5))
+                continue
+            used = usage(result) if usage is not None else estimated_tokens
+            self._release(False, used - estimated_tokens)
+            with self._lock:
+                self.stats.requests += 1
+                self.stats.tokens += used
+            if key is not None:
+                self._remember(key, result)
+            return result
+
+    def map(self, requests: list[tuple[Hashable, Callable[[], Any], int, Optional[Callable[[Any], int]]]]) -> list[Any]:
+        """Run a batch of (key, request, estimated_tokens, usage) concurrently.
+
+        Every request is attempted even if others fail, so that successful results are cached;
+        the first failure is then raised.
+        """
+        if len(requests) == 1:
+            return [self.run(*requests[0])]
+        outcomes: list[Any] = [None] * len(requests)
+        errors: list[Optional[Exception]] = [None] * len(requests)
+
+        def run_one(i: int) -> None:
+            try:
+                outcomes[i] = self.run(*requests[i])
+            except Exception as e:
+                errors[i] = e
+
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(requests))) as executor:
+            list(executor.map(run_one, range(len(requests))))
+        for error in errors:
+            if error is not None:
+                raise error
+        return outcomes
+
+    def describe(self) -> str:
+        with self._lock:
+            return (f"concurrency {self.concurrency}/{self.max_concurrency}, "
+                    f"{int(self._requests.capacity)} RPM, {int(self._tokens.capacity)} TPM; "
+                    f"{self.stats.requests} requests, {self.stats.retries} retries, "
+                    f"{self.stats.rate_limited} rate limited, {self.stats.failures} failed, "
+                    f"{self.stats.cache_hits} reused, {self.stats.tokens} tokens")
+
+
+# Shared by every OpenAI-backed computed column in this server
+scheduler = RequestScheduler()
+
+
+def openai_client() -> Any:
+    """The OpenAI client for the current OPENAI_API_KEY and OPENAI_BASE_URL, rebuilt when either changes."""
+    return _openai_client(os.environ.get('OPENAI_API_KEY'), os.environ.get('OPENAI_BASE_URL'))
+
+
+@lru_cache(maxsize=1)
+def _openai_client(api_key: Optional[str], base_url: Optional[str]) -> Any:
+    import openai
+    # Retries are handled by the scheduler
+    return openai.OpenAI(api_key=api_key, base_url=base_url, max_retries=0)
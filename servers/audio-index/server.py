@@ -1,4 +1,5 @@
 import argparse
+import contextlib
 import logging
 import uvicorn
 from mcp.server import Server
@@ -62,8 +63,15 @@ def create_starlette_app(mcp_server: Server, *, debug: bool = False) -> Starlett
         )
     ]
 
+    @contextlib.asynccontextmanager
+    async def lifespan(app: Starlette):
+        # Import Pixeltable and the modules built on it in the background as the server starts (see lazy_imports.py)
+        mcp.imports.warm_up()
+        yield
+
     return Starlette(
         debug=debug,
+        lifespan=lifespan,
         routes=[
             Route("/sse", endpoint=handle_sse),
             Mount("/messages/", app=sse.handle_post_message),
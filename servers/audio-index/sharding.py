@@ -0,0 +1,117 @@
+"""Sharded indexes: one index split across several shard indexes, in this store or on other servers.
+
+A sharded index 'podcasts' with N shards is made of the shard indexes podcasts_shard0 ..
+podcasts_shard{N-1}, which are ordinary indexes, and a coordinator table 'podcasts' whose comment
+holds the shard layout. Shards either all live in this server's Pixeltable store, or, given shard
+URLs, one per URL on other server processes or nodes with stores of their own. Remote shards are
+called over MCP/SSE with the same tools a client would use, in parallel. Local shards share one
+store and are called one after another, so they spread no load; only remote shards add capacity.
+
+Rows are routed to one shard by a stable hash of their key (file location or doc id), so a key
+always lands on the same shard and deletes, updates and lookups by key go to that shard only.
+Queries go to every shard and merge the shards' top-k rows with a heap.
+"""
+import asyncio
+import hashlib
+import heapq
+import json
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+def shard_name(table_name: str, shard: int) -> str:
+    return f'{table_name}_shard{shard}'
+
+
+@dataclass
+class ShardedIndex:
+    table_name: str
+    shards: int
+    urls: list[str] = field(default_factory=list)
+
+    @classmethod
+    def from_config(cls, table_name: str, config: dict) -> 'ShardedIndex':
+        return cls(table_name, config['shards'], config.get('shard_urls') or [])
+
+    def config(self) -> dict:
+        return {'sharding': 'hash', 'shards': self.shards, 'shard_urls': self.urls}
+
+    def route(self, key: str) -> int:
+        """The shard holding the rows with this key."""
+        return int(hashlib.sha1(key.encode('utf-8')).hexdigest(), 16) % self.shards
+
+    def describe(self) -> str:
+        where = f"on {', '.join(self.urls)}" if self.urls else "local"
+        return f"{self.shards} shards by hash, {where}"
+
+
+async def _call_remote(url: str, tool: str, arguments: dict) -> str:
+    from mcp import ClientSession
+    from mcp.client.sse import sse_client
+    async with sse_client(url) as (read_stream, write_stream):
+        async with ClientSession(read_stream, write_stream) as session:
+            await session.initialize()
+            result = await session.call_tool(tool, arguments)
+            return ''.join(content.text for content in result.content if content.type == 'text')
+
+
+class ShardClient:
+    """Calls the tools of shard indexes, locally or over MCP/SSE."""
+
+    def __init__(self, local_tools: dict[str, Callable[..., str]]):
+        # Local shards are served by the server's own tool functions, looked up by name
+        self._local_tools = local_tools
+
+    def _call(self, index: ShardedIndex, shard: int, tool: str, arguments: dict) -> str:
+        arguments = {**arguments, 'table_name': shard_name(index.table_name, shard)}
+        try:
+            if not index.urls:
+                return self._local_tools[tool](**arguments)
+            # Runs in a worker thread (see gather), so it does not nest in the server's event loop
+            return asyncio.run(_call_remote(index.urls[shard], tool, arguments))
+        except Exception as e:
+            return f"Error calling {tool} on shard {shard}: {str(e)}"
+
+    def gather(self, index: ShardedIndex, tool: str, arguments: dict[int, dict]) -> list[tuple[int, str]]:
+        """Call a tool on several shards, each with its own arguments; returns [(shard, result)] in shard order.
+
+        Remote shards are called in parallel. Local shards share this process's Pixeltable store,
+        whose catalog is not meant for concurrent use, so they are called one after another.
+        """
+        shards = sorted(arguments)
+        workers = len(shards) if index.urls else 1
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+            return list(executor.map(lambda shard: (shard, self._call(index, shard, tool, arguments[shard])), shards))
+
+    def scatter(self, index: ShardedIndex, tool: str, shards: Optional[list[int]] = None,
+                **arguments: Any) -> list[tuple[int, str]]:
+        """Call a tool with the same arguments on several shards (all by default)."""
+        shards = list(range(index.shards)) if shards is None else shards
+        return self.gather(index, tool, {shard: arguments for shard in shards})
+
+    def call(self, index: ShardedIndex, shard: int, tool: str, **arguments: Any) -> str:
+        return self.scatter(index, tool, [shard], **arguments)[0][1]
+
+
+def rows_json(rows: list[dict]) -> str:
+    """Query rows as JSON, as returned to a coordinator by a shard."""
+    return json.dumps(rows, default=lambda value: value.item() if hasattr(value, 'item') else str(value))
+
+
+def merge_top(results: list[tuple[int, str]], top_n: int, key: str = 'sim') -> tuple[list[dict], list[str]]:
+    """Merge the JSON rows returned by shards into the overall top_n; returns (rows, shard errors)."""
+    rows, errors = [], []
+    for shard, result in results:
+        try:
+            shard_rows = json.loads(result)
+        except ValueError:
+            errors.append(f"shard {shard}: {result}")
+            continue
+        for row in shard_rows:
+            row['shard'] = shard
+        rows.extend(shard_rows)
+    return heapq.nlargest(top_n, rows, key=lambda row: row[key]), errors
+
+
+def join_results(results: list[tuple[int, str]]) -> str:
+    return "\n".join(f"  shard {shard}: {result}" for shard, result in results)
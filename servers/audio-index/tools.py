@@ -1,13 +1,14 @@
 import os
+import json
 import logging
+import pathlib
 from typing import Tuple, Dict, Any, Optional
 
-import pixeltable as pxt
-from mcp.server.fastmcp import FastMCP
-from pixeltable.functions import whisper
-from pixeltable.functions.huggingface import sentence_transformer
-from pixeltable.iterators.string import StringSplitter
-from pixeltable.iterators import AudioSplitter
+from index_maintenance import active_index, format_report, rebuild_embedding_index, scheduler as maintenance
+from lazy_imports import DeferredFastMCP, DeferredImports
+from query_profile import QueryProfile
+from replica import replica, start_publishing, table_versions
+from sharding import ShardClient, ShardedIndex, join_results, merge_top, rows_json
 
 # Configure logging
 logging.basicConfig(
@@ -16,8 +17,28 @@ logging.basicConfig(
 )
 logger = logging.getLogger('audio_index')
 
+
+def _load_imports() -> None:
+    """Import Pixeltable and the modules built on it on first use, not at startup (see lazy_imports.py)."""
+    global pxt, pxt_str, sentence_transformer, StringSplitter, AudioSplitter, SpeechSplitter, trim_overlap
+    global describe, export_table, imported_config, import_tables, prepare_export, read_manifest
+    global read_only_error, snapshot_info, write_manifest, TRANSCRIPTION_MODELS, transcribe
+    import pixeltable as pxt
+    from pixeltable.functions import string as pxt_str
+    from pixeltable.functions.huggingface import sentence_transformer
+    from pixeltable.iterators.string import StringSplitter
+    from pixeltable.iterators import AudioSplitter
+    from speech_splitter import SpeechSplitter, trim_overlap
+    from snapshot import (describe, export_table, imported_config, import_tables, prepare_export, read_manifest,
+                          read_only_error, snapshot_info, write_manifest)
+    from transcription import transcribe
+    from transcription_backends import DEFAULT_MODELS as TRANSCRIPTION_MODELS
+
+
+imports = DeferredImports(_load_imports)
+
 # Initialize MCP server
-mcp = FastMCP("Pixeltable Audio Index")
+mcp = DeferredFastMCP("Pixeltable Audio Index", imports)
 
 # Constants
 DIRECTORY = 'audio_index'
@@ -25,11 +46,18 @@ DEFAULT_CHUNK_DURATION = 30.0
 DEFAULT_OVERLAP_DURATION = 2.0
 DEFAULT_MIN_CHUNK_DURATION = 5.0
 DEFAULT_EMBEDDING_MODEL = 'intfloat/e5-large-v2'
-DEFAULT_WHISPER_MODEL = 'base.en'
+EMBEDDING_DIMS = 1024
+DEFAULT_TRANSCRIPTION_BACKEND = 'whisper'
+# 'fixed' cuts overlapping fixed-length windows, 'vad' cuts on silence and skips it
+CHUNKING_MODES = ('fixed', 'vad')
 
 # Registry to hold all audio indexes
 # Format: {full_table_name: (audio_index, chunks_view, sentences_view)}
 audio_indexes: Dict[str, Tuple[Any, Any, Any]] = {}
+# Sharded indexes, whose shards are ordinary audio indexes (see sharding.py)
+# Format: {full_table_name: ShardedIndex}
+sharded_indexes: Dict[str, ShardedIndex] = {}
+shard_client = ShardClient(globals())
 
 
 def _get_table_names(table_name: str) -> Tuple[str, str, str]:
@@ -47,6 +75,20 @@ def _get_table_names(table_name: str) -> Tuple[str, str, str]:
     return full_table_name, chunks_view_name, sentences_view_name
 
 
+def _load_config(audio_index) -> dict:
+    """Read the configuration stored in the table comment; only imported indexes have one."""
+    comment = audio_index.get_metadata().get('comment') or ''
+    try:
+        return json.loads(comment)
+    except ValueError:
+        return {}
+
+
+def _file_url(location: str) -> str:
+    """Normalize a location the way Pixeltable stores it: local paths become file:// URLs."""
+    return location if '://' in location else pathlib.Path(location).absolute().as_uri()
+
+
 def _load_existing_index(full_table_name: str, chunks_view_name: str, 
                          sentences_view_name: str) -> bool:
     """Load an existing audio index into the registry.
@@ -61,8 +103,14 @@ def _load_existing_index(full_table_name: str, chunks_view_name: str,
     """
     try:
         audio_index = pxt.get_table(full_table_name)
-        chunks_view = pxt.get_view(chunks_view_name)
-        sentences_view = pxt.get_view(sentences_view_name)
+        config = _load_config(audio_index)
+        if 'sharding' in config:
+            sharded_indexes[full_table_name] = ShardedIndex.from_config(full_table_name.split('.', 1)[1], config)
+            logger.info(f"Loaded existing sharded audio index '{full_table_name}'")
+            return True
+        # Views, or plain tables for an imported index
+        chunks_view = pxt.get_table(chunks_view_name)
+        sentences_view = pxt.get_table(sentences_view_name)
         audio_indexes[full_table_name] = (audio_index, chunks_view, sentences_view)
         logger.info(f"Loaded existing audio index '{full_table_name}'")
         return True
@@ -72,22 +120,54 @@ def _load_existing_index(full_table_name: str, chunks_view_name: str,
 
 
 @mcp.tool()
-def setup_audio_index(table_name: str, openai_api_key: str) -> str:
+def setup_audio_index(table_name: str, openai_api_key: str, chunking: str = 'fixed',
+                      transcription_backend: str = DEFAULT_TRANSCRIPTION_BACKEND,
+                      transcription_model: Optional[str] = None, shards: int = 1, shard_urls: str = '') -> str:
     """Set up an audio index with the provided name and OpenAI API key.
 
     Args:
         table_name: The name of the audio index (e.g., 'podcasts', 'interviews').
         openai_api_key: The OpenAI API key required for Whisper transcription.
+        chunking: How audio is cut before transcription (default is 'fixed').
+            'fixed' uses overlapping 30-second windows and drops the repeated overlap from transcripts,
+            'vad' cuts on silent stretches and skips them; silence is detected by loudness, so music is kept.
+        transcription_backend: Where transcription runs (default is 'whisper').
+            'whisper' runs openai-whisper locally, 'faster-whisper' runs an int8 model locally on CPU,
+            'openai' calls the OpenAI API with concurrent, retrying requests.
+        transcription_model: The model to use; defaults to 'base.en' for local backends and 'whisper-1' for 'openai'.
+        shards: Split the index into this many shard indexes in this server's store (default is 1, unsharded).
+            Local shards share one store and are queried one after another, so without shard_urls this adds
+            neither parallelism nor capacity; it only prepares an index for moving shards to other servers.
+        shard_urls: Comma-separated SSE URLs of other audio index servers (e.g. 'http://node2:8080/sse'),
+            one shard per URL; overrides shards. Files must be reachable from those servers.
 
     Returns:
         A message indicating whether the index was created, already exists, or failed.
     """
     global audio_indexes
+    if replica.enabled:
+        return replica.read_only_error()
     
     # Generate table names
     full_table_name, chunks_view_name, sentences_view_name = _get_table_names(table_name)
     
+    if chunking not in CHUNKING_MODES:
+        return f"Error: Invalid chunking mode '{chunking}'. Valid modes are: {', '.join(CHUNKING_MODES)}"
+    if transcription_backend not in TRANSCRIPTION_MODELS:
+        return (f"Error: Invalid transcription backend '{transcription_backend}'. "
+                f"Valid backends are: {', '.join(TRANSCRIPTION_MODELS)}")
+    transcription_model = transcription_model or TRANSCRIPTION_MODELS[transcription_backend]
+    urls = [url.strip() for url in shard_urls.split(',') if url.strip()]
+    if shards < 1:
+        return "Error: shards must be at least 1."
+
     try:
+        if (shards > 1 or urls) and full_table_name not in pxt.list_tables():
+            index = ShardedIndex(table_name, len(urls) or shards, urls)
+            return _setup_sharded(full_table_name, index, openai_api_key=openai_api_key, chunking=chunking,
+                                  transcription_backend=transcription_backend,
+                                  transcription_model=transcription_model)
+
         # Set the API key
         os.environ['OPENAI_API_KEY'] = openai_api_key
         logger.info(f"Setting up audio index '{full_table_name}'")
@@ -106,30 +186,46 @@ def setup_audio_index(table_name: str, openai_api_key: str) -> str:
         logger.info(f"Created audio index table '{full_table_name}'")
 
         # Create view for audio chunks
-        chunks_view = pxt.create_view(
-            chunks_view_name,
-            audio_index,
-            iterator=AudioSplitter.create(
+        if chunking == 'vad':
+            iterator = SpeechSplitter.create(
+                audio=audio_index.audio_file,
+                max_chunk_duration_sec=DEFAULT_CHUNK_DURATION
+            )
+        else:
+            iterator = AudioSplitter.create(
                 audio=audio_index.audio_file,
                 chunk_duration_sec=DEFAULT_CHUNK_DURATION,
                 overlap_sec=DEFAULT_OVERLAP_DURATION,
                 min_chunk_duration_sec=DEFAULT_MIN_CHUNK_DURATION
-            ),
-            if_exists='ignore'
-        )
-        logger.info(f"Created audio chunks view '{chunks_view_name}'")
+            )
+        chunks_view = pxt.create_view(chunks_view_name, audio_index, iterator=iterator, if_exists='ignore')
+        logger.info(f"Created audio chunks view '{chunks_view_name}' ({chunking} chunking)")
 
         # Add transcription to chunks
         chunks_view.add_computed_column(
-            transcription=whisper.transcribe(audio=chunks_view.audio_chunk, model=DEFAULT_WHISPER_MODEL)
+            transcription=transcribe(
+                chunks_view.audio_chunk, backend=transcription_backend, model=transcription_model
+            )
         )
-        logger.info("Added transcription column to chunks view")
+        logger.info(f"Added transcription column to chunks view ({transcription_backend}, {transcription_model})")
+
+        # Speech chunks never overlap; fixed windows repeat the overlap at the start of every chunk
+        if chunking == 'vad':
+            transcript_text = chunks_view.transcription.text
+        else:
+            chunks_view.add_computed_column(
+                transcript=trim_overlap(
+                    chunks_view.transcription, chunks_view.start_time_sec, chunks_view.end_time_sec,
+                    DEFAULT_OVERLAP_DURATION
+                )
+            )
+            transcript_text = chunks_view.transcript
 
         # Create view that chunks transcriptions into sentences
         sentences_view = pxt.create_view(
             sentences_view_name,
             chunks_view,
-            iterator=StringSplitter.create(text=chunks_view.transcription.text, separators='sentence'),
+            iterator=StringSplitter.create(text=transcript_text, separators='sentence'),
             if_exists='ignore'
         )
         logger.info(f"Created sentence chunks view '{sentences_view_name}'")
@@ -147,6 +243,22 @@ def setup_audio_index(table_name: str, openai_api_key: str) -> str:
         return f"Error setting up audio index '{full_table_name}': {str(e)}"
 
 
+def _setup_sharded(full_table_name: str, index: ShardedIndex, **arguments: Any) -> str:
+    """Set up every shard of a sharded index, then record the layout in a coordinator table."""
+    results = shard_client.scatter(index, 'setup_audio_index', **arguments)
+    if any(result.startswith('Error') for _, result in results):
+        logger.error(f"Error setting up shards of audio index '{full_table_name}'")
+        return f"Error setting up shards of audio index '{full_table_name}':\n{join_results(results)}"
+
+    # The coordinator table holds no rows, only the shard layout in its comment
+    pxt.create_dir(DIRECTORY, if_exists='ignore')
+    pxt.create_table(full_table_name, {'audio_file': pxt.Audio}, comment=json.dumps(index.config()),
+                     if_exists='ignore')
+    sharded_indexes[full_table_name] = index
+    logger.info(f"Created sharded audio index '{full_table_name}' ({index.describe()})")
+    return f"Sharded audio index '{full_table_name}' created ({index.describe()}):\n{join_results(results)}"
+
+
 @mcp.tool()
 def insert_audio(table_name: str, audio_location: str) -> str:
     """Insert an audio file into the specified audio index.
@@ -161,11 +273,18 @@ def insert_audio(table_name: str, audio_location: str) -> str:
     full_table_name, _, _ = _get_table_names(table_name)
     
     try:
+        if full_table_name in sharded_indexes:
+            index = sharded_indexes[full_table_name]
+            return shard_client.call(index, index.route(_file_url(audio_location)), 'insert_audio',
+                                     audio_location=audio_location)
         if full_table_name not in audio_indexes:
             logger.warning(f"Audio index '{full_table_name}' not set up")
             return f"Error: Audio index '{full_table_name}' not set up. Please call setup_audio_index first."
             
         audio_index, _, _ = audio_indexes[full_table_name]
+        info = snapshot_info(_load_config(audio_index))
+        if info:
+            return read_only_error('Audio', full_table_name, info)
         audio_index.insert([{'audio_file': audio_location}])
         logger.info(f"Inserted audio file '{audio_location}' into index '{full_table_name}'")
         return f"Audio file '{audio_location}' inserted successfully into index '{full_table_name}'."
@@ -175,49 +294,447 @@ def insert_audio(table_name: str, audio_location: str) -> str:
 
 
 @mcp.tool()
-def query_audio(table_name: str, query_text: str, top_n: int = 5) -> str:
+def delete_audio(table_name: str, audio_location: str = '', location_prefix: str = '') -> str:
+    """Delete audio files from the specified audio index, with their chunks, sentences and embeddings.
+
+    Args:
+        table_name: The name of the audio index (e.g., 'podcasts', 'interviews').
+        audio_location: Delete the file inserted from this URL or path.
+        location_prefix: Delete every file whose URL or path starts with this prefix (e.g. a directory).
+
+    Returns:
+        The number of audio files deleted.
+    """
+    full_table_name, _, _ = _get_table_names(table_name)
+    if not audio_location and not location_prefix:
+        return "Error: Provide audio_location or location_prefix."
+
+    try:
+        if full_table_name in sharded_indexes:
+            index = sharded_indexes[full_table_name]
+            shards = [index.route(_file_url(audio_location))] if audio_location else None
+            results = shard_client.scatter(index, 'delete_audio', shards,
+                                           audio_location=audio_location, location_prefix=location_prefix)
+            return f"Deleted from sharded audio index '{full_table_name}':\n{join_results(results)}"
+        if full_table_name not in audio_indexes:
+            logger.warning(f"Audio index '{full_table_name}' not set up")
+            return f"Error: Audio index '{full_table_name}' not set up. Please call setup_audio_index first."
+
+        audio_index, _, _ = audio_indexes[full_table_name]
+        info = snapshot_info(_load_config(audio_index))
+        if info:
+            return read_only_error('Audio', full_table_name, info)
+        fileurl = audio_index.audio_file.fileurl
+        if audio_location:
+            condition = fileurl == _file_url(audio_location)
+        else:
+            condition = pxt_str.startswith(fileurl, _file_url(location_prefix))
+        # Chunk and sentence views, and their embedding index, drop the rows derived from deleted files
+        status = audio_index.delete(where=condition)
+        logger.info(f"Deleted {status.num_rows} audio files from '{full_table_name}'")
+        return f"Deleted {status.num_rows} audio files from index '{full_table_name}'."
+    except Exception as e:
+        logger.error(f"Error deleting from audio index '{full_table_name}': {str(e)}")
+        return f"Error deleting from audio index '{full_table_name}': {str(e)}"
+
+
+@mcp.tool()
+def update_audio(table_name: str, audio_location: str, new_audio_location: str) -> str:
+    """Replace an audio file in the specified audio index; only its chunks are re-transcribed and re-embedded.
+
+    Args:
+        table_name: The name of the audio index (e.g., 'podcasts', 'interviews').
+        audio_location: The URL or path the file was inserted from.
+        new_audio_location: The URL or path of the replacement file.
+
+    Returns:
+        A confirmation message indicating success or failure.
+    """
+    full_table_name, _, _ = _get_table_names(table_name)
+
+    try:
+        if full_table_name in sharded_indexes:
+            return _update_sharded(sharded_indexes[full_table_name], audio_location, new_audio_location)
+        if full_table_name not in audio_indexes:
+            logger.warning(f"Audio index '{full_table_name}' not set up")
+            return f"Error: Audio index '{full_table_name}' not set up. Please call setup_audio_index first."
+
+        audio_index, _, _ = audio_indexes[full_table_name]
+        info = snapshot_info(_load_config(audio_index))
+        if info:
+            return read_only_error('Audio', full_table_name, info)
+        # Updating the media column cascades to the computed columns and views that depend on it
+        status = audio_index.update(
+            {'audio_file': new_audio_location}, where=audio_index.audio_file.fileurl == _file_url(audio_location)
+        )
+        if status.num_rows == 0:
+            return f"Error: Audio file '{audio_location}' not found in index '{full_table_name}'."
+        logger.info(f"Replaced audio file '{audio_location}' with '{new_audio_location}' in '{full_table_name}'")
+        return f"Audio file '{audio_location}' replaced with '{new_audio_location}' in index '{full_table_name}'."
+    except Exception as e:
+        logger.error(f"Error updating audio file in '{full_table_name}': {str(e)}")
+        return f"Error updating audio file in '{full_table_name}': {str(e)}"
+
+
+def _update_sharded(index: ShardedIndex, audio_location: str, new_audio_location: str) -> str:
+    owner = index.route(_file_url(audio_location))
+    new_owner = index.route(_file_url(new_audio_location))
+    if new_owner == owner:
+        return shard_client.call(index, owner, 'update_audio', audio_location=audio_location,
+                                 new_audio_location=new_audio_location)
+    # The new location hashes to another shard: move the file there, so it is found by location later
+    result = shard_client.call(index, owner, 'delete_audio', audio_location=audio_location)
+    if result.startswith('Error') or result.startswith('Deleted 0 '):
+        return result
+    return shard_client.call(index, new_owner, 'insert_audio', audio_location=new_audio_location)
+
+
+def _format_results(query_text: str, full_table_name: str, rows: list[dict]) -> str:
+    result_str = f"Query Results for '{query_text}' in '{full_table_name}':\n\n"
+    for i, row in enumerate(rows, 1):
+        result_str += f"{i}. Score: {row['sim']:.4f}\n"
+        result_str += f"   Text: {row['text']}\n"
+        result_str += f"   From audio: {row['audio_file']}\n"
+        result_str += (f"   Chunk: {row['start_time_sec']:.3f}s - {row['end_time_sec']:.3f}s, "
+                       f"sentence {row['position']}\n")
+        if 'shard' in row:
+            result_str += f"   Shard: {row['shard']}\n"
+        result_str += "\n"
+    return result_str
+
+
+def _query_sharded(index: ShardedIndex, full_table_name: str, query_text: str, top_n: int,
+                   profile: bool) -> str:
+    """Scatter a query to every shard and merge the shards' top_n rows into the overall top_n."""
+    query_profile = QueryProfile()
+    with query_profile.stage('scatter'):
+        results = shard_client.scatter(index, 'query_audio', query_text=query_text, top_n=top_n, as_json=True)
+    with query_profile.stage('merge'):
+        rows, errors = merge_top(results, top_n)
+    with query_profile.stage('serialize'):
+        result_str = _format_results(query_text, full_table_name, rows) if rows else "No results found.\n"
+        if errors:
+            result_str += "Shards that failed (results are partial):\n" + "\n".join(errors) + "\n"
+
+    if profile:
+        query_profile.step(f"scatter: query_audio top {top_n} on {index.describe()}")
+        query_profile.step(f"merge: top {top_n} of the shards' rows by similarity")
+        query_profile.index = f"embedding index on text ({DEFAULT_EMBEDDING_MODEL}) of each shard"
+        query_profile.rows['shards'] = index.shards
+        query_profile.rows['returned'] = len(rows)
+        result_str += f"{query_profile.report()}\n"
+    return result_str
+
+
+@mcp.tool()
+def query_audio(table_name: str, query_text: str, top_n: int = 5, profile: bool = False,
+                as_json: bool = False) -> str:
     """Query the specified audio index with a text question.
 
     Args:
         table_name: The name of the audio index (e.g., 'podcasts', 'interviews').
         query_text: The question or text to search for in the audio content.
         top_n: Number of top results to return (default is 5).
+        profile: Append a summary of the request (filters, index, ordering), row counts and per-stage timings.
+        as_json: Return the rows as a JSON list instead of text; sharded indexes gather shard results this way.
 
     Returns:
         A string containing the top matching sentences and their similarity scores.
     """
-    full_table_name, _, _ = _get_table_names(table_name)
+    full_table_name, _, sentences_view_name = _get_table_names(table_name)
     
     try:
+        if full_table_name in sharded_indexes:
+            return _query_sharded(sharded_indexes[full_table_name], full_table_name, query_text, top_n, profile)
         if full_table_name not in audio_indexes:
             logger.warning(f"Audio index '{full_table_name}' not set up")
             return f"Error: Audio index '{full_table_name}' not set up. Please call setup_audio_index first."
             
+        stale = replica.check(table_name)
+        if stale:
+            return stale
         _, _, sentences_view = audio_indexes[full_table_name]
         
         # Calculate similarity scores between query and sentences
         logger.info(f"Querying '{full_table_name}' with: '{query_text}'")
-        sim = sentences_view.text.similarity(query_text)
-
-        # Get top results
-        results = (sentences_view.order_by(sim, asc=False)
-                  .select(sentences_view.text, sim=sim, audio_file=sentences_view.audio_file)
-                  .limit(top_n)
-                  .collect())
+        query_profile = QueryProfile()
+        with query_profile.stage('build'):
+            sim = sentences_view.text.similarity(query_text, idx=active_index(sentences_view_name, 'text'))
+
+            # Get top results, with what expand_context needs to locate each hit
+            query = (sentences_view.order_by(sim, asc=False)
+                     .select(sentences_view.text, sim=sim, audio_file=sentences_view.audio_file.fileurl,
+                             start_time_sec=sentences_view.start_time_sec, end_time_sec=sentences_view.end_time_sec,
+                             position=sentences_view.pos)
+                     .limit(top_n))
+        # The query text is embedded when the query runs, so 'search' includes embedding, index scan and fetch
+        with query_profile.stage('search'):
+            results = query.collect()
 
         # Format the results
-        result_str = f"Query Results for '{query_text}' in '{full_table_name}':\n\n"
-        for i, row in enumerate(results.to_pandas().itertuples(), 1):
-            result_str += f"{i}. Score: {row.sim:.4f}\n"
-            result_str += f"   Text: {row.text}\n"
-            result_str += f"   From audio: {row.audio_file}\n\n"
-        
+        with query_profile.stage('serialize'):
+            # Rows straight from the result set; building a DataFrame costs more than formatting top_n rows
+            rows = list(results)
+            if as_json:
+                return rows_json(rows)
+            result_str = _format_results(query_text, full_table_name, rows)
+
+        if profile:
+            query_profile.step(f"source: {sentences_view_name}")
+            query_profile.step(f"order by: similarity(text, query) desc, limit {top_n}")
+            query_profile.step("select: text, sim, audio_file, start_time_sec, end_time_sec, position")
+            query_profile.index = f"embedding index on text ({DEFAULT_EMBEDDING_MODEL})"
+            query_profile.rows['returned'] = len(results)
+            query_profile.count('indexed', sentences_view)
+            result_str += f"{query_profile.report()}\n"
+
         return result_str if len(results) > 0 else "No results found."
     except Exception as e:
         logger.error(f"Error querying audio index '{full_table_name}': {str(e)}")
         return f"Error querying audio index '{full_table_name}': {str(e)}"
 
 
+@mcp.tool()
+def expand_context(table_name: str, audio_file: str, chunk_start_sec: float, sentence_position: int,
+                   window: int = 2) -> str:
+    """Return the sentences surrounding a query_audio hit, without running another search.
+
+    Args:
+        table_name: The name of the audio index (e.g., 'podcasts', 'interviews').
+        audio_file: The 'From audio' value of the hit.
+        chunk_start_sec: The chunk start time of the hit, in seconds.
+        sentence_position: The sentence number of the hit within its chunk.
+        window: Number of sentences to return on each side of the hit (default is 2).
+
+    Returns:
+        The hit and its neighboring sentences in order, with chunk timestamps.
+    """
+    full_table_name, _, _ = _get_table_names(table_name)
+
+    try:
+        if full_table_name in sharded_indexes:
+            index = sharded_indexes[full_table_name]
+            return shard_client.call(index, index.route(audio_file), 'expand_context', audio_file=audio_file,
+                                     chunk_start_sec=chunk_start_sec, sentence_position=sentence_position,
+                                     window=window)
+        if full_table_name not in audio_indexes:
+            logger.warning(f"Audio index '{full_table_name}' not set up")
+            return f"Error: Audio index '{full_table_name}' not set up. Please call setup_audio_index first."
+
+        stale = replica.check(table_name)
+        if stale:
+            return stale
+        _, chunks_view, sentences_view = audio_indexes[full_table_name]
+        in_file = chunks_view.audio_file.fileurl == audio_file
+
+        # Find the neighboring chunks by position in the file, so context can cross chunk boundaries
+        previous_chunk = (chunks_view.where(in_file & (chunks_view.start_time_sec < chunk_start_sec - 1e-3))
+                          .order_by(chunks_view.start_time_sec, asc=False)
+                          .select(chunks_view.start_time_sec).limit(1).collect())
+        next_chunk = (chunks_view.where(in_file & (chunks_view.start_time_sec > chunk_start_sec + 1e-3))
+                      .order_by(chunks_view.start_time_sec)
+                      .select(chunks_view.start_time_sec).limit(1).collect())
+        first_start = previous_chunk['start_time_sec'][0] if len(previous_chunk) > 0 else chunk_start_sec
+        last_start = next_chunk['start_time_sec'][0] if len(next_chunk) > 0 else chunk_start_sec
+
+        # Fetch the sentences of those chunks in order
+        results = (sentences_view.where((sentences_view.audio_file.fileurl == audio_file)
+                                        & (sentences_view.start_time_sec >= first_start - 1e-3)
+                                        & (sentences_view.start_time_sec <= last_start + 1e-3))
+                   .order_by(sentences_view.start_time_sec, sentences_view.pos)
+                   .select(sentences_view.text, start_time_sec=sentences_view.start_time_sec,
+                           end_time_sec=sentences_view.end_time_sec, position=sentences_view.pos)
+                   .collect())
+        rows = list(results)
+        hit = next((i for i, row in enumerate(rows)
+                    if abs(row['start_time_sec'] - chunk_start_sec) < 1e-3 and row['position'] == sentence_position),
+                   None)
+        if hit is None:
+            return f"Error: No sentence {sentence_position} in the chunk at {chunk_start_sec}s of '{audio_file}'."
+
+        result_str = f"Context for sentence {sentence_position} at {chunk_start_sec}s of '{audio_file}':\n\n"
+        for i in range(max(hit - window, 0), min(hit + window + 1, len(rows))):
+            row = rows[i]
+            marker = '>' if i == hit else ' '
+            result_str += f"{marker} [{row['start_time_sec']:.3f}s - {row['end_time_sec']:.3f}s, "
+            result_str += f"sentence {row['position']}] {row['text']}\n"
+        return result_str
+    except Exception as e:
+        logger.error(f"Error expanding context in audio index '{full_table_name}': {str(e)}")
+        return f"Error expanding context in audio index '{full_table_name}': {str(e)}"
+
+
+def _maintain(full_table_name: str) -> str:
+    """Rebuild the sentence embedding index of an audio index and describe the result."""
+    _, _, sentences_view_name = _get_table_names(full_table_name.split('.', 1)[1])
+    embed_model = sentence_transformer.using(model_id=DEFAULT_EMBEDDING_MODEL)
+    report = rebuild_embedding_index(sentences_view_name, 'text', EMBEDDING_DIMS, string_embed=embed_model)
+    return format_report(sentences_view_name, 'text', report)
+
+
+@imports.wrap
+def _maintain_all() -> None:
+    for full_table_name, (audio_index, _, _) in list(audio_indexes.items()):
+        # Imported indexes do not change, so there is nothing to maintain
+        if not snapshot_info(_load_config(audio_index)):
+            _maintain(full_table_name)
+
+
+@mcp.tool()
+def maintain_index(table_name: str) -> str:
+    """Rebuild the embedding index of an audio index, e.g. after many inserts and deletions.
+
+    A new index is built alongside the current one, which keeps serving queries until the new
+    index is ready; then queries switch over and the old index is dropped.
+
+    Args:
+        table_name: The name of the audio index (e.g., 'podcasts', 'interviews').
+
+    Returns:
+        The new index's row count, approximate size and build time.
+    """
+    full_table_name, _, _ = _get_table_names(table_name)
+    try:
+        if full_table_name in sharded_indexes:
+            results = shard_client.scatter(sharded_indexes[full_table_name], 'maintain_index')
+            return f"Maintained the shards of audio index '{full_table_name}':\n{join_results(results)}"
+        if full_table_name not in audio_indexes:
+            logger.warning(f"Audio index '{full_table_name}' not set up")
+            return f"Error: Audio index '{full_table_name}' not set up. Please call setup_audio_index first."
+        info = snapshot_info(_load_config(audio_indexes[full_table_name][0]))
+        if info:
+            return read_only_error('Audio', full_table_name, info)
+        return f"Rebuilt {_maintain(full_table_name)}"
+    except Exception as e:
+        logger.error(f"Error maintaining audio index '{full_table_name}': {str(e)}")
+        return f"Error maintaining audio index '{full_table_name}': {str(e)}"
+
+
+@mcp.tool()
+def schedule_index_maintenance(interval_hours: float) -> str:
+    """Rebuild the embedding indexes of all loaded audio indexes periodically in the background.
+
+    Args:
+        interval_hours: Hours between rebuilds; 0 turns scheduled maintenance off.
+    """
+    maintenance.start(interval_hours, _maintain_all)
+    return f"Index maintenance: {maintenance.describe()}"
+
+
+# Optional scheduled maintenance from the environment, e.g. INDEX_MAINTENANCE_INTERVAL_HOURS=24
+maintenance.start(float(os.environ.get('INDEX_MAINTENANCE_INTERVAL_HOURS', 0)), _maintain_all)
+
+
+@imports.wrap
+def _export(full_table_name: str, export_path: str) -> dict:
+    """Export a loaded audio index to a directory and return the export's manifest."""
+    audio_index, chunks_view, sentences_view = audio_indexes[full_table_name]
+    prepare_export(export_path)
+    location = {'audio_file': 'Audio', 'start_time_sec': 'Float', 'end_time_sec': 'Float'}
+    tables = [
+        export_table(export_path, '', audio_index, {'audio_file': 'Audio'}),
+        export_table(export_path, '_chunks', chunks_view,
+                     {**location, 'transcription': 'Json', 'transcript': 'String'}),
+        export_table(export_path, '_sentence_chunks', sentences_view,
+                     {**location, 'pos': 'Int', 'text': 'String'}, embedded=('text',)),
+    ]
+    return write_manifest(export_path, 'audio-index', full_table_name, _load_config(audio_index), tables)
+
+
+def _import(export_path: str, manifest: dict, full_table_name: str, table_path: str) -> None:
+    """Import an export as tables under table_path and serve them as the audio index full_table_name."""
+    tables = import_tables(
+        export_path, manifest,
+        {'': table_path, '_chunks': f'{table_path}_chunks', '_sentence_chunks': f'{table_path}_sentence_chunks'},
+        json.dumps(imported_config(manifest))
+    )
+    audio_indexes[full_table_name] = (tables[''], tables['_chunks'], tables['_sentence_chunks'])
+
+
+@mcp.tool()
+def export_index(table_name: str, export_path: str) -> str:
+    """Export an audio index to a directory, so another server can import it without recomputing it.
+
+    Transcripts and sentences are written as Parquet and sentence embeddings as memory-mappable
+    Arrow files. Audio files are referenced by URL, not copied.
+
+    Args:
+        table_name: The name of the audio index (e.g., 'podcasts', 'interviews').
+        export_path: Directory to write the export to; created if needed, must not hold an export already.
+
+    Returns:
+        The exported tables with their row and vector counts.
+    """
+    full_table_name, _, _ = _get_table_names(table_name)
+    try:
+        if full_table_name in sharded_indexes:
+            return (f"Error: Audio index '{full_table_name}' is sharded; "
+                    f"export each shard ({sharded_indexes[full_table_name].describe()}) instead.")
+        if full_table_name not in audio_indexes:
+            logger.warning(f"Audio index '{full_table_name}' not set up")
+            return f"Error: Audio index '{full_table_name}' not set up. Please call setup_audio_index first."
+
+        manifest = _export(full_table_name, export_path)
+        logger.info(f"Exported audio index '{full_table_name}' to '{export_path}'")
+        return f"Exported audio index '{full_table_name}' to '{export_path}':\n{describe(manifest)}"
+    except Exception as e:
+        logger.error(f"Error exporting audio index '{full_table_name}': {str(e)}")
+        return f"Error exporting audio index '{full_table_name}': {str(e)}"
+
+
+@mcp.tool()
+def import_index(export_path: str, table_name: str = '') -> str:
+    """Import an audio index exported by export_index, without transcribing or embedding anything again.
+
+    The imported index serves query_audio and expand_context like the original, but is a read-only
+    snapshot: it does not accept new audio files.
+
+    Args:
+        export_path: Directory written by export_index.
+        table_name: Name for the imported index; defaults to the name of the exported one.
+
+    Returns:
+        The imported tables with their row and vector counts.
+    """
+    if replica.enabled:
+        return replica.read_only_error()
+    try:
+        manifest = read_manifest(export_path, 'audio-index')
+        full_table_name, _, _ = _get_table_names(table_name or manifest['index'].split('.', 1)[1])
+        if full_table_name in pxt.list_tables():
+            return f"Error: Audio index '{full_table_name}' already exists."
+
+        pxt.create_dir(DIRECTORY, if_exists='ignore')
+        _import(export_path, manifest, full_table_name, full_table_name)
+        logger.info(f"Imported audio index '{full_table_name}' from '{export_path}'")
+        return f"Imported '{export_path}' as read-only audio index '{full_table_name}':\n{describe(manifest)}"
+    except Exception as e:
+        logger.error(f"Error importing audio index from '{export_path}': {str(e)}")
+        return f"Error importing audio index from '{export_path}': {str(e)}"
+
+
+@imports.wrap
+def _replicate(export_path: str, table_name: str, table_path: str) -> None:
+    _import(export_path, read_manifest(export_path, 'audio-index'), _get_table_names(table_name)[0], table_path)
+
+
+@imports.wrap
+def _published() -> list[str]:
+    """Names of the loaded indexes built by this server, which a writer publishes snapshots of."""
+    return [full_table_name.split('.', 1)[1] for full_table_name, (audio_index, _, _) in list(audio_indexes.items())
+            if not snapshot_info(_load_config(audio_index))]
+
+
+def _version(table_name: str) -> tuple:
+    """Version of a loaded index; a writer only publishes a new snapshot of it when this changes."""
+    return table_versions(*audio_indexes[_get_table_names(table_name)[0]])
+
+
+# Read-only replica mode (REPLICA_OF) or snapshot publishing on a writer (SNAPSHOT_DIR); see replica.py
+replica.start(DIRECTORY, _replicate)
+start_publishing(_published, lambda table_name, path: _export(_get_table_names(table_name)[0], path), _version)
+
+
 @mcp.tool()
 def list_tables(random_string: str = "") -> str:
     """List all audio indexes currently available.
@@ -225,6 +742,8 @@ def list_tables(random_string: str = "") -> str:
     Returns:
         A string listing the current audio indexes.
     """
+    if replica.enabled:
+        return replica.describe()
     try:
         tables = pxt.list_tables()
         audio_tables = [t for t in tables if t.startswith(f'{DIRECTORY}.') and not (
@@ -236,12 +755,14 @@ def list_tables(random_string: str = "") -> str:
             
         # Load any tables that exist but aren't in our registry
         for table in audio_tables:
-            if table not in audio_indexes:
+            if table not in audio_indexes and table not in sharded_indexes:
                 table_name = table.split('.')[-1]
                 _, chunks_view_name, sentences_view_name = _get_table_names(table_name)
                 _load_existing_index(table, chunks_view_name, sentences_view_name)
                 
-        return f"Current audio indexes: {', '.join(audio_tables)}"
+        return f"Current audio indexes: {', '.join(audio_tables)}" + ''.join(
+            f"\n{table}: {index.describe()}" for table, index in sharded_indexes.items()
+        )
     except Exception as e:
         logger.error(f"Error listing audio indexes: {str(e)}")
         return f"Error listing audio indexes: {str(e)}"
\ No newline at end of file
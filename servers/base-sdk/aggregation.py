@@ -0,0 +1,120 @@
+"""Grouped aggregation for execute_query.
+
+Aggregates are written as "func(column)", e.g. "avg(age)", or "count(*)" for the number of rows.
+All of them run as Pixeltable aggregate functions, so only one row per group leaves the query.
+Pixeltable has no distinct-count aggregate, so count_distinct is a user-defined aggregate below.
+Like SQL COUNT(DISTINCT column), it ignores nulls.
+"""
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, Generic, Optional, TypeVar
+
+import pandas as pd
+import pixeltable as pxt
+import pixeltable.functions as pxtf
+
+T = TypeVar('T')
+
+
+class DistinctValues:
+    """The distinct non-null values added to it."""
+
+    def __init__(self) -> None:
+        self.values: set = set()
+
+    def add(self, val: Any) -> None:
+        if val is None:
+            return
+        try:
+            hash(val)
+        except TypeError:
+            # Json lists and objects; equal values serialize equally
+            val = json.dumps(val, sort_keys=True, default=str)
+        self.values.add(val)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+@pxt.uda
+class count_distinct(pxt.Aggregator, Generic[T]):
+    """Number of distinct non-null values."""
+
+    def __init__(self) -> None:
+        self.distinct = DistinctValues()
+
+    def update(self, val: T) -> None:
+        self.distinct.add(val)
+
+    def value(self) -> int:
+        return len(self.distinct)
+
+
+AGGREGATES = {
+    'count': pxtf.count,
+    'sum': pxtf.sum,
+    'avg': pxtf.mean,
+    'min': pxtf.min,
+    'max': pxtf.max,
+    'count_distinct': count_distinct,
+}
+_SPEC = re.compile(r'^\s*(\w+)\s*\(\s*(\*|\w+)\s*\)\s*$')
+
+
+@dataclass(frozen=True)
+class Aggregate:
+    func: str
+    column: Optional[str]  # None for count(*)
+
+    @property
+    def name(self) -> str:
+        return 'count' if self.column is None else f'{self.func}_{self.column}'
+
+    def expr(self, table: Any) -> Any:
+        # count(*) counts a constant, which is never null, so every row counts
+        return AGGREGATES[self.func](1 if self.column is None else getattr(table, self.column))
+
+
+def parse_aggregates(specs: list[str], columns: list[str]) -> list[Aggregate]:
+    """Parse and validate aggregate specs such as ["count(*)", "avg(age)"]; raises ValueError."""
+    aggregates = []
+    for spec in specs:
+        match = _SPEC.match(spec)
+        if not match or match.group(1).lower() not in AGGREGATES:
+            raise ValueError(f"Invalid aggregate '{spec}'. Use func(column) with func one of: {', '.join(AGGREGATES)}")
+        func, column = match.group(1).lower(), match.group(2)
+        if column == '*':
+            if func != 'count':
+                raise ValueError(f"Invalid aggregate '{spec}': only count accepts *")
+            column = None
+        elif column not in columns:
+            raise ValueError(f"Column '{column}' not found")
+        aggregates.append(Aggregate(func, column))
+    return aggregates
+
+
+def aggregate_query(
+    table: Any,
+    query: Any,
+    group_by: list[str],
+    aggregates: list[Aggregate],
+    order_by: Optional[str] = None,
+    order_asc: bool = True,
+    limit: Optional[int] = None,
+) -> pd.DataFrame:
+    """Run a grouped aggregation over query (a filtered table) and return one row per group."""
+    group_exprs = [getattr(table, col) for col in group_by]
+    names = set(group_by) | {agg.name for agg in aggregates}
+    if order_by is not None and order_by not in names:
+        raise ValueError(f"Cannot order by '{order_by}': order by a group_by column or an aggregate ({', '.join(sorted(names))})")
+
+    grouped = query.group_by(*group_exprs) if group_by else query
+    agg_exprs = {agg.name: agg.expr(table) for agg in aggregates}
+    grouped = grouped.select(*group_exprs, **agg_exprs)
+    if order_by is not None:
+        order_expr = agg_exprs[order_by] if order_by in agg_exprs else getattr(table, order_by)
+        grouped = grouped.order_by(order_expr, asc=order_asc)
+    if limit is not None:
+        grouped = grouped.limit(limit)
+    return grouped.collect().to_pandas()
@@ -0,0 +1,67 @@
+"""Cache of table handles and column names.
+
+Looking up a table goes through the Pixeltable catalog, and so does reading its schema. Tools
+run many times against the same few tables, so both are cached here. The cache has a version
+number. The DDL tools (create_table, add_computed_column, create_view) bump it, and any entry
+cached under an older version is looked up again on next use. A computed column added to a table
+therefore also shows up in the views built on it.
+
+Changes made outside this server (another process, a notebook) are not seen until the next DDL
+tool call or a server restart.
+"""
+import threading
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import pixeltable as pxt
+
+
+@dataclass
+class _Entry:
+    handle: Any
+    version: int
+    schema: Optional[dict[str, str]] = None
+
+
+class CatalogCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = 0
+        self._entries: dict[str, _Entry] = {}
+
+    def _entry(self, name: str) -> _Entry:
+        with self._lock:
+            entry = self._entries.get(name)
+            version = self._version
+        if entry is not None and entry.version == version:
+            return entry
+        entry = _Entry(pxt.get_table(name), version)
+        with self._lock:
+            self._entries[name] = entry
+        return entry
+
+    def table(self, name: str) -> Any:
+        """Return the handle of a table or view."""
+        return self._entry(name).handle
+
+    def schema(self, name: str) -> dict[str, str]:
+        """Return {column name: type name} of a table or view, including columns inherited from its base."""
+        entry = self._entry(name)
+        if entry.schema is None:
+            entry.schema = {col: str(col_type) for col, col_type in entry.handle.get_metadata()['schema'].items()}
+        return entry.schema
+
+    def columns(self, name: str) -> list[str]:
+        """Return the column names of a table or view, including those inherited from its base."""
+        return list(self.schema(name))
+
+    def invalidate(self, name: Optional[str] = None, handle: Any = None) -> None:
+        """Record a schema change: every cached entry becomes stale. Optionally cache the new handle for name."""
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+            if name is not None and handle is not None:
+                self._entries[name] = _Entry(handle, self._version)
+
+
+catalog = CatalogCache()
@@ -0,0 +1,317 @@
+"""Restricted compiler from expression strings to Pixeltable expressions.
+
+Tools accept expressions such as "table.age >= 18 and table.is_active == True" from the agent. Rather
+than eval() them, they are parsed with the ast module and checked against a small grammar: column
+references, literals, arithmetic, comparisons and boolean logic, plus where/select/order_by/limit
+chains for queries. Anything else (names other than the table, function calls, dunder attributes,
+lambdas, ...) is rejected before it can run.
+
+Named queries may also refer to parameters as 'params.<name>'; their values are substituted when
+the query is built, so one compiled query serves every set of parameter values.
+
+Compiled expressions are cached by (table, expression text), so an agent repeating a query only
+pays for parsing once. Column references are validated against the table schema on every use,
+which is cheap and catches columns dropped since the expression was compiled.
+"""
+import ast
+import operator
+from dataclasses import dataclass
+from functools import lru_cache, reduce
+from typing import Any, Iterable, Optional
+
+# Attributes that may follow a column reference, e.g. table.video.fileurl
+COLUMN_PROPERTIES = ('fileurl', 'localpath', 'errortype', 'errormsg')
+# Methods that may appear in a query chain, in the order they can be applied
+QUERY_METHODS = ('where', 'select', 'order_by', 'limit')
+# Name under which expressions refer to query parameters, e.g. params.min_age
+PARAMS = 'params'
+
+_BINARY_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.BitAnd: operator.and_,
+    ast.BitOr: operator.or_,
+}
+_UNARY_OPS = {
+    ast.USub: operator.neg,
+    ast.UAdd: operator.pos,
+    ast.Not: operator.invert,
+    ast.Invert: operator.invert,
+}
+_COMPARISONS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+}
+
+
+class ExpressionError(ValueError):
+    """An expression string is malformed, uses unsupported syntax or refers to unknown columns."""
+
+
+def _fail(node: ast.AST, message: str) -> ExpressionError:
+    return ExpressionError(f"{message} (at column {getattr(node, 'col_offset', 0) + 1})")
+
+
+def _parse(text: str) -> ast.expr:
+    try:
+        return ast.parse(text.strip(), mode='eval').body
+    except SyntaxError as e:
+        raise ExpressionError(f"Invalid syntax: {e.msg} (at column {e.offset})") from None
+
+
+def _table_aliases(table_name: str) -> frozenset[str]:
+    """Names an expression may use for the table: 'table' or the table's own name, e.g. 'users' for 'dir.users'."""
+    return frozenset(('table', table_name.rsplit('.', 1)[-1]))
+
+
+class _Validator:
+    """Checks a parsed expression against the grammar and collects the columns it refers to."""
+
+    def __init__(self, aliases: frozenset[str]):
+        self.aliases = aliases
+        self.columns: set[str] = set()
+        self.params: set[str] = set()
+
+    def param(self, node: ast.expr) -> bool:
+        """Return True if node is a parameter reference such as params.min_age, recording the parameter."""
+        if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == PARAMS:
+            if node.attr.startswith('_'):
+                raise _fail(node, f"Invalid parameter name '{node.attr}'")
+            self.params.add(node.attr)
+            return True
+        return False
+
+    def column(self, node: ast.expr) -> bool:
+        """Return True if node is a column reference such as table.col, recording the column."""
+        if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name):
+            if node.value.id not in self.aliases:
+                raise _fail(node, f"Unknown name '{node.value.id}'; refer to columns as 'table.<column>'")
+            if node.attr.startswith('_'):
+                raise _fail(node, f"Invalid column name '{node.attr}'")
+            self.columns.add(node.attr)
+            return True
+        return False
+
+    def literal(self, node: ast.expr) -> None:
+        if self.param(node):
+            return
+        if isinstance(node, ast.Constant) and isinstance(node.value, (str, int, float, bool, type(None))):
+            return
+        if isinstance(node, (ast.List, ast.Tuple)):
+            for elt in node.elts:
+                self.literal(elt)
+            return
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub) and isinstance(node.operand, ast.Constant):
+            return
+        raise _fail(node, "Expected a literal value")
+
+    def visit(self, node: ast.expr) -> None:
+        if self.param(node) or self.column(node):
+            return
+        if isinstance(node, ast.Attribute):
+            if node.attr not in COLUMN_PROPERTIES:
+                raise _fail(node, f"Unsupported attribute '{node.attr}'; allowed: {', '.join(COLUMN_PROPERTIES)}")
+            if not self.column(node.value):
+                raise _fail(node, f"'{node.attr}' can only follow a column reference")
+        elif isinstance(node, ast.Subscript):
+            # JSON path access, e.g. table.metadata['author'] or table.tags[0]
+            self.visit(node.value)
+            self.literal(node.slice)
+        elif isinstance(node, ast.BinOp):
+            if type(node.op) not in _BINARY_OPS:
+                raise _fail(node, f"Unsupported operator {type(node.op).__name__}")
+            self.visit(node.left)
+            self.visit(node.right)
+        elif isinstance(node, ast.UnaryOp):
+            self.visit(node.operand)
+        elif isinstance(node, ast.BoolOp):
+            for value in node.values:
+                self.visit(value)
+        elif isinstance(node, ast.Compare):
+            self.visit(node.left)
+            for op, comparator in zip(node.ops, node.comparators):
+                if isinstance(op, (ast.In, ast.NotIn)):
+                    if not isinstance(comparator, (ast.List, ast.Tuple)) and not self.param(comparator):
+                        raise _fail(comparator, "'in' requires a list of literal values")
+                    self.literal(comparator)
+                elif type(op) in _COMPARISONS:
+                    self.visit(comparator)
+                else:
+                    raise _fail(node, f"Unsupported comparison {type(op).__name__}")
+        else:
+            self.literal(node)
+
+
+def _build(node: ast.expr, table: Any, params: dict) -> Any:
+    """Turn a validated expression tree into a Pixeltable expression over table."""
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, (ast.List, ast.Tuple)):
+        return [_build(elt, table, params) for elt in node.elts]
+    if isinstance(node, ast.Attribute):
+        if isinstance(node.value, ast.Name) and node.value.id == PARAMS:
+            if node.attr not in params:
+                raise ExpressionError(f"Missing value for parameter '{node.attr}'")
+            return params[node.attr]
+        if isinstance(node.value, ast.Name):
+            return getattr(table, node.attr)
+        return getattr(_build(node.value, table, params), node.attr)
+    if isinstance(node, ast.Subscript):
+        return _build(node.value, table, params)[_build(node.slice, table, params)]
+    if isinstance(node, ast.BinOp):
+        return _BINARY_OPS[type(node.op)](_build(node.left, table, params), _build(node.right, table, params))
+    if isinstance(node, ast.UnaryOp):
+        return _UNARY_OPS[type(node.op)](_build(node.operand, table, params))
+    if isinstance(node, ast.BoolOp):
+        combine = operator.and_ if isinstance(node.op, ast.And) else operator.or_
+        return reduce(combine, (_build(value, table, params) for value in node.values))
+    if isinstance(node, ast.Compare):
+        # a < b < c means (a < b) & (b < c), as in Python
+        terms = []
+        left = _build(node.left, table, params)
+        for op, comparator in zip(node.ops, node.comparators):
+            right = _build(comparator, table, params)
+            if isinstance(op, ast.In):
+                terms.append(left.isin(right))
+            elif isinstance(op, ast.NotIn):
+                terms.append(~left.isin(right))
+            else:
+                terms.append(_COMPARISONS[type(op)](left, right))
+            left = right
+        return reduce(operator.and_, terms)
+    raise _fail(node, "Unsupported expression")
+
+
+@dataclass(frozen=True)
+class CompiledExpression:
+    """A validated expression tree and the columns and parameters it refers to."""
+    source: str
+    tree: ast.expr
+    columns: frozenset[str]
+    params: frozenset[str] = frozenset()
+
+    def check_columns(self, column_names: Iterable[str]) -> None:
+        missing = sorted(self.columns - set(column_names))
+        if missing:
+            raise ExpressionError(f"Unknown column(s) {', '.join(missing)} in '{self.source}'")
+
+    def build(self, table: Any, params: Optional[dict] = None) -> Any:
+        return _build(self.tree, table, params or {})
+
+
+@dataclass(frozen=True)
+class CompiledQuery:
+    """A validated query chain: (method, positional args, keyword args) steps over the table."""
+    source: str
+    steps: tuple[tuple[str, tuple[CompiledExpression, ...], tuple[tuple[str, Any], ...]], ...]
+    columns: frozenset[str]
+    params: frozenset[str] = frozenset()
+
+    def check_columns(self, column_names: Iterable[str]) -> None:
+        missing = sorted(self.columns - set(column_names))
+        if missing:
+            raise ExpressionError(f"Unknown column(s) {', '.join(missing)} in '{self.source}'")
+
+    def build(self, table: Any, params: Optional[dict] = None) -> Any:
+        params = params or {}
+        missing = sorted(self.params - set(params))
+        if missing:
+            raise ExpressionError(f"Missing value(s) for parameter(s) {', '.join(missing)}")
+        query = table
+        for method, args, kwargs in self.steps:
+            if method == 'limit':
+                query = query.limit(*(int(arg.build(table, params)) for arg in args))
+            elif method == 'order_by':
+                query = query.order_by(*(arg.build(table, params) for arg in args), **dict(kwargs))
+            else:
+                query = getattr(query, method)(
+                    *(arg.build(table, params) for arg in args),
+                    **{name: expr.build(table, params) for name, expr in kwargs}
+                )
+        return query
+
+
+def _compile_node(node: ast.expr, source: str, aliases: frozenset[str]) -> CompiledExpression:
+    validator = _Validator(aliases)
+    validator.visit(node)
+    return CompiledExpression(source, node, frozenset(validator.columns), frozenset(validator.params))
+
+
+@lru_cache(maxsize=1024)
+def compile_expression(table_name: str, text: str) -> CompiledExpression:
+    """Parse and validate an expression such as "table.pop_2023 - table.pop_2022" for table_name.
+
+    Raises:
+        ExpressionError: If the expression is malformed or uses unsupported syntax.
+    """
+    return _compile_node(_parse(text), text, _table_aliases(table_name))
+
+
+@lru_cache(maxsize=1024)
+def compile_query(table_name: str, text: str) -> CompiledQuery:
+    """Parse and validate a query chain such as "users.where(users.age > 25).select(users.name).limit(10)".
+
+    A leading 'return' is accepted, so function bodies written for the old create_query still compile.
+
+    Raises:
+        ExpressionError: If the query is malformed or uses unsupported syntax.
+    """
+    text = text.strip()
+    if text.startswith('return '):
+        text = text[len('return '):]
+    aliases = _table_aliases(table_name)
+
+    steps = []
+    node = _parse(text)
+    while isinstance(node, ast.Call):
+        if not isinstance(node.func, ast.Attribute) or node.func.attr not in QUERY_METHODS:
+            raise _fail(node, f"Unsupported call; a query may only use {', '.join(QUERY_METHODS)}")
+        steps.append((node.func.attr, node))
+        node = node.func.value
+    if not (isinstance(node, ast.Name) and node.id in aliases):
+        raise _fail(node, "A query must start from the table, e.g. 'table.where(...)'")
+    if not steps:
+        raise _fail(node, "A query must call at least one of " + ', '.join(QUERY_METHODS))
+
+    compiled_steps = []
+    columns, params = set(), set()
+    for method, call in reversed(steps):
+        args = tuple(_compile_node(arg, ast.unparse(arg), aliases) for arg in call.args)
+        if method == 'limit':
+            if len(args) != 1 or not (
+                (isinstance(call.args[0], ast.Constant) and isinstance(call.args[0].value, int)) or args[0].params
+            ) or args[0].columns:
+                raise _fail(call, "limit() takes a single integer or parameter")
+            kwargs = ()
+        elif method == 'order_by':
+            if any(kw.arg != 'asc' or not isinstance(kw.value, ast.Constant) for kw in call.keywords):
+                raise _fail(call, "order_by() only accepts the keyword asc=True/False")
+            kwargs = tuple((kw.arg, kw.value.value) for kw in call.keywords)
+        elif method == 'select':
+            if any(kw.arg is None for kw in call.keywords):
+                raise _fail(call, "select() does not accept **kwargs")
+            kwargs = tuple((kw.arg, _compile_node(kw.value, ast.unparse(kw.value), aliases)) for kw in call.keywords)
+        else:
+            if len(args) != 1 or call.keywords:
+                raise _fail(call, "where() takes a single filter expression")
+            kwargs = ()
+        for compiled in args + tuple(expr for _, expr in kwargs if isinstance(expr, CompiledExpression)):
+            columns |= compiled.columns
+            params |= compiled.params
+        compiled_steps.append((method, args, kwargs))
+    return CompiledQuery(text, tuple(compiled_steps), frozenset(columns), frozenset(params))
+
+
+def to_expr(table_name: str, table: Any, text: str, columns: Iterable[str]) -> Any:
+    """Compile (or fetch from the cache) an expression, check it refers only to columns and build it."""
+    compiled = compile_expression(table_name, text)
+    compiled.check_columns(columns)
+    return compiled.build(table)
@@ -0,0 +1,140 @@
+"""Batched ingestion: insert sessions and file loads.
+
+An insert session lets an agent send a large load over many MCP messages. Appended rows are
+spooled to a JSONL file on disk rather than held in memory, and nothing reaches the table until
+the session is committed. Committing, like loading a CSV, Parquet or JSONL file, inserts the rows
+in fixed-size batches: each batch is its own insert, so a bad row or batch is reported and the
+rest of the load goes ahead.
+"""
+import json
+import os
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Iterator, Optional
+
+DEFAULT_BATCH_SIZE = 1000
+FILE_FORMATS = ('csv', 'parquet', 'jsonl')
+SPOOL_DIR = os.path.join(
+    os.environ.get('PIXELTABLE_HOME', os.path.join(os.path.expanduser('~'), '.pixeltable')), 'insert_sessions'
+)
+
+
+@dataclass
+class InsertSession:
+    session_id: str
+    table_name: str
+    spool_path: str
+    rows: int = 0
+    batches: int = 0
+
+
+@dataclass
+class BatchReport:
+    """Outcome of a load: per-batch results plus totals."""
+    inserted: int = 0
+    failed_rows: int = 0
+    failed_batches: int = 0
+    lines: list[str] = field(default_factory=list)
+
+    def summary(self) -> str:
+        return (f"{self.inserted} rows inserted, {self.failed_rows} rows failed "
+                f"({self.failed_batches} batches failed entirely)")
+
+
+sessions: dict[str, InsertSession] = {}
+
+
+def open_session(table_name: str) -> InsertSession:
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+    session_id = uuid.uuid4().hex[:12]
+    session = InsertSession(session_id, table_name, os.path.join(SPOOL_DIR, f'{session_id}.jsonl'))
+    open(session.spool_path, 'w').close()
+    sessions[session_id] = session
+    return session
+
+
+def append_rows(session: InsertSession, rows: list[dict]) -> None:
+    with open(session.spool_path, 'a') as f:
+        for row in rows:
+            f.write(json.dumps(row, default=str) + '\n')
+    session.rows += len(rows)
+    session.batches += 1
+
+
+def close_session(session: InsertSession) -> None:
+    sessions.pop(session.session_id, None)
+    if os.path.exists(session.spool_path):
+        os.remove(session.spool_path)
+
+
+def _jsonl_batches(path: str, batch_size: int) -> Iterator[list[dict]]:
+    batch = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                batch.append(json.loads(line))
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def _csv_batches(path: str, batch_size: int) -> Iterator[list[dict]]:
+    import pandas as pd
+
+    for chunk in pd.read_csv(path, chunksize=batch_size):
+        # Missing values come back as NaN; Pixeltable expects None
+        yield chunk.astype(object).where(chunk.notna(), None).to_dict('records')
+
+
+def _parquet_batches(path: str, batch_size: int) -> Iterator[list[dict]]:
+    import pyarrow.parquet as pq
+
+    for record_batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+        yield record_batch.to_pylist()
+
+
+def file_format(path: str, fmt: str = '') -> str:
+    fmt = (fmt or os.path.splitext(path)[1].lstrip('.')).lower()
+    fmt = {'ndjson': 'jsonl', 'pq': 'parquet'}.get(fmt, fmt)
+    if fmt not in FILE_FORMATS:
+        raise ValueError(f"Unsupported file format '{fmt}'. Supported formats are: {', '.join(FILE_FORMATS)}")
+    return fmt
+
+
+def file_batches(path: str, fmt: str, batch_size: int) -> Iterator[list[dict]]:
+    """Stream a local file as lists of at most batch_size rows."""
+    if fmt == 'csv':
+        return _csv_batches(path, batch_size)
+    if fmt == 'parquet':
+        return _parquet_batches(path, batch_size)
+    return _jsonl_batches(path, batch_size)
+
+
+def insert_batches(table: Any, batches: Iterator[list[dict]], max_report_lines: int = 20) -> BatchReport:
+    """Insert each batch separately, recording per-batch outcomes instead of stopping at the first error."""
+    report = BatchReport()
+    first_row = 0
+    for i, batch in enumerate(batches, 1):
+        rows = f"rows {first_row}-{first_row + len(batch) - 1}"
+        try:
+            status = table.insert(batch, on_error='ignore')
+            report.inserted += status.num_rows - status.num_excs
+            report.failed_rows += status.num_excs
+            if status.num_excs:
+                report.lines.append(f"Batch {i} ({rows}): {status.num_excs} of {len(batch)} rows failed")
+        except Exception as e:
+            # The whole batch was rejected, e.g. a column missing from the table
+            report.failed_rows += len(batch)
+            report.failed_batches += 1
+            report.lines.append(f"Batch {i} ({rows}): failed: {str(e)}")
+        first_row += len(batch)
+    if len(report.lines) > max_report_lines:
+        omitted = len(report.lines) - max_report_lines
+        report.lines = report.lines[:max_report_lines] + [f"... {omitted} more batches with errors"]
+    return report
+
+
+def get_session(session_id: str) -> Optional[InsertSession]:
+    return sessions.get(session_id)
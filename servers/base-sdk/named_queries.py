@@ -0,0 +1,152 @@
+"""Persistent registry of named, parameterized queries.
+
+Definitions are kept in a JSON file next to the Pixeltable database, so they survive server restarts.
+Each query is compiled once, when it is defined or first run after a restart, and the compiled
+query is reused for every later run. The registry also keeps execution statistics per query.
+
+Statistics are updated in memory on every run and written out every NAMED_QUERIES_FLUSH_SEC seconds
+by a background thread, and at exit, so running a query never waits on file I/O. Definitions are
+written right away. Every write replaces the file atomically.
+"""
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Optional
+
+from expressions import CompiledQuery, compile_query
+
+PIXELTABLE_HOME = os.environ.get('PIXELTABLE_HOME', os.path.join(os.path.expanduser('~'), '.pixeltable'))
+REGISTRY_PATH = os.environ.get('NAMED_QUERIES_PATH', os.path.join(PIXELTABLE_HOME, 'named_queries.json'))
+STATS_FLUSH_SEC = float(os.environ.get('NAMED_QUERIES_FLUSH_SEC', 30))
+
+EMPTY_STATS = {'runs': 0, 'errors': 0, 'total_ms': 0.0, 'last_ms': None, 'last_rows': None, 'last_run': None}
+
+
+class NamedQueryRegistry:
+    """Query definitions ({name: {'table', 'query', 'description', 'stats'}}) backed by a JSON file."""
+
+    def __init__(self, path: str, flush_sec: float = STATS_FLUSH_SEC):
+        self.path = path
+        self.flush_sec = flush_sec
+        self._lock = threading.Lock()
+        # Serializes writes, so an older snapshot never replaces a newer one
+        self._write_lock = threading.Lock()
+        self._dirty = False
+        self._flusher: Optional[threading.Thread] = None
+        self._compiled: dict[str, CompiledQuery] = {}
+        self._queries: dict[str, dict] = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self._queries = json.load(f)
+
+    def _write(self, data: str) -> None:
+        """Replace the registry file with data, through a temp file in the same directory."""
+        directory = os.path.dirname(self.path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.named_queries.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def flush(self) -> None:
+        """Write the registry out if it changed since the last write."""
+        with self._write_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                data = json.dumps(self._queries, indent=2)
+                self._dirty = False
+            try:
+                self._write(data)
+            except BaseException:
+                with self._lock:
+                    self._dirty = True
+                raise
+
+    def _flush_loop(self) -> None:
+        while True:
+            time.sleep(self.flush_sec)
+            try:
+                self.flush()
+            except OSError:
+                # Kept dirty; the next flush tries again
+                pass
+
+    def _start_flusher(self) -> None:
+        """Start the background flush on the first recorded run; called with the lock held."""
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, daemon=True, name='named-queries-flush')
+            self._flusher.start()
+            atexit.register(self.flush)
+
+    def define(self, name: str, table_name: str, query: str, description: str = '') -> CompiledQuery:
+        """Compile and store a query definition, replacing any earlier definition of the same name."""
+        compiled = compile_query(table_name, query)
+        with self._lock:
+            self._queries[name] = {
+                'table': table_name, 'query': query, 'description': description, 'stats': dict(EMPTY_STATS)
+            }
+            self._compiled[name] = compiled
+            self._dirty = True
+        self.flush()
+        return compiled
+
+    def drop(self, name: str) -> bool:
+        with self._lock:
+            self._compiled.pop(name, None)
+            if self._queries.pop(name, None) is None:
+                return False
+            self._dirty = True
+        self.flush()
+        return True
+
+    def get(self, name: str) -> Optional[tuple[dict, CompiledQuery]]:
+        """Return a query's definition and its compiled form, compiling it on first use after a restart."""
+        with self._lock:
+            definition = self._queries.get(name)
+            if definition is None:
+                return None
+            if name not in self._compiled:
+                self._compiled[name] = compile_query(definition['table'], definition['query'])
+            return definition, self._compiled[name]
+
+    def list(self) -> dict[str, dict]:
+        with self._lock:
+            return {name: dict(definition) for name, definition in self._queries.items()}
+
+    def record(self, name: str, elapsed_ms: float, rows: Optional[int], error: bool = False) -> dict:
+        """Add a run to a query's statistics and return the updated statistics."""
+        with self._lock:
+            definition = self._queries.get(name)
+            if definition is None:
+                return dict(EMPTY_STATS)
+            stats = definition['stats']
+            stats['runs'] += 1
+            stats['errors'] += int(error)
+            stats['total_ms'] += elapsed_ms
+            stats['last_ms'] = elapsed_ms
+            stats['last_rows'] = rows
+            stats['last_run'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+            self._dirty = True
+            self._start_flusher()
+            return dict(stats)
+
+
+def format_stats(stats: dict) -> str:
+    if not stats['runs']:
+        return "never run"
+    avg_ms = stats['total_ms'] / stats['runs']
+    # A failed run returns no rows
+    outcome = "error" if stats['last_rows'] is None else f"{stats['last_rows']} rows"
+    return (f"{stats['runs']} runs, {stats['errors']} errors, avg {avg_ms:.1f} ms, "
+            f"last {stats['last_ms']:.1f} ms / {outcome} at {stats['last_run']}")
+
+
+registry = NamedQueryRegistry(REGISTRY_PATH)
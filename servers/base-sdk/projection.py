@@ -0,0 +1,72 @@
+"""Column projection that keeps media and large JSON out of query results.
+
+Selecting an Image column makes Pixeltable load every image, and printing a JSON or Array column
+can dump kilobytes per row into the agent's context. Media columns are therefore returned as
+their file URL, and unless selected explicitly, JSON and Array columns are left out and listed
+instead.
+
+Keyset pagination values are printed as plain text (ISO 8601 for timestamps and dates) and parsed
+back to the ordering column's type, so a printed "Next offset" can be passed back as is.
+"""
+import datetime
+import re
+from typing import Any, Optional
+
+MEDIA_TYPES = ('image', 'video', 'audio', 'document')
+LARGE_TYPES = ('json', 'array')
+
+
+def base_type(type_name: str) -> str:
+    """Reduce a Pixeltable type name such as 'Optional[Image[(224, 224)]]' to 'image'."""
+    name = type_name.lower()
+    for wrapper in ('optional[', 'required['):
+        if name.startswith(wrapper):
+            name = name[len(wrapper):]
+    match = re.match(r'[a-z]+', name)
+    return match.group(0) if match else name
+
+
+def project(table: Any, schema: dict[str, str], select_columns: Optional[list[str]] = None) -> tuple[dict, list[str]]:
+    """Return the select() keyword arguments for a query and the names of the columns left out.
+
+    Args:
+        table: The table or view being queried.
+        schema: {column name: type name} of the table.
+        select_columns: Columns requested explicitly, or None for the default projection.
+    """
+    selected, omitted = {}, []
+    for name in select_columns or list(schema):
+        kind = base_type(schema[name])
+        if kind in MEDIA_TYPES:
+            selected[name] = getattr(table, name).fileurl
+        elif kind in LARGE_TYPES and select_columns is None:
+            omitted.append(name)
+        else:
+            selected[name] = getattr(table, name)
+    return selected, omitted
+
+
+def format_offset(value: Any) -> str:
+    """Render a keyset value the way parse_offset reads it back."""
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return str(value)
+
+
+def parse_offset(value: Any, type_name: str) -> Any:
+    """Convert an offset, as printed by format_offset or given as a JSON number, to the column's type; raises ValueError."""
+    kind = base_type(type_name)
+    try:
+        if kind == 'int':
+            return int(value)
+        if kind == 'float':
+            return float(value)
+        if kind == 'string':
+            return str(value)
+        if kind == 'timestamp' and not isinstance(value, datetime.datetime):
+            return datetime.datetime.fromisoformat(str(value))
+        if kind == 'date' and not isinstance(value, datetime.date):
+            return datetime.date.fromisoformat(str(value))
+    except ValueError:
+        raise ValueError(f"Invalid offset {value!r} for a {kind} column") from None
+    return value
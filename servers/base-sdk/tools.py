@@ -1,6 +1,18 @@
+import os
+import time
+from typing import Any, Optional
+
+import ingest
 import pixeltable as pxt
 from mcp.server.fastmcp import FastMCP
 
+from aggregation import aggregate_query, parse_aggregates
+from catalog import catalog
+from expressions import compile_query, to_expr
+from named_queries import format_stats, registry
+from projection import format_offset, parse_offset, project
+from query_profile import QueryProfile
+
 mcp = FastMCP("Pixeltable")
 
 
@@ -62,11 +74,13 @@ def create_table(table_name: str, columns: dict[str, str]) -> str:
         else:
             return f"Invalid column type: {col_type}. Valid types are: {', '.join(type_mapping.keys())}"
 
-    pxt.create_table(table_name, schema_or_df=converted_columns, if_exists="replace")
-    if table_name in pxt.list_tables():
+    try:
+        table = pxt.create_table(table_name, schema_or_df=converted_columns, if_exists="replace")
+        # A replaced table invalidates any cached handle, and views of it
+        catalog.invalidate(table_name, table)
         return f"Table {table_name} created successfully."
-    else:
-        return f"Table {table_name} creation failed."
+    except Exception as e:
+        return f"Table {table_name} creation failed: {str(e)}"
 
 
 @mcp.tool()
@@ -79,15 +93,119 @@ def insert_data(table_name: str, data: list[dict]) -> str:
         The keys of the dictionary should match the column names and types of the table.
     """
     try:
-        table = pxt.get_table(table_name)
+        table = catalog.table(table_name)
         if table is None:
             return f"Error: Table {table_name} not found."
         table.insert(data)
-        return f"Data inserted successfully."
+        return "Data inserted successfully."
     except Exception as e:
         return f"Error inserting data: {str(e)}"
 
 
+@mcp.tool()
+def open_insert_session(table_name: str) -> str:
+    """Open a session for inserting a large amount of data over several calls.
+
+    Send the rows with append_rows, then call commit_insert_session. Rows are staged on disk
+    and only inserted into the table on commit.
+
+    Args:
+        table_name: The name of the table to insert data into.
+    """
+    try:
+        table = catalog.table(table_name)
+        if table is None:
+            return f"Error: Table {table_name} not found."
+        session = ingest.open_session(table_name)
+        return f"Insert session '{session.session_id}' opened for table '{table_name}'."
+    except Exception as e:
+        return f"Error opening insert session: {str(e)}"
+
+
+@mcp.tool()
+def append_rows(session_id: str, data: list[dict]) -> str:
+    """Append a batch of rows to an open insert session.
+
+    Args:
+        session_id: The session returned by open_insert_session.
+        data: A list of dictionaries, each representing a row of data.
+    """
+    session = ingest.get_session(session_id)
+    if session is None:
+        return f"Error: Insert session '{session_id}' not found."
+    try:
+        # Reject unknown columns now rather than at commit time
+        columns = set(catalog.columns(session.table_name))
+        unknown = sorted({key for row in data for key in row} - columns)
+        if unknown:
+            return f"Error: Unknown column(s) {', '.join(unknown)} in table '{session.table_name}'."
+        ingest.append_rows(session, data)
+        return f"Appended {len(data)} rows to session '{session_id}' ({session.rows} rows in {session.batches} batches)."
+    except Exception as e:
+        return f"Error appending rows: {str(e)}"
+
+
+@mcp.tool()
+def commit_insert_session(session_id: str, batch_size: int = ingest.DEFAULT_BATCH_SIZE) -> str:
+    """Insert all rows of an insert session into its table and close the session.
+
+    Args:
+        session_id: The session returned by open_insert_session.
+        batch_size: Number of rows per insert (default is 1000). Failures are reported per batch.
+    """
+    session = ingest.get_session(session_id)
+    if session is None:
+        return f"Error: Insert session '{session_id}' not found."
+    try:
+        table = catalog.table(session.table_name)
+        report = ingest.insert_batches(table, ingest.file_batches(session.spool_path, 'jsonl', batch_size))
+        ingest.close_session(session)
+        return "\n".join([f"Session '{session_id}' committed to '{session.table_name}': {report.summary()}."]
+                         + report.lines)
+    except Exception as e:
+        return f"Error committing insert session: {str(e)}"
+
+
+@mcp.tool()
+def abort_insert_session(session_id: str) -> str:
+    """Discard an insert session without inserting any of its rows.
+
+    Args:
+        session_id: The session returned by open_insert_session.
+    """
+    session = ingest.get_session(session_id)
+    if session is None:
+        return f"Error: Insert session '{session_id}' not found."
+    ingest.close_session(session)
+    return f"Insert session '{session_id}' aborted; {session.rows} rows discarded."
+
+
+@mcp.tool()
+def load_file(table_name: str, path: str, file_format: str = "", batch_size: int = ingest.DEFAULT_BATCH_SIZE) -> str:
+    """Load rows from a local CSV, Parquet or JSONL file into a table, in batches.
+
+    Args:
+        table_name: The name of the table to insert data into.
+        path: Path of the file on the server. Column names must match the table's columns.
+        file_format: 'csv', 'parquet' or 'jsonl'; by default taken from the file extension.
+        batch_size: Number of rows per insert (default is 1000). Failures are reported per batch.
+
+    Example:
+        load_file("users", "/data/users.parquet")
+    """
+    try:
+        table = catalog.table(table_name)
+        if table is None:
+            return f"Error: Table {table_name} not found."
+        if not os.path.isfile(path):
+            return f"Error: File '{path}' not found."
+        fmt = ingest.file_format(path, file_format)
+        report = ingest.insert_batches(table, ingest.file_batches(path, fmt, batch_size))
+        return "\n".join([f"Loaded '{path}' into '{table_name}': {report.summary()}."] + report.lines)
+    except Exception as e:
+        return f"Error loading file: {str(e)}"
+
+
 @mcp.tool()
 def add_computed_column(table_name: str, column_name: str, expression: str) -> str:
     """Add a computed column to a table in Pixeltable.
@@ -95,28 +213,26 @@ def add_computed_column(table_name: str, column_name: str, expression: str) -> s
     Args:
         table_name: The name of the table to add the computed column to.
         column_name: The name of the computed column to add.
-        expression: A string representation of the Python expression to compute the column.
-                   The expression should refer to other columns in the table using
-                   the notation 'table.column_name'.
+        expression: An expression computing the column from other columns, referred to
+                   as 'table.column_name'. Supports literals, arithmetic, comparisons,
+                   and/or/not, 'in [...]' and JSON access such as table.info['key'].
 
     Example:
         add_computed_column("my_table", "full_name", "table.first_name + ' ' + table.last_name")
         add_computed_column("my_table", "yoy_change", "table.pop_2023 - table.pop_2022")
     """
     try:
-        table = pxt.get_table(table_name)
+        table = catalog.table(table_name)
         if table is None:
             return f"Error: Table {table_name} not found."
 
-        # Replace 'table.' with the actual table reference
-        modified_expr = expression.replace("table.", f"table.")
-
-        # Construct the expression
-        column_expr = eval(modified_expr, {"table": table})
+        # Compile the expression (cached) and check its columns against the schema
+        column_expr = to_expr(table_name, table, expression, catalog.columns(table_name))
 
         # Add the computed column with kwargs format
         kwargs = {column_name: column_expr}
         table.add_computed_column(**kwargs)
+        catalog.invalidate()
 
         return f"Computed column '{column_name}' added successfully to table '{table_name}'."
     except Exception as e:
@@ -138,28 +254,153 @@ def create_view(view_name: str, table_name: str, filter_expr: str = None) -> str
         create_view("adult_users", "users", "table.age >= 18")
     """
     try:
-        table = pxt.get_table(table_name)
+        table = catalog.table(table_name)
         if table is None:
             return f"Error: Table {table_name} not found."
 
         if filter_expr:
-            # Replace 'table.' with the actual table reference
-            modified_expr = filter_expr.replace("table.", f"{table.name}.")
-
-            # Use eval to convert the string expression to a Python expression
-            filter_condition = eval(modified_expr)
+            # Compile the filter (cached) and check its columns against the schema
+            filter_condition = to_expr(table_name, table, filter_expr, catalog.columns(table_name))
 
             # Create the view with the filter
             view = pxt.create_view(view_name, table.where(filter_condition))
         else:
             # Create a view without a filter
             view = pxt.create_view(view_name, table)
+        catalog.invalidate(view_name, view)
 
         return f"View '{view_name}' created successfully."
     except Exception as e:
         return f"Error creating view: {str(e)}"
 
 
+def _execute_query(
+    table_or_view_name: str,
+    select_columns: Optional[list[str]],
+    where_expr: Optional[str],
+    order_by_column: Optional[str],
+    order_asc: bool,
+    limit: Optional[int],
+    group_by: Optional[list[str]],
+    aggregates: Optional[list[str]],
+    sample: Optional[int],
+    offset: Any,
+    profile: Optional[QueryProfile] = None,
+) -> str:
+    """Build and run the query behind execute_query and explain_query, returning the formatted result.
+
+    Raises:
+        ValueError: For invalid arguments, e.g. unknown columns.
+    """
+    profile = profile or QueryProfile()
+
+    with profile.stage('build'):
+        # Get the table or view
+        data_source = catalog.table(table_or_view_name)
+        columns = catalog.columns(table_or_view_name)
+        profile.step(f"source: {table_or_view_name}")
+
+        # Start building the query
+        query = data_source
+
+        # Apply where clause if provided
+        if where_expr:
+            where_condition = to_expr(table_or_view_name, data_source, where_expr, columns)
+            query = query.where(where_condition)
+            profile.step(f"filter: {where_expr}")
+
+    # Aggregate inside Pixeltable, returning only one row per group
+    if group_by or aggregates:
+        if select_columns:
+            raise ValueError("select_columns cannot be combined with group_by/aggregates")
+        for col_name in group_by or []:
+            if col_name not in columns:
+                raise ValueError(f"Column '{col_name}' not found in '{table_or_view_name}'")
+        parsed = parse_aggregates(aggregates or [], columns)
+        profile.step(f"group by: {', '.join(group_by or []) or '(all rows)'}; "
+                     f"aggregates: {', '.join(agg.name for agg in parsed)}")
+        with profile.stage('execute'):
+            df = aggregate_query(data_source, query, group_by or [], parsed, order_by_column, order_asc, limit)
+        with profile.stage('serialize'):
+            result_str = df.to_string()
+        profile.rows['returned'] = len(df)
+        return result_str
+
+    with profile.stage('build'):
+        schema = catalog.schema(table_or_view_name)
+
+        # Apply order by if provided
+        if order_by_column:
+            # Handle ordering on a specific column
+            if order_by_column not in columns:
+                raise ValueError(f"Column '{order_by_column}' not found in '{table_or_view_name}'")
+            order_col = getattr(data_source, order_by_column)
+            if offset is not None:
+                offset = parse_offset(offset, schema[order_by_column])
+                # Keyset pagination: continue after the last row of the previous page
+                query = query.where(order_col > offset if order_asc else order_col < offset)
+                profile.step(f"keyset: {order_by_column} {'>' if order_asc else '<'} {offset!r}")
+            query = query.order_by(order_col, asc=order_asc)
+            profile.step(f"order by: {order_by_column} {'asc' if order_asc else 'desc'}")
+        elif offset is not None:
+            raise ValueError("offset requires order_by_column")
+
+        # Apply limit if provided
+        if limit is not None:
+            query = query.limit(limit)
+            profile.step(f"limit: {limit}")
+
+        # Project the selected columns, or all of them with media as URLs and without large JSON
+        for col_name in select_columns or []:
+            if col_name not in columns:
+                raise ValueError(f"Column '{col_name}' not found in '{table_or_view_name}'")
+        select_kwargs, omitted = project(data_source, schema, select_columns)
+        profile.step(f"select: {', '.join(select_kwargs)}")
+        # The next page's offset is read from the ordering column; if that is not selected, it is
+        # fetched under a name of its own and left out of the printed rows
+        offset_key = None
+        if order_by_column and limit is not None:
+            offset_key = order_by_column
+            if order_by_column not in select_kwargs:
+                offset_key = 'next_offset'
+                while offset_key in select_kwargs:
+                    offset_key += '_'
+                select_kwargs[offset_key] = getattr(data_source, order_by_column)
+        query = query.select(**select_kwargs)
+
+        # Apply random sampling if requested
+        if sample is not None:
+            if order_by_column or limit is not None:
+                raise ValueError("sample cannot be combined with order_by_column or limit")
+            query = query.sample(n=sample)
+            profile.step(f"sample: {sample} rows")
+
+    with profile.stage('execute'):
+        result = query.collect()
+    profile.rows['returned'] = len(result)
+
+    # Convert result to string representation
+    with profile.stage('serialize'):
+        df = result.to_pandas()
+        if offset_key is not None and offset_key != order_by_column:
+            df = df.drop(columns=[offset_key])
+        result_str = df.to_string()
+    if omitted:
+        result_str += f"\n\nOmitted JSON/Array columns (select them explicitly): {', '.join(omitted)}"
+    if offset_key is not None and len(result) == limit:
+        result_str += f"\n\nNext offset: {format_offset(result[offset_key][-1])}"
+    return result_str
+
+
+def _count_rows(profile: QueryProfile, table_or_view_name: str, where_expr: Optional[str]) -> None:
+    """Record how many rows the source holds and how many pass the filter; only run when profiling."""
+    data_source = catalog.table(table_or_view_name)
+    profile.count('in source', data_source)
+    if where_expr:
+        columns = catalog.columns(table_or_view_name)
+        profile.count('matching filter', data_source.where(to_expr(table_or_view_name, data_source, where_expr, columns)))
+
+
 @mcp.tool()
 def execute_query(
     table_or_view_name: str,
@@ -168,83 +409,98 @@ def execute_query(
     order_by_column: str = None,
     order_asc: bool = True,
     limit: int = None,
+    group_by: list[str] = None,
+    aggregates: list[str] = None,
+    sample: int = None,
+    offset: Any = None,
+    profile: bool = False,
 ) -> str:
     """Execute a query on a table or view in Pixeltable.
 
     Args:
         table_or_view_name: The name of the table or view to query.
-        select_columns: List of column names to select. If None, selects all columns.
+        select_columns: List of column names to select. If None, selects all columns except
+                        JSON and Array columns, which are listed instead. Media columns
+                        (Image, Video, Audio, Document) are returned as file URLs.
         where_expr: Optional filter expression as a string.
                     The expression should refer to columns using 'table.column_name'.
-        order_by_column: Optional column name to order the results by.
+        order_by_column: Optional column name to order the results by. With aggregates, a
+                         group_by column or an aggregate output name such as 'avg_age'.
         order_asc: Whether to order ascending (True) or descending (False).
         limit: Maximum number of rows to return.
+        group_by: Optional list of columns to group by. Returns one row per group.
+        aggregates: Optional list of aggregates computed per group (or over all rows without
+                    group_by): count(*), count(col), sum(col), avg(col), min(col), max(col),
+                    count_distinct(col) (nulls are not counted). Output columns are named e.g. 'count',
+                    'avg_age'.
+        sample: Optional number of rows to return, drawn at random. Cannot be combined with ordering.
+        offset: Optional pagination cursor: only rows whose order_by_column value comes after this
+                value are returned. Pass the 'Next offset' from the previous page as is; it is
+                plain text (ISO 8601 for timestamps) and converted to the column's type.
+                order_by_column should be unique.
+        profile: Append a summary of the request, row counts and per-stage timings to the result.
 
     Example:
         execute_query("users", ["name", "email"], "table.age > 25", "name", True, 10)
+        execute_query("users", group_by=["city"], aggregates=["count(*)", "avg(age)"],
+                      order_by_column="count", order_asc=False, limit=5)
+        execute_query("users", order_by_column="id", limit=100, offset=1200)
     """
     try:
-        # Get the table or view
-        data_source = pxt.get_table(table_or_view_name)
-        if data_source is None:
-            data_source = pxt.get_view(table_or_view_name)
-            if data_source is None:
-                return f"Error: Table or view '{table_or_view_name}' not found."
-
-        # Start building the query
-        query = data_source
-
-        # Apply where clause if provided
-        if where_expr:
-            modified_expr = where_expr.replace("table.", f"{data_source.name}.")
-            where_condition = eval(modified_expr)
-            query = query.where(where_condition)
+        query_profile = QueryProfile() if profile else None
+        result_str = _execute_query(table_or_view_name, select_columns, where_expr, order_by_column, order_asc,
+                                    limit, group_by, aggregates, sample, offset, query_profile)
+        if query_profile:
+            _count_rows(query_profile, table_or_view_name, where_expr)
+            result_str += f"\n\n{query_profile.report()}"
+        return f"Query executed successfully:\n\n{result_str}"
 
-        # Apply order by if provided
-        if order_by_column:
-            # Handle ordering on a specific column
-            if hasattr(data_source, order_by_column):
-                order_col = getattr(data_source, order_by_column)
-                query = query.order_by(order_col, asc=order_asc)
-            else:
-                return f"Error: Column '{order_by_column}' not found in '{table_or_view_name}'."
+    except Exception as e:
+        return f"Error executing query: {str(e)}"
 
-        # Apply limit if provided
-        if limit is not None:
-            query = query.limit(limit)
 
-        # Apply select if provided
-        if select_columns:
-            select_args = []
-            for col_name in select_columns:
-                if hasattr(data_source, col_name):
-                    select_args.append(getattr(data_source, col_name))
-                else:
-                    return f"Error: Column '{col_name}' not found in '{table_or_view_name}'."
-
-            # Execute the query with select
-            result = query.select(*select_args).collect()
-        else:
-            # Execute the query for all columns
-            result = query.collect()
+@mcp.tool()
+def explain_query(
+    table_or_view_name: str,
+    select_columns: list[str] = None,
+    where_expr: str = None,
+    order_by_column: str = None,
+    order_asc: bool = True,
+    limit: int = None,
+    group_by: list[str] = None,
+    aggregates: list[str] = None,
+    sample: int = None,
+    offset: Any = None,
+) -> str:
+    """Run a query as execute_query would and report how it ran instead of its rows.
 
-        # Convert result to string representation
-        result_str = result.to_pandas().to_string()
-        return f"Query executed successfully:\n\n{result_str}"
+    Takes the same arguments as execute_query. Returns a summary of the request, the rows in the source,
+    matching the filter and returned, and the time spent building, executing and serializing.
 
+    Example:
+        explain_query("users", ["name"], "table.age > 25", "name", True, 10)
+    """
+    try:
+        query_profile = QueryProfile()
+        _execute_query(table_or_view_name, select_columns, where_expr, order_by_column, order_asc,
+                       limit, group_by, aggregates, sample, offset, query_profile)
+        _count_rows(query_profile, table_or_view_name, where_expr)
+        return f"Query profile for '{table_or_view_name}':\n\n{query_profile.report()}"
     except Exception as e:
-        return f"Error executing query: {str(e)}"
+        return f"Error explaining query: {str(e)}"
 
 
 @mcp.tool()
-def create_query(query_name: str, table_name: str, query_function: str) -> str:
-    """Create a named query in Pixeltable.
+def create_query(query_name: str, table_name: str, query_function: str, description: str = "") -> str:
+    """Create a named query in Pixeltable. The query is stored persistently and can be run with run_query.
 
     Args:
-        query_name: The name of the query to create.
+        query_name: The name of the query to create. An existing query of the same name is replaced.
         table_name: The name of the table the query will operate on.
-        query_function: A string representation of the query function body.
-                       Should be a function that returns a query result.
+        query_function: The query, as a chain of where/select/order_by/limit calls on the table.
+                        A leading 'return' is allowed. Parameters are referred to as 'params.<name>'
+                        and supplied to run_query.
+        description: Optional description of what the query returns.
 
     Example:
         create_query(
@@ -252,22 +508,80 @@ def create_query(query_name: str, table_name: str, query_function: str) -> str:
             "users",
             "return users.where(users.is_active == True).select(users.name, users.email)"
         )
+        create_query(
+            "users_older_than",
+            "users",
+            "users.where(users.age > params.min_age).select(users.name).limit(params.n)"
+        )
     """
     try:
-        table = pxt.get_table(table_name)
+        table = catalog.table(table_name)
         if table is None:
             return f"Error: Table {table_name} not found."
 
-        # Create a function definition
-        func_def = f"""
-        @{table.name}.query
-        def {query_name}():
-            {query_function}
-        """
-
-        # Execute the function definition
-        exec(func_def)
+        # Compile the query (cached) and check its columns against the schema before storing it
+        compiled = compile_query(table_name, query_function)
+        compiled.check_columns(catalog.columns(table_name))
+        registry.define(query_name, table_name, query_function, description)
 
-        return f"Query '{query_name}' created successfully for table '{table_name}'."
+        params = f" with parameters: {', '.join(sorted(compiled.params))}" if compiled.params else ""
+        return f"Query '{query_name}' created successfully for table '{table_name}'{params}."
     except Exception as e:
         return f"Error creating query: {str(e)}"
+
+
+@mcp.tool()
+def run_query(query_name: str, params: dict = None) -> str:
+    """Run a named query created with create_query.
+
+    Args:
+        query_name: The name of the query to run.
+        params: Values for the query's parameters, e.g. {"min_age": 30, "n": 10}.
+
+    Example:
+        run_query("users_older_than", {"min_age": 30, "n": 10})
+    """
+    entry = registry.get(query_name)
+    if entry is None:
+        return f"Error: Query '{query_name}' not found. Use list_queries to see the available queries."
+    definition, compiled = entry
+
+    start = time.perf_counter()
+    try:
+        table = catalog.table(definition['table'])
+        compiled.check_columns(catalog.columns(definition['table']))
+        result = compiled.build(table, params).collect()
+    except Exception as e:
+        registry.record(query_name, (time.perf_counter() - start) * 1000, None, error=True)
+        return f"Error running query '{query_name}': {str(e)}"
+    stats = registry.record(query_name, (time.perf_counter() - start) * 1000, len(result))
+
+    result_str = result.to_pandas().to_string()
+    return f"Query '{query_name}' returned {len(result)} rows ({format_stats(stats)}):\n\n{result_str}"
+
+
+@mcp.tool()
+def list_queries() -> str:
+    """List the named queries with their definitions, parameters and execution statistics."""
+    queries = registry.list()
+    if not queries:
+        return "No named queries defined."
+    result_str = "Named queries:\n\n"
+    for name, definition in sorted(queries.items()):
+        result_str += f"- {name} on '{definition['table']}': {definition['query']}\n"
+        if definition['description']:
+            result_str += f"  {definition['description']}\n"
+        result_str += f"  Stats: {format_stats(definition['stats'])}\n"
+    return result_str
+
+
+@mcp.tool()
+def drop_query(query_name: str) -> str:
+    """Delete a named query.
+
+    Args:
+        query_name: The name of the query to delete.
+    """
+    if registry.drop(query_name):
+        return f"Query '{query_name}' deleted."
+    return f"Error: Query '{query_name}' not found."
@@ -0,0 +1,82 @@
+"""Measure how soon a freshly started server serves: time to first byte on /sse and to the first tool result.
+
+Usage:
+    python bench_startup.py --runs 3 --modes lazy eager
+
+Starts `python server.py` from this directory for every run, polls GET /sse until the first byte of
+the event stream arrives, then calls list_tables over MCP and times its result. That result waits
+for the deferred imports (see lazy_imports.py) unless the background warm-up has finished them.
+'eager' sets EAGER_IMPORTS=1, which imports everything before the server binds, as before.
+"""
+import argparse
+import asyncio
+import http.client
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+
+
+def first_byte(port: int, deadline: float) -> float:
+    """Poll /sse until it returns a byte; returns the time it arrived."""
+    while time.perf_counter() < deadline:
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+        try:
+            connection.request('GET', '/sse')
+            response = connection.getresponse()
+            if response.status == 200 and response.read(1):
+                return time.perf_counter()
+        except OSError:
+            time.sleep(0.05)
+        finally:
+            connection.close()
+    raise TimeoutError(f"No response on port {port}")
+
+
+async def first_tool(port: int) -> str:
+    async with sse_client(f'http://127.0.0.1:{port}/sse') as (read_stream, write_stream):
+        async with ClientSession(read_stream, write_stream) as session:
+            await session.initialize()
+            result = await session.call_tool('list_tables', {})
+            return ''.join(content.text for content in result.content if content.type == 'text')
+
+
+def run(mode: str, port: int, timeout: float) -> tuple[float, float]:
+    env = {**os.environ, 'EAGER_IMPORTS': '1' if mode == 'eager' else '0'}
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, 'server.py', '--host', '127.0.0.1', '--port', str(port)], env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        ttfb = first_byte(port, start + timeout) - start
+        asyncio.run(first_tool(port))
+        return ttfb, time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark server startup")
+    parser.add_argument("--runs", type=int, default=3, help="Server starts per mode")
+    parser.add_argument("--modes", nargs="+", default=['lazy', 'eager'], choices=['lazy', 'eager'])
+    parser.add_argument("--port", type=int, default=8090, help="Port to start the server on")
+    parser.add_argument("--timeout", type=float, default=300, help="Seconds to wait for a server to answer")
+    args = parser.parse_args()
+
+    print(f"{'mode':<8}{'run':>7}{'first byte /sse (s)':>22}{'first tool result (s)':>24}")
+    for mode in args.modes:
+        results = []
+        for i in range(1, args.runs + 1):
+            ttfb, tool = run(mode, args.port, args.timeout)
+            results.append((ttfb, tool))
+            print(f"{mode:<8}{i:>7}{ttfb:>22.2f}{tool:>24.2f}")
+        print(f"{mode:<8}{'median':>7}{statistics.median(r[0] for r in results):>22.2f}"
+              f"{statistics.median(r[1] for r in results):>24.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+from typing import Optional
+
+import pixeltable as pxt
+
+# Separators understood by DocumentSplitter; 'heading' applies to HTML and Markdown, 'page' to PDFs
+SEPARATORS = ('heading', 'page', 'paragraph', 'sentence', 'token_limit', 'char_limit')
+# Structural metadata stored on every chunk
+METADATA = 'title,heading,page'
+
+
+@pxt.udf
+def section_title(heading: Optional[dict]) -> Optional[str]:
+    """Return the top-level heading a chunk belongs to, e.g. 'Installation' for {'h1': 'Installation', 'h2': 'Linux'}."""
+    if not heading:
+        return None
+    for level in sorted(heading):
+        if heading[level]:
+            return heading[level]
+    return None
+
+
+@pxt.udf
+def section_path(heading: Optional[dict]) -> Optional[str]:
+    """Return the full heading path of a chunk, e.g. 'Installation > Linux'."""
+    if not heading:
+        return None
+    return ' > '.join(heading[level] for level in sorted(heading) if heading[level]) or None
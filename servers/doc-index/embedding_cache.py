@@ -0,0 +1,85 @@
+"""Sentence embeddings with a persistent cache keyed by content hash.
+
+Re-inserting a revised document re-chunks it, but the chunks whose text did not change are served
+from the cache instead of going through the model again, so only new or edited chunks are embedded.
+Query strings go through the same embedding function but are only kept in the bounded in-memory LRU
+of e5_model.py, so the persistent cache grows with the indexed content and not with query traffic.
+"""
+import os
+import sqlite3
+import threading
+from functools import lru_cache
+
+import numpy as np
+import pixeltable as pxt
+from pixeltable.func import Batch
+
+from e5_model import EMBEDDING_DIMS, content_hash, encode, recent_queries
+
+CACHE_PATH = os.path.join('doc_index', 'embedding_cache.sqlite')
+
+
+class EmbeddingCache:
+    """SQLite-backed map from content hash to float32 embedding."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS embeddings (hash TEXT PRIMARY KEY, vector BLOB NOT NULL)')
+
+    def get_many(self, hashes: list[str]) -> dict[str, np.ndarray]:
+        found = {}
+        with self._lock:
+            # Stay well below SQLite's limit on the number of bound parameters
+            for i in range(0, len(hashes), 500):
+                batch = hashes[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE hash IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                found.update((h, np.frombuffer(v, dtype=np.float32)) for h, v in rows)
+        return found
+
+    def put_many(self, items: dict[str, np.ndarray]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO embeddings (hash, vector) VALUES (?, ?)',
+                [(h, np.asarray(v, dtype=np.float32).tobytes()) for h, v in items.items()]
+            )
+
+
+@lru_cache(maxsize=None)
+def _cache() -> EmbeddingCache:
+    return EmbeddingCache(CACHE_PATH)
+
+
+def embed_texts(texts: list[str], persist: bool = True) -> list[np.ndarray]:
+    """Embed texts, computing only those whose content hash is not cached yet.
+
+    Args:
+        texts: The texts to embed.
+        persist: Whether to store new embeddings in the persistent cache (document chunks) or only
+            in the in-memory LRU (queries, which the search then finds there).
+    """
+    hashes = [content_hash(text) for text in texts]
+    found = recent_queries.get_many(list(set(hashes)))
+    found.update(_cache().get_many([h for h in set(hashes) if h not in found]))
+    missing = {h: text for h, text in zip(hashes, texts) if h not in found}
+    if missing:
+        computed = encode(list(missing.values()))
+        (_cache() if persist else recent_queries).put_many(computed)
+        found.update(computed)
+    return [found[h] for h in hashes]
+
+
+@pxt.udf(batch_size=32)
+def cached_e5_embedding(sentences: Batch[str]) -> Batch[pxt.Array[(EMBEDDING_DIMS,), pxt.Float]]:
+    """e5-large-v2 sentence embedding, served from the content-hash cache when possible."""
+    return embed_texts(sentences)
+
+
+@pxt.udf
+def text_hash(text: str) -> str:
+    """SHA-256 of a chunk's text, used to tell which chunks changed between revisions."""
+    return content_hash(text)
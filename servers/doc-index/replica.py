@@ -0,0 +1,215 @@
+"""Read-only replicas that serve queries from snapshots published by a writer server.
+
+A writer started with SNAPSHOT_DIR and SNAPSHOT_INTERVAL_MINUTES checks every index it has loaded
+at that interval and exports those whose tables changed since their last snapshot (by Pixeltable
+table version) to SNAPSHOT_DIR/<index>/<timestamp>/ (see snapshot.py), then points
+SNAPSHOT_DIR/<index>/LATEST at it, so readers never see a half-written export. The two most recent
+snapshots of each index are kept.
+
+A replica started with REPLICA_OF=<the writer's SNAPSHOT_DIR> imports the latest snapshot of every
+index in the background and checks for newer ones every REPLICA_REFRESH_MINUTES. Each snapshot is
+imported into a Pixeltable directory of its own. Queries switch to it once it is fully loaded, and
+the previous one is dropped a refresh later so that running queries can finish. A replica rejects
+setup and insert calls. It refuses queries on an index whose snapshot is older than
+REPLICA_MAX_STALENESS_MINUTES, so that clients can fail over to a fresher replica or the writer.
+"""
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from typing import Any, Callable, Hashable, Optional
+
+from index_maintenance import MaintenanceScheduler
+
+logger = logging.getLogger('replica')
+
+SNAPSHOT_DIR = os.environ.get('SNAPSHOT_DIR', '')
+SNAPSHOT_INTERVAL_MINUTES = float(os.environ.get('SNAPSHOT_INTERVAL_MINUTES', '15'))
+LATEST = 'LATEST'
+KEEP_SNAPSHOTS = 2
+
+
+def publish(snapshot_dir: str, table_name: str, export: Callable[[str], None]) -> str:
+    """Export an index to a new snapshot directory, make it the latest one and prune older ones."""
+    # Pixeltable and snapshot.py are imported on use, so that servers start without them (see lazy_imports.py)
+    from snapshot import MANIFEST, release_vectors
+
+    index_dir = os.path.join(snapshot_dir, table_name)
+    path = os.path.join(index_dir, time.strftime('%Y%m%dT%H%M%S'))
+    try:
+        export(path)
+    except Exception:
+        # A partial export has no manifest, so it would never be pruned
+        release_vectors(path)
+        shutil.rmtree(path, ignore_errors=True)
+        raise
+    pointer = os.path.join(index_dir, f'{LATEST}.tmp')
+    with open(pointer, 'w') as f:
+        f.write(os.path.basename(path))
+    os.replace(pointer, os.path.join(index_dir, LATEST))
+    snapshots = sorted(name for name in os.listdir(index_dir) if os.path.isfile(os.path.join(index_dir, name, MANIFEST)))
+    for name in snapshots[:-KEEP_SNAPSHOTS]:
+        release_vectors(os.path.join(index_dir, name))
+        shutil.rmtree(os.path.join(index_dir, name), ignore_errors=True)
+    return path
+
+
+def latest(index_dir: str) -> Optional[str]:
+    """The latest published snapshot of an index, or None if there is none yet."""
+    try:
+        with open(os.path.join(index_dir, LATEST)) as f:
+            return os.path.join(index_dir, f.read().strip())
+    except FileNotFoundError:
+        return None
+
+
+def table_versions(*tables: Any) -> tuple[int, ...]:
+    """The Pixeltable versions of an index's tables and views, which change with every change to their rows."""
+    return tuple(table.get_metadata()['version'] for table in tables)
+
+
+publisher = MaintenanceScheduler()
+
+
+def start_publishing(indexes: Callable[[], list[str]], export: Callable[[str, str], None],
+                     version: Callable[[str], Hashable]) -> None:
+    """Publish snapshots of the given indexes periodically, if this server is a writer with SNAPSHOT_DIR set.
+
+    Args:
+        indexes: Returns the names of the indexes to publish.
+        export: Exports the index with the given name to the given directory.
+        version: Returns the version of the index with the given name (see table_versions); an index is
+            only published again once its version differs from the one of its last snapshot.
+    """
+    if not SNAPSHOT_DIR:
+        return
+    # Version of each index at its last snapshot from this process; every index is published once after a start
+    published: dict[str, Hashable] = {}
+
+    def publish_all() -> None:
+        for table_name in indexes():
+            try:
+                # Read before exporting, so that changes made during the export are published next time
+                current = version(table_name)
+                if published.get(table_name) == current:
+                    continue
+                path = publish(SNAPSHOT_DIR, table_name, lambda path: export(table_name, path))
+                published[table_name] = current
+                logger.info(f"Published snapshot of '{table_name}' to '{path}'")
+            except Exception as e:
+                logger.error(f"Publishing a snapshot of '{table_name}' failed: {e}")
+
+    publisher.start(SNAPSHOT_INTERVAL_MINUTES / 60, publish_all)
+
+
+class Replica:
+    def __init__(self, source: str, max_staleness_minutes: float, refresh_minutes: float):
+        self.source = source
+        self.max_staleness_minutes = max_staleness_minutes
+        self.refresh_minutes = refresh_minutes
+        self._lock = threading.Lock()
+        # Snapshot served for each index: {table name: (snapshot path, exported_ts)}
+        self._loaded: dict[str, tuple[str, float]] = {}
+        # Pixeltable directories holding the imported snapshots of each index, with their snapshot paths, oldest first
+        self._generations: dict[str, list[tuple[str, str]]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.source)
+
+    def start(self, directory: str, load: Callable[[str, str, str], None]) -> None:
+        """Load the latest snapshots and keep refreshing them in a daemon thread.
+
+        Args:
+            directory: The server's Pixeltable directory; snapshots are imported next to it.
+            load: load(export_path, table_name, table_path) imports a snapshot under table_path
+                and serves it as the index table_name.
+        """
+        if self.enabled:
+            threading.Thread(target=self._loop, args=(directory, load), daemon=True).start()
+
+    def _loop(self, directory: str, load: Callable[[str, str, str], None]) -> None:
+        import pixeltable as pxt
+
+        # Snapshots imported by a previous run are never served again
+        for path in pxt.list_dirs():
+            if path.startswith(f'{directory}_replica_'):
+                pxt.drop_dir(path, force=True)
+        while True:
+            try:
+                self.refresh(directory, load)
+            except Exception as e:
+                logger.error(f"Refreshing replica from '{self.source}' failed: {e}")
+            time.sleep(self.refresh_minutes * 60)
+
+    def refresh(self, directory: str, load: Callable[[str, str, str], None]) -> None:
+        """Import the latest snapshot of every index that has a newer one than the one being served."""
+        import pixeltable as pxt
+        from snapshot import MANIFEST, release_vectors
+
+        for table_name in sorted(os.listdir(self.source)):
+            path = latest(os.path.join(self.source, table_name))
+            with self._lock:
+                current = self._loaded.get(table_name)
+            if path is None or (current is not None and current[0] == path):
+                continue
+            with open(os.path.join(path, MANIFEST)) as f:
+                exported_ts = json.load(f)['exported_ts']
+
+            generation = f'{directory}_replica_{table_name}_{os.path.basename(path)}'
+            pxt.drop_dir(generation, force=True, if_not_exists='ignore')
+            pxt.create_dir(generation)
+            try:
+                load(path, table_name, f'{generation}.{table_name}')
+            except Exception as e:
+                logger.error(f"Importing snapshot '{path}' failed: {e}")
+                pxt.drop_dir(generation, force=True, if_not_exists='ignore')
+                continue
+            logger.info(f"Replica now serves '{table_name}' from snapshot '{path}'")
+
+            with self._lock:
+                self._loaded[table_name] = (path, exported_ts)
+                generations = self._generations.setdefault(table_name, [])
+                generations.append((generation, path))
+                expired, generations[:] = generations[:-2], generations[-2:]
+            for old, old_path in expired:
+                pxt.drop_dir(old, force=True, if_not_exists='ignore')
+                release_vectors(old_path)
+
+    def check(self, table_name: str) -> Optional[str]:
+        """An error if the snapshot served for an index is older than the staleness bound."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            loaded = self._loaded.get(table_name)
+        if loaded is None:
+            return None
+        age_minutes = (time.time() - loaded[1]) / 60
+        if age_minutes > self.max_staleness_minutes:
+            return (f"Error: This replica's snapshot of '{table_name}' is {age_minutes:.0f} minutes old, "
+                    f"over the {self.max_staleness_minutes:g} minute staleness bound.")
+        return None
+
+    def read_only_error(self) -> str:
+        return f"Error: This server is a read-only replica of '{self.source}'; send setup and insert calls to the writer."
+
+    def describe(self) -> str:
+        with self._lock:
+            loaded = dict(self._loaded)
+        if not loaded:
+            return f"Replica of '{self.source}': no snapshots loaded yet."
+        lines = [f"Replica of '{self.source}' (staleness bound {self.max_staleness_minutes:g} minutes):"]
+        for table_name, (path, exported_ts) in sorted(loaded.items()):
+            lines.append(f"  {table_name}: snapshot {os.path.basename(path)}, "
+                         f"{(time.time() - exported_ts) / 60:.0f} minutes old")
+        return "\n".join(lines)
+
+
+_max_staleness = float(os.environ.get('REPLICA_MAX_STALENESS_MINUTES', '60'))
+replica = Replica(
+    os.environ.get('REPLICA_OF', ''),
+    _max_staleness,
+    float(os.environ.get('REPLICA_REFRESH_MINUTES', '0')) or _max_staleness / 4,
+)
@@ -0,0 +1,258 @@
+"""Portable snapshots of an index, for moving it to another environment without recomputing it.
+
+An export is a directory with a manifest, one Parquet file per table or view of the index and one
+Arrow IPC file per embedded text column. The Parquet files hold the stored values the server
+reads back: transcripts, descriptions, chunk texts and their metadata. Media columns are exported
+as URLs, so the media itself must be reachable from the importing node. The IPC files hold the
+text hash and embedding vector of every distinct indexed text. They are uncompressed, so an
+import memory-maps them instead of reading them into memory.
+
+An import recreates every table and view as a plain table holding the exported values, so no
+transcription, captioning or chunking runs again. Its embedding indexes are built with
+snapshot_embedding, which takes each vector from the memory-mapped files or the shared query LRU
+(see e5_model.py) and only runs the model for texts it finds in neither. Imported indexes are read-only snapshots: their
+rows no longer come from computed columns, so they cannot index new media.
+"""
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Optional
+
+import numpy as np
+import pixeltable as pxt
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pixeltable.func import Batch
+
+from e5_model import EMBEDDING_DIMS, EMBEDDING_MODEL, content_hash, encode, recent_queries
+
+SNAPSHOT_FORMAT = 1
+MANIFEST = 'manifest.json'
+BATCH_SIZE = 1000
+
+COLUMN_TYPES = {
+    'String': pxt.String, 'Int': pxt.Int, 'Float': pxt.Float, 'Bool': pxt.Bool,
+    'Timestamp': pxt.Timestamp, 'Json': pxt.Json,
+    'Audio': pxt.Audio, 'Video': pxt.Video, 'Image': pxt.Image, 'Document': pxt.Document,
+}
+MEDIA_TYPES = ('Audio', 'Video', 'Image', 'Document')
+
+# Vectors of the snapshots loaded by this process, by export directory (a generation) and text hash.
+# They are rows of memory-mapped files, which stay open until their generation is released.
+_vectors: dict[str, dict[str, np.ndarray]] = {}
+# The export directory of the last export of each index written by this process, whose vectors it keeps
+_exported: dict[str, str] = {}
+_lock = threading.Lock()
+
+
+def embed_texts(texts: list[str]) -> list[np.ndarray]:
+    """Embed texts, taking the vectors of recent queries and loaded snapshots where there are any."""
+    hashes = [content_hash(text) for text in texts]
+    with _lock:
+        # Newest generation first
+        generations = list(reversed(_vectors.values()))
+    found = recent_queries.get_many(list(set(hashes)))
+    for h in set(hashes) - set(found):
+        vector = next((vectors[h] for vectors in generations if h in vectors), None)
+        if vector is not None:
+            found[h] = vector
+    missing = {h: text for h, text in zip(hashes, texts) if h not in found}
+    if missing:
+        found.update(encode(list(missing.values())))
+    return [found[h] for h in hashes]
+
+
+@pxt.udf(batch_size=32)
+def snapshot_embedding(sentences: Batch[str]) -> Batch[pxt.Array[(EMBEDDING_DIMS,), pxt.Float]]:
+    """e5-large-v2 sentence embedding, served from the vectors of loaded snapshots when possible."""
+    return embed_texts(sentences)
+
+
+def _columns(table: Any, schema: dict[str, str]) -> dict[str, str]:
+    """The columns of schema the table has; indexes created before a column existed lack it."""
+    existing = table.get_metadata()['schema']
+    return {col: col_type for col, col_type in schema.items() if col in existing}
+
+
+def _write_vectors(file: str, texts: list[str], embed: Callable[[list[str]], list[np.ndarray]]) -> dict:
+    unique = {content_hash(text): text for text in texts if text}
+    hashes = list(unique)
+    vectors = []
+    for i in range(0, len(hashes), BATCH_SIZE):
+        vectors.extend(embed([unique[h] for h in hashes[i:i + BATCH_SIZE]]))
+    dims = len(vectors[0]) if vectors else EMBEDDING_DIMS
+    flat = np.asarray(vectors, dtype=np.float32).reshape(-1)
+    table = pa.table({
+        'hash': pa.array(hashes, type=pa.string()),
+        'vector': pa.FixedSizeListArray.from_arrays(pa.array(flat, type=pa.float32()), dims),
+    })
+    # Uncompressed, so that importing memory-maps the vectors instead of decoding them
+    with pa.OSFile(file, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    # Later exports from this process then only embed the texts that are new since this one
+    load_vectors(file)
+    return {'file': os.path.basename(file), 'vectors': len(hashes), 'dims': dims}
+
+
+def prepare_export(path: str) -> None:
+    """Create the export directory; an existing export is never overwritten."""
+    if os.path.exists(os.path.join(path, MANIFEST)):
+        raise ValueError(f"'{path}' already holds an export")
+    os.makedirs(path, exist_ok=True)
+
+
+def export_table(path: str, name: str, table: Any, schema: dict[str, str], embedded: tuple = (),
+                 embed: Callable[[list[str]], list[np.ndarray]] = embed_texts) -> dict:
+    """Write a table or view to {name}.parquet, and the vectors of its embedded text columns to IPC files.
+
+    Args:
+        path: The export directory.
+        name: Name of the table within the export, e.g. '_chunks' for the chunks view.
+        table: The table or view.
+        schema: {column: type name from COLUMN_TYPES} of the columns to export.
+        embedded: Text columns with an embedding index.
+        embed: Computes the vectors of texts, e.g. from an embedding cache.
+
+    Returns:
+        The table's manifest entry.
+    """
+    schema = _columns(table, schema)
+    select = {col: getattr(table, col).fileurl if col_type in MEDIA_TYPES else getattr(table, col)
+              for col, col_type in schema.items()}
+    rows = table.select(**select).collect().to_pandas()
+    for col, col_type in schema.items():
+        if col_type == 'Json':
+            rows[col] = rows[col].map(lambda value: None if value is None else json.dumps(value))
+    pq.write_table(pa.Table.from_pandas(rows, preserve_index=False), os.path.join(path, f'{name}.parquet'))
+
+    vectors = {col: _write_vectors(os.path.join(path, f'{name}.{col}.arrow'), rows[col].tolist(), embed)
+               for col in embedded if col in schema}
+    return {'name': name, 'schema': schema, 'rows': len(rows), 'embedded': vectors}
+
+
+def write_manifest(path: str, server: str, index: str, config: dict, tables: list[dict]) -> dict:
+    """Complete an export; the vectors of the previous export of the index from this process are released."""
+    now = time.time()
+    manifest = {
+        'format': SNAPSHOT_FORMAT, 'server': server, 'index': index, 'config': config,
+        'embedding_model': EMBEDDING_MODEL, 'exported_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(now)),
+        'exported_ts': now, 'tables': tables,
+    }
+    with open(os.path.join(path, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    with _lock:
+        previous = _exported.get(index)
+        _exported[index] = os.path.abspath(path)
+    if previous is not None and previous != _exported[index]:
+        release_vectors(previous)
+    return manifest
+
+
+def read_manifest(path: str, server: str) -> dict:
+    with open(os.path.join(path, MANIFEST)) as f:
+        manifest = json.load(f)
+    if manifest.get('format') != SNAPSHOT_FORMAT:
+        raise ValueError(f"unsupported snapshot format {manifest.get('format')}")
+    if manifest.get('server') != server:
+        raise ValueError(f"snapshot was exported by the {manifest.get('server')} server, not {server}")
+    return manifest
+
+
+def load_vectors(file: str) -> int:
+    """Memory-map an IPC vector file and make its vectors available to snapshot_embedding.
+
+    The vectors belong to the generation of the file's export directory, see release_vectors.
+    """
+    vectors = pa.ipc.open_file(pa.memory_map(file, 'r')).read_all()
+    loaded = {}
+    for batch in vectors.to_batches():
+        dims = batch.schema.field('vector').type.list_size
+        matrix = batch.column(1).flatten().to_numpy(zero_copy_only=True).reshape(-1, dims)
+        loaded.update(zip(batch.column(0).to_pylist(), matrix))
+    with _lock:
+        _vectors.setdefault(os.path.dirname(os.path.abspath(file)), {}).update(loaded)
+    return len(loaded)
+
+
+def release_vectors(path: str) -> None:
+    """Forget the vectors loaded from an export directory, so that its files are unmapped once unused.
+
+    Called when the export is replaced or pruned, or when the tables imported from it are dropped.
+    """
+    with _lock:
+        _vectors.pop(os.path.abspath(path), None)
+
+
+def import_table(path: str, entry: dict, table_path: str, comment: str = '') -> Any:
+    """Create a plain table from an exported table, with its embedding indexes built from the exported vectors."""
+    schema = entry['schema']
+    table = pxt.create_table(
+        table_path, {col: COLUMN_TYPES[col_type] for col, col_type in schema.items()},
+        comment=comment,
+        # Media is only read when a query needs it, so it need not be reachable to import
+        media_validation='on_read',
+    )
+    json_columns = [col for col, col_type in schema.items() if col_type == 'Json']
+    for batch in pq.ParquetFile(os.path.join(path, f"{entry['name']}.parquet")).iter_batches(batch_size=BATCH_SIZE):
+        rows = batch.to_pylist()
+        for row in rows:
+            for col in json_columns:
+                if row[col] is not None:
+                    row[col] = json.loads(row[col])
+        table.insert(rows)
+
+    for col, info in entry['embedded'].items():
+        load_vectors(os.path.join(path, info['file']))
+        table.add_embedding_index(column=col, string_embed=snapshot_embedding)
+    return table
+
+
+def import_tables(path: str, manifest: dict, table_paths: dict[str, str], comment: str) -> dict[str, Any]:
+    """Import the exported tables under the given paths, dropping them all again if one fails.
+
+    Args:
+        path: The export directory.
+        manifest: The export's manifest.
+        table_paths: {name within the export: table path to create}, base table first.
+        comment: Comment of the base table, i.e. the index configuration.
+
+    Returns:
+        {name within the export: table}.
+    """
+    entries = {entry['name']: entry for entry in manifest['tables']}
+    tables = {}
+    try:
+        for i, (name, table_path) in enumerate(table_paths.items()):
+            tables[name] = import_table(path, entries[name], table_path, comment if i == 0 else '')
+    except Exception:
+        for table_path in reversed(list(table_paths.values())[:len(tables) + 1]):
+            pxt.drop_table(table_path, if_not_exists='ignore')
+        release_vectors(path)
+        raise
+    return tables
+
+
+def imported_config(manifest: dict) -> dict:
+    """Configuration of an imported index: the exported one, marked as a snapshot of its source."""
+    return {**manifest['config'], 'snapshot': {'index': manifest['index'], 'exported_at': manifest['exported_at']}}
+
+
+def snapshot_info(config: dict) -> Optional[dict]:
+    """Where an imported index came from; None for indexes built by this server."""
+    return config.get('snapshot')
+
+
+def read_only_error(kind: str, full_table_name: str, info: dict) -> str:
+    return (f"Error: {kind} index '{full_table_name}' is a read-only snapshot of '{info['index']}' "
+            f"exported at {info['exported_at']}.")
+
+
+def describe(manifest: dict) -> str:
+    lines = []
+    for entry in manifest['tables']:
+        line = f"  {manifest['index']}{entry['name']}: {entry['rows']} rows"
+        for col, info in entry['embedded'].items():
+            line += f", {info['vectors']} {col} vectors ({info['dims']} dims)"
+        lines.append(line)
+    return "\n".join(lines)
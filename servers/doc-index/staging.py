@@ -0,0 +1,90 @@
+"""Parallel staging of documents ahead of insertion.
+
+Staging checks that each document can be fetched and opened before it is inserted, so a bad document
+is reported and skipped without affecting the others. The work is I/O-bound (downloads, and opening a
+PDF to count its pages), so it runs on a thread pool that overlaps it with the inserts; parsing,
+chunking and embedding still happen once per document, serially, in the splitter on insert.
+
+Downloads are only used for the check: the index stores the original location, which Pixeltable
+fetches into its own file cache on insert. They go to a directory owned by the caller (one per tool
+call) and are released as soon as the document has been inserted.
+"""
+import hashlib
+import os
+import shutil
+import threading
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterator, Optional
+
+
+def _download(location: str, directory: str) -> str:
+    """Download a remote document into directory."""
+    suffix = os.path.splitext(urllib.parse.urlparse(location).path)[1]
+    path = os.path.join(directory, hashlib.sha256(location.encode()).hexdigest() + suffix)
+    partial_path = f'{path}.{threading.get_ident()}.part'
+    with urllib.request.urlopen(location) as response, open(partial_path, 'wb') as f:
+        shutil.copyfileobj(response, f)
+    os.replace(partial_path, path)
+    return path
+
+
+def _count_pdf_pages(path: str) -> int:
+    """Open a PDF without extracting any text; return its page count."""
+    import fitz
+
+    with fitz.open(path) as doc:
+        if doc.needs_pass:
+            raise ValueError("PDF is password protected")
+        if doc.page_count == 0:
+            raise ValueError("PDF has no pages")
+        return doc.page_count
+
+
+def stage_document(location: str, directory: str) -> dict:
+    """Make a document available locally and check that it opens.
+
+    Args:
+        location: URL or path of the document.
+        directory: Where to download remote documents.
+
+    Returns:
+        A dict with 'location', 'path' (the local copy that was checked), 'downloaded', 'pages' and 'error'.
+    """
+    result = {'location': location, 'path': location, 'downloaded': False, 'pages': None, 'error': None}
+    try:
+        scheme = urllib.parse.urlparse(location).scheme
+        if scheme in ('http', 'https'):
+            result['path'] = _download(location, directory)
+            result['downloaded'] = True
+        elif scheme == '' or scheme == 'file':
+            path = urllib.parse.urlparse(location).path if scheme == 'file' else location
+            if not os.path.isfile(path):
+                raise FileNotFoundError(f"No such file: {path}")
+            result['path'] = path
+        else:
+            # Other stores (e.g. s3://) are fetched by Pixeltable on insert
+            return result
+        if result['path'].lower().endswith('.pdf'):
+            result['pages'] = _count_pdf_pages(result['path'])
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    return result
+
+
+def stage_documents(locations: list[str], directory: str, max_workers: Optional[int] = None) -> Iterator[dict]:
+    """Stage documents on a thread pool, yielding each result as soon as it is ready."""
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(stage_document, location, directory) for location in locations]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def release(staged: dict) -> None:
+    """Delete the download of a staged document, if there is one."""
+    if staged['downloaded']:
+        try:
+            os.remove(staged['path'])
+        except FileNotFoundError:
+            pass
@@ -1,27 +1,101 @@
-import pixeltable as pxt
-from mcp.server.fastmcp import FastMCP
-from pixeltable.iterators import DocumentSplitter
-from pixeltable.functions.huggingface import sentence_transformer
+import json
+import os
+import tempfile
+from index_maintenance import active_index, format_report, rebuild_embedding_index, scheduler as maintenance
+from lazy_imports import DeferredFastMCP, DeferredImports
+from query_profile import QueryProfile
+from replica import replica, start_publishing, table_versions
+from sharding import ShardClient, ShardedIndex, join_results, merge_top, rows_json
+from staging import release, stage_document, stage_documents
 
-mcp = FastMCP("Pixeltable")
+def _load_imports() -> None:
+    """Import Pixeltable and the modules built on it on first use, not at startup (see lazy_imports.py)."""
+    global pxt, pxt_str, DocumentSplitter, METADATA, SEPARATORS, section_path, section_title, EMBEDDING_DIMS
+    global EMBEDDING_MODEL, cached_e5_embedding, embed_texts, text_hash, describe, export_table
+    global imported_config, import_tables, prepare_export, read_manifest, read_only_error, snapshot_info
+    global write_manifest
+    import pixeltable as pxt
+    from pixeltable.functions import string as pxt_str
+    from pixeltable.iterators import DocumentSplitter
+    from chunk_metadata import METADATA, SEPARATORS, section_path, section_title
+    from e5_model import EMBEDDING_DIMS, EMBEDDING_MODEL
+    from embedding_cache import cached_e5_embedding, embed_texts, text_hash
+    from snapshot import (describe, export_table, imported_config, import_tables, prepare_export, read_manifest,
+                          read_only_error, snapshot_info, write_manifest)
+
+imports = DeferredImports(_load_imports)
+
+mcp = DeferredFastMCP("Pixeltable", imports)
 
 # Base directory for all indexes
 DIRECTORY = 'doc_search'
 
+# Configuration of indexes created before these options existed
+DEFAULT_CONFIG = {'doc_ids': False, 'separators': 'token_limit', 'metadata': False}
+
 # Registry to hold all document indexes
+# Format: {full_table_name: (document_index, chunks_view, config)}
 document_indexes = {}
+# Sharded indexes, whose shards are ordinary document indexes (see sharding.py)
+# Format: {full_table_name: ShardedIndex}
+sharded_indexes = {}
+shard_client = ShardClient(globals())
+
+def _load_config(document_index) -> dict:
+    """Read the index configuration stored in the table comment."""
+    comment = document_index.get_metadata().get('comment') or ''
+    try:
+        return {**DEFAULT_CONFIG, **json.loads(comment)}
+    except ValueError:
+        return dict(DEFAULT_CONFIG)
+
+def _present(value) -> bool:
+    """Whether an optional column value is set (missing values come back as None)."""
+    return value is not None
+
+def _insert(document_index, config: dict, path: str, doc_id: str, revision: int = 0):
+    """Insert one document row, with its id if the index keeps document ids."""
+    row = {'pdf_file': path}
+    if config['doc_ids']:
+        row.update(doc_id=doc_id, revision=revision)
+    return document_index.insert([row], on_error='ignore')
+
+def _setup_sharded(full_table_name: str, index: ShardedIndex, separators: str) -> str:
+    """Set up every shard of a sharded index, then record the layout in a coordinator table."""
+    results = shard_client.scatter(index, 'setup_document_index', separators=separators)
+    if any(result.startswith('Error') for _, result in results):
+        return f"Error setting up shards of document index '{full_table_name}':\n{join_results(results)}"
+
+    # The coordinator table holds no rows, only the shard layout in its comment
+    config = {'doc_ids': True, 'separators': separators, 'metadata': True, **index.config()}
+    pxt.create_dir(DIRECTORY, if_exists='ignore')
+    pxt.create_table(full_table_name, {'pdf_file': pxt.Document}, comment=json.dumps(config), if_exists='ignore')
+    sharded_indexes[full_table_name] = index
+    return f"Sharded document index '{full_table_name}' created ({index.describe()}):\n{join_results(results)}"
 
 @mcp.tool()
-def setup_document_index(table_name: str) -> str:
+def setup_document_index(table_name: str, separators: str = 'token_limit', shards: int = 1,
+                         shard_urls: str = '') -> str:
     """Set up a document index with the provided name.
 
     Args:
         table_name: The name of the document index (e.g., 'reports', 'articles').
+        separators: Comma-separated boundaries to split documents on, from 'heading' (HTML and Markdown),
+            'page' (PDF), 'paragraph', 'sentence', 'token_limit' and 'char_limit' (default is 'token_limit').
+            For example 'heading,token_limit' keeps chunks within sections and at most 300 tokens long.
+            Page number, heading and section are stored with every chunk regardless.
+        shards: Split the index into this many shard indexes in this server's store (default is 1, unsharded).
+            Local shards share one store and are queried one after another, so without shard_urls this adds
+            neither parallelism nor capacity; it only prepares an index for moving shards to other servers.
+        shard_urls: Comma-separated SSE URLs of other document index servers (e.g. 'http://node2:8080/sse'),
+            one shard per URL; overrides shards. Documents must be reachable from those servers.
 
     Returns:
         A message indicating whether the index was created, already exists, or failed.
     """
     global document_indexes
+    if replica.enabled:
+        return replica.read_only_error()
     try:
         # Construct full table and view names
         full_table_name = f'{DIRECTORY}.{table_name}'
@@ -31,15 +105,34 @@ def setup_document_index(table_name: str) -> str:
         existing_tables = pxt.list_tables()
         if full_table_name in existing_tables:
             document_index = pxt.get_table(full_table_name)
+            config = _load_config(document_index)
+            if 'sharding' in config:
+                sharded_indexes[full_table_name] = ShardedIndex.from_config(table_name, config)
+                return f"Document index '{full_table_name}' already exists and is ready for use."
             chunks_view = pxt.get_table(chunks_view_name)
-            document_indexes[full_table_name] = (document_index, chunks_view)
+            document_indexes[full_table_name] = (document_index, chunks_view, _load_config(document_index))
             return f"Document index '{full_table_name}' already exists and is ready for use."
 
-        # Create directory and table
+        separator_list = [sep.strip() for sep in separators.split(',') if sep.strip()]
+        invalid = [sep for sep in separator_list if sep not in SEPARATORS]
+        if invalid or not separator_list:
+            return f"Error: Invalid separators '{separators}'. Valid separators are: {', '.join(SEPARATORS)}"
+        separators = ','.join(separator_list)
+
+        urls = [url.strip() for url in shard_urls.split(',') if url.strip()]
+        if shards < 1:
+            return "Error: shards must be at least 1."
+        if shards > 1 or urls:
+            return _setup_sharded(full_table_name, ShardedIndex(table_name, len(urls) or shards, urls),
+                                  separators)
+
+        # Create directory and table; the configuration is kept in the table comment
+        config = {'doc_ids': True, 'separators': separators, 'metadata': True}
         pxt.create_dir(DIRECTORY, if_exists='ignore')
         document_index = pxt.create_table(
             full_table_name,
-            {'pdf_file': pxt.Document},
+            {'pdf_file': pxt.Document, 'doc_id': pxt.String, 'revision': pxt.Int},
+            comment=json.dumps(config),
             if_exists='ignore'
         )
 
@@ -49,84 +142,568 @@ def setup_document_index(table_name: str) -> str:
             document_index,
             iterator=DocumentSplitter.create(
                 document=document_index.pdf_file,
-                separators='token_limit',
+                separators=separators,
+                metadata=METADATA,
                 limit=300  # Tokens per chunk
             ),
             if_exists='ignore'
         )
 
-        # Define the embedding model and create embedding index
-        embed_model = sentence_transformer.using(model_id='intfloat/e5-large-v2')
+        # Top-level section for filtering, full heading path for display
+        chunks_view.add_computed_column(section=section_title(chunks_view.heading))
+        chunks_view.add_computed_column(section_path=section_path(chunks_view.heading))
+
+        # Hash chunk contents so revisions can be compared chunk by chunk
+        chunks_view.add_computed_column(content_hash=text_hash(chunks_view.text))
+
+        # Create embedding index; embeddings are cached by content hash, so unchanged chunks are never re-embedded
         chunks_view.add_embedding_index(
             column='text',
-            string_embed=embed_model,
+            string_embed=cached_e5_embedding,
             if_exists='ignore'
         )
 
         # Store in the registry
-        document_indexes[full_table_name] = (document_index, chunks_view)
+        document_indexes[full_table_name] = (document_index, chunks_view, config)
         return f"Document index '{full_table_name}' created successfully."
     except Exception as e:
         return f"Error setting up document index '{full_table_name}': {str(e)}"
 
 @mcp.tool()
-def insert_document(table_name: str, document_location: str) -> str:
+def insert_document(table_name: str, document_location: str, doc_id: str = '') -> str:
     """Insert a document file into the specified document index.
 
     Args:
         table_name: The name of the document index (e.g., 'reports', 'articles').
         document_location: The URL or path to the document file to insert (e.g., local path or URL).
+        doc_id: Identifier used by upsert_document to replace this document later (default is the location).
 
     Returns:
         A confirmation message indicating success or failure.
     """
     full_table_name = f'{DIRECTORY}.{table_name}'
     try:
+        if full_table_name in sharded_indexes:
+            index = sharded_indexes[full_table_name]
+            return shard_client.call(index, index.route(doc_id or document_location), 'insert_document',
+                                     document_location=document_location, doc_id=doc_id)
         if full_table_name not in document_indexes:
             return f"Error: Document index '{full_table_name}' not set up. Please call setup_document_index first."
-        document_index, _ = document_indexes[full_table_name]
-        document_index.insert([{'pdf_file': document_location}])
+        document_index, _, config = document_indexes[full_table_name]
+        info = snapshot_info(config)
+        if info:
+            return read_only_error('Document', full_table_name, info)
+        status = _insert(document_index, config, document_location, doc_id or document_location)
+        if status.num_excs > 0:
+            return f"Error inserting document file into '{full_table_name}': {status.num_excs} values failed to compute."
         return f"Document file '{document_location}' inserted successfully into index '{full_table_name}'."
     except Exception as e:
         return f"Error inserting document file into '{full_table_name}': {str(e)}"
 
 @mcp.tool()
-def query_document(table_name: str, query_text: str, top_n: int = 5) -> str:
+def insert_documents(table_name: str, document_locations: list[str], max_workers: int = None) -> str:
+    """Insert many documents into the specified document index.
+
+    Documents are fetched and checked on a thread pool, and each one is inserted (and becomes
+    searchable) as soon as it is ready. A document that fails does not affect the others.
+
+    Args:
+        table_name: The name of the document index (e.g., 'reports', 'articles').
+        document_locations: The URLs or paths of the document files to insert.
+        max_workers: Number of staging threads (default is chosen by the thread pool).
+
+    Returns:
+        A per-document report of what was inserted and what failed.
+    """
+    full_table_name = f'{DIRECTORY}.{table_name}'
+    try:
+        if full_table_name in sharded_indexes:
+            index = sharded_indexes[full_table_name]
+            by_shard = {}
+            for location in document_locations:
+                by_shard.setdefault(index.route(location), []).append(location)
+            results = shard_client.gather(index, 'insert_documents', {
+                shard: {'document_locations': locations, 'max_workers': max_workers}
+                for shard, locations in by_shard.items()
+            })
+            return f"Inserted into sharded document index '{full_table_name}':\n{join_results(results)}"
+        if full_table_name not in document_indexes:
+            return f"Error: Document index '{full_table_name}' not set up. Please call setup_document_index first."
+        document_index, _, config = document_indexes[full_table_name]
+        info = snapshot_info(config)
+        if info:
+            return read_only_error('Document', full_table_name, info)
+
+        lines = []
+        inserted = 0
+        with tempfile.TemporaryDirectory(prefix='doc_staging_') as staging_dir:
+            staged_documents = stage_documents(document_locations, staging_dir, max_workers=max_workers)
+            for i, staged in enumerate(staged_documents, 1):
+                progress = f"[{i}/{len(document_locations)}] {staged['location']}"
+                if staged['error'] is not None:
+                    lines.append(f"{progress}: failed to stage: {staged['error']}")
+                    continue
+                try:
+                    status = _insert(document_index, config, staged['location'], staged['location'])
+                except Exception as e:
+                    lines.append(f"{progress}: failed to insert: {str(e)}")
+                    continue
+                finally:
+                    release(staged)
+                if status.num_excs > 0:
+                    lines.append(f"{progress}: inserted with {status.num_excs} errors")
+                else:
+                    pages = f" ({staged['pages']} pages)" if staged['pages'] is not None else ""
+                    lines.append(f"{progress}: inserted{pages}")
+                inserted += 1
+
+        summary = f"Inserted {inserted} of {len(document_locations)} documents into index '{full_table_name}'."
+        return summary + "\n\n" + "\n".join(lines)
+    except Exception as e:
+        return f"Error inserting documents into '{full_table_name}': {str(e)}"
+
+@mcp.tool()
+def upsert_document(table_name: str, doc_id: str, document_location: str) -> str:
+    """Insert a document, or replace the stored version of the document with the same id.
+
+    Only chunks whose text is new or changed are embedded; chunks of the previous version that no
+    longer exist are deleted, so they stop showing up in search results.
+
+    Args:
+        table_name: The name of the document index (e.g., 'reports', 'articles').
+        doc_id: Identifier of the document (e.g., a path or a document number).
+        document_location: The URL or path to the new version of the document.
+
+    Returns:
+        A message with the number of chunks kept, added and removed.
+    """
+    full_table_name = f'{DIRECTORY}.{table_name}'
+    try:
+        if full_table_name in sharded_indexes:
+            return _upsert_sharded(sharded_indexes[full_table_name], doc_id, document_location)
+        if full_table_name not in document_indexes:
+            return f"Error: Document index '{full_table_name}' not set up. Please call setup_document_index first."
+        document_index, chunks_view, config = document_indexes[full_table_name]
+        info = snapshot_info(config)
+        if info:
+            return read_only_error('Document', full_table_name, info)
+        if not config['doc_ids']:
+            return f"Error: Document index '{full_table_name}' predates document ids; recreate it to use upsert_document."
+
+        # Current chunk hashes and revision of this document
+        current = (chunks_view.where(chunks_view.doc_id == doc_id)
+                   .select(chunks_view.content_hash, chunks_view.revision)
+                   .collect())
+        old_hashes = set(current['content_hash'])
+        revision = max(current['revision'], default=-1) + 1
+
+        with tempfile.TemporaryDirectory(prefix='doc_staging_') as staging_dir:
+            staged = stage_document(document_location, staging_dir)
+            if staged['error'] is not None:
+                return f"Error upserting document '{doc_id}' into '{full_table_name}': {staged['error']}"
+            # Insert the new version before removing the old one, so the document stays searchable throughout
+            status = _insert(document_index, config, document_location, doc_id, revision)
+        if status.num_excs > 0:
+            document_index.delete(where=(document_index.doc_id == doc_id) & (document_index.revision == revision))
+            return f"Error upserting document '{doc_id}' into '{full_table_name}': {status.num_excs} values failed to compute."
+        document_index.delete(where=(document_index.doc_id == doc_id) & (document_index.revision < revision))
+
+        updated = chunks_view.where(chunks_view.doc_id == doc_id).select(chunks_view.content_hash).collect()
+        new_hashes = set(updated['content_hash'])
+        return (f"Document '{doc_id}' upserted into '{full_table_name}': {len(new_hashes & old_hashes)} chunks unchanged, "
+                f"{len(new_hashes - old_hashes)} new or changed chunks embedded, {len(old_hashes - new_hashes)} stale chunks removed.")
+    except Exception as e:
+        return f"Error upserting document '{doc_id}' into '{full_table_name}': {str(e)}"
+
+def _upsert_sharded(index: ShardedIndex, doc_id: str, document_location: str) -> str:
+    return shard_client.call(index, index.route(doc_id), 'upsert_document', doc_id=doc_id,
+                             document_location=document_location)
+
+@mcp.tool()
+def delete_document(table_name: str, doc_id: str = '', doc_id_prefix: str = '') -> str:
+    """Delete documents from the specified document index, with all their chunks and embeddings.
+
+    Args:
+        table_name: The name of the document index (e.g., 'reports', 'articles').
+        doc_id: Delete every revision of the document with this id.
+        doc_id_prefix: Delete every document whose id starts with this prefix (e.g. a directory).
+
+    Returns:
+        The number of document revisions deleted.
+    """
+    full_table_name = f'{DIRECTORY}.{table_name}'
+    if not doc_id and not doc_id_prefix:
+        return "Error: Provide doc_id or doc_id_prefix."
+    try:
+        if full_table_name in sharded_indexes:
+            index = sharded_indexes[full_table_name]
+            shards = [index.route(doc_id)] if doc_id else None
+            results = shard_client.scatter(index, 'delete_document', shards,
+                                           doc_id=doc_id, doc_id_prefix=doc_id_prefix)
+            return f"Deleted from sharded document index '{full_table_name}':\n{join_results(results)}"
+        if full_table_name not in document_indexes:
+            return f"Error: Document index '{full_table_name}' not set up. Please call setup_document_index first."
+        document_index, _, config = document_indexes[full_table_name]
+        info = snapshot_info(config)
+        if info:
+            return read_only_error('Document', full_table_name, info)
+        if not config['doc_ids']:
+            return f"Error: Document index '{full_table_name}' predates document ids; recreate it to use delete_document."
+        if doc_id:
+            condition = document_index.doc_id == doc_id
+        else:
+            condition = pxt_str.startswith(document_index.doc_id, doc_id_prefix)
+        # The chunks view and its embedding index drop the chunks of the deleted rows
+        status = document_index.delete(where=condition)
+        return f"Deleted {status.num_rows} document revisions from index '{full_table_name}'."
+    except Exception as e:
+        return f"Error deleting from document index '{full_table_name}': {str(e)}"
+
+def _format_results(query_text: str, full_table_name: str, rows: list, config: dict) -> str:
+    result_str = f"Query Results for '{query_text}' in '{full_table_name}':\n\n"
+    for i, row in enumerate(rows, 1):
+        result_str += f"{i}. Score: {row['sim']:.4f}\n"
+        if config['doc_ids']:
+            result_str += f"   Document: {row['doc_id']}\n"
+        if config['metadata']:
+            if _present(row['section_path']):
+                result_str += f"   Section: {row['section_path']}\n"
+            if _present(row['page']):
+                result_str += f"   Page: {int(row['page'])}\n"
+        if 'shard' in row:
+            result_str += f"   Shard: {row['shard']}\n"
+        result_str += f"   Position: {row['position']}\n"
+        result_str += f"   Text: {row['text']}\n\n"
+    return result_str
+
+def _query_sharded(index: ShardedIndex, full_table_name: str, query_text: str, top_n: int, profile: bool,
+                   **filters) -> str:
+    """Scatter a query to every shard and merge the shards' top_n rows into the overall top_n."""
+    query_profile = QueryProfile()
+    with query_profile.stage('scatter'):
+        results = shard_client.scatter(index, 'query_document', query_text=query_text, top_n=top_n, as_json=True,
+                                       **filters)
+    with query_profile.stage('merge'):
+        rows, errors = merge_top(results, top_n)
+    with query_profile.stage('serialize'):
+        # Shards are created with document ids and chunk metadata
+        result_str = _format_results(query_text, full_table_name, rows, {'doc_ids': True, 'metadata': True})
+        if errors:
+            result_str += "Shards that failed (results are partial):\n" + "\n".join(errors) + "\n"
+
+    if profile:
+        query_profile.step(f"scatter: query_document top {top_n} on {index.describe()}")
+        query_profile.step(f"merge: top {top_n} of the shards' rows by similarity")
+        query_profile.index = f"embedding index on text ({EMBEDDING_MODEL}, cached) of each shard"
+        query_profile.rows['shards'] = index.shards
+        query_profile.rows['returned'] = len(rows)
+        result_str += f"{query_profile.report()}\n"
+    return result_str
+
+@mcp.tool()
+def query_document(table_name: str, query_text: str, top_n: int = 5, doc_id: str = '', section: str = '',
+                   page_from: int = None, page_to: int = None, profile: bool = False, as_json: bool = False) -> str:
     """Query the specified document index with a text question.
 
+    The optional filters restrict which chunks are searched before they are ranked by similarity.
+
     Args:
         table_name: The name of the document index (e.g., 'reports', 'articles').
         query_text: The question or text to search for in the document content.
         top_n: Number of top results to return (default is 5).
+        doc_id: Only search the document with this id (as given at insert; defaults to its location).
+        section: Only search chunks under this top-level heading.
+        page_from: Only search chunks on or after this page (PDF).
+        page_to: Only search chunks on or before this page (PDF).
+        profile: Append a summary of the request (filters, index, ordering), row counts and per-stage timings.
+        as_json: Return the rows as a JSON list instead of text; sharded indexes gather shard results this way.
 
     Returns:
-        A string containing the top matching text chunks and their similarity scores.
+        A string containing the top matching text chunks, where they are from and their similarity scores.
     """
     full_table_name = f'{DIRECTORY}.{table_name}'
     try:
+        if full_table_name in sharded_indexes:
+            index = sharded_indexes[full_table_name]
+            return _query_sharded(index, full_table_name, query_text, top_n, profile, doc_id=doc_id,
+                                  section=section, page_from=page_from, page_to=page_to)
         if full_table_name not in document_indexes:
             return f"Error: Document index '{full_table_name}' not set up. Please call setup_document_index first."
-        _, chunks_view = document_indexes[full_table_name]
-        
-        # Calculate similarity scores
-        sim = chunks_view.text.similarity(query_text)
+        stale = replica.check(table_name)
+        if stale:
+            return stale
+        _, chunks_view, config = document_indexes[full_table_name]
+        if (doc_id and not config['doc_ids']) or ((section or page_from or page_to) and not config['metadata']):
+            return f"Error: Document index '{full_table_name}' predates chunk metadata and cannot be filtered."
+
+        query_profile = QueryProfile()
+        with query_profile.stage('build'):
+            # Narrow down the candidate chunks
+            filters = []
+            if doc_id:
+                filters.append(chunks_view.doc_id == doc_id)
+            if section:
+                filters.append(chunks_view.section == section)
+            if page_from is not None:
+                filters.append(chunks_view.page >= page_from)
+            if page_to is not None:
+                filters.append(chunks_view.page <= page_to)
+            query = chunks_view
+            if filters:
+                condition = filters[0]
+                for f in filters[1:]:
+                    condition = condition & f
+                query = query.where(condition)
 
-        # Get top results
-        results = (chunks_view.order_by(sim, asc=False)
-                  .select(chunks_view.text, sim=sim)
-                  .limit(top_n)
-                  .collect())
+            # Calculate similarity scores
+            sim = chunks_view.text.similarity(query_text, idx=active_index(f'{full_table_name}_chunks', 'text'))
+
+            # Get top results
+            columns = {'text': chunks_view.text, 'position': chunks_view.pos}
+            if config['doc_ids']:
+                columns['doc_id'] = chunks_view.doc_id
+            if config['metadata']:
+                columns.update(page=chunks_view.page, section_path=chunks_view.section_path)
+            top_query = (query.order_by(sim, asc=False)
+                         .select(**columns, sim=sim)
+                         .limit(top_n))
+
+        # Embed the query text up front; the search then finds its embedding in the in-memory cache
+        with query_profile.stage('embedding'):
+            embed_texts([query_text], persist=False)
+        with query_profile.stage('search'):
+            results = top_query.collect()
 
         # Format the results
-        result_str = f"Query Results for '{query_text}' in '{full_table_name}':\n\n"
-        for i, row in enumerate(results.to_pandas().itertuples(), 1):
-            result_str += f"{i}. Score: {row.sim:.4f}\n"
-            result_str += f"   Text: {row.text}\n\n"
-        
+        with query_profile.stage('serialize'):
+            # Rows straight from the result set; building a DataFrame costs more than formatting top_n rows
+            rows = list(results)
+            if as_json:
+                return rows_json(rows)
+            result_str = _format_results(query_text, full_table_name, rows, config)
+
+        if profile:
+            query_profile.step(f"source: {full_table_name}_chunks")
+            if filters:
+                query_profile.step("filter: " + ", ".join(
+                    f"{name}={value!r}" for name, value in
+                    (('doc_id', doc_id), ('section', section), ('page_from', page_from), ('page_to', page_to))
+                    if value not in ('', None)))
+            query_profile.step(f"order by: similarity(text, query) desc, limit {top_n}")
+            query_profile.step(f"select: {', '.join(columns)}, sim")
+            query_profile.index = f"embedding index on text ({EMBEDDING_MODEL}, cached)"
+            query_profile.rows['returned'] = len(results)
+            query_profile.count('indexed', chunks_view)
+            if filters:
+                query_profile.count('matching filter', query)
+            result_str += f"{query_profile.report()}\n"
+
         return result_str if result_str else "No results found."
     except Exception as e:
         return f"Error querying document index '{full_table_name}': {str(e)}"
 
+@mcp.tool()
+def expand_context(table_name: str, doc_id: str, position: int, window: int = 2) -> str:
+    """Return the chunks surrounding a query_document hit, without running another search.
+
+    Args:
+        table_name: The name of the document index (e.g., 'reports', 'articles').
+        doc_id: The document of the hit.
+        position: The position of the hit within its document.
+        window: Number of chunks to return on each side of the hit (default is 2).
+
+    Returns:
+        The hit and its neighboring chunks in document order.
+    """
+    full_table_name = f'{DIRECTORY}.{table_name}'
+    try:
+        if full_table_name in sharded_indexes:
+            index = sharded_indexes[full_table_name]
+            return shard_client.call(index, index.route(doc_id), 'expand_context', doc_id=doc_id, position=position,
+                                     window=window)
+        if full_table_name not in document_indexes:
+            return f"Error: Document index '{full_table_name}' not set up. Please call setup_document_index first."
+        stale = replica.check(table_name)
+        if stale:
+            return stale
+        _, chunks_view, config = document_indexes[full_table_name]
+        if not config['doc_ids']:
+            return f"Error: Document index '{full_table_name}' predates document ids; recreate it to use expand_context."
+
+        # Positional lookup within the document; no similarity search involved
+        columns = {'text': chunks_view.text, 'position': chunks_view.pos}
+        if config['metadata']:
+            columns.update(page=chunks_view.page, section_path=chunks_view.section_path)
+        results = (chunks_view.where((chunks_view.doc_id == doc_id)
+                                     & (chunks_view.pos >= position - window)
+                                     & (chunks_view.pos <= position + window))
+                   .order_by(chunks_view.pos)
+                   .select(**columns)
+                   .collect())
+        if len(results) == 0:
+            return f"Error: No chunks found around position {position} of document '{doc_id}'."
+
+        result_str = f"Context for position {position} of document '{doc_id}':\n\n"
+        for row in results:
+            marker = '>' if row['position'] == position else ' '
+            location = f"position {row['position']}"
+            if config['metadata'] and _present(row['page']):
+                location += f", page {row['page']}"
+            if config['metadata'] and _present(row['section_path']):
+                location += f", {row['section_path']}"
+            result_str += f"{marker} [{location}] {row['text']}\n\n"
+        return result_str
+    except Exception as e:
+        return f"Error expanding context in '{full_table_name}': {str(e)}"
+
+def _maintain(full_table_name: str) -> list:
+    """Rebuild the chunk embedding index of a document index; embeddings come from the cache."""
+    chunks_view_name = f'{full_table_name}_chunks'
+    report = rebuild_embedding_index(chunks_view_name, 'text', EMBEDDING_DIMS, string_embed=cached_e5_embedding)
+    return [format_report(chunks_view_name, 'text', report)]
+
+@imports.wrap
+def _maintain_all() -> None:
+    for full_table_name, (_, _, config) in list(document_indexes.items()):
+        # Imported indexes do not change, so there is nothing to maintain
+        if not snapshot_info(config):
+            _maintain(full_table_name)
+
+@mcp.tool()
+def maintain_index(table_name: str) -> str:
+    """Rebuild the embedding indexes of a document index, e.g. after many inserts and deletions.
+
+    A new index is built alongside the current one, which keeps serving queries until the new
+    index is ready; then queries switch over and the old index is dropped.
+
+    Args:
+        table_name: The name of the document index.
+
+    Returns:
+        Each new index's row count, approximate size and build time.
+    """
+    full_table_name = f'{DIRECTORY}.{table_name}'
+    try:
+        if full_table_name in sharded_indexes:
+            results = shard_client.scatter(sharded_indexes[full_table_name], 'maintain_index')
+            return f"Maintained the shards of document index '{full_table_name}':\n{join_results(results)}"
+        if full_table_name not in document_indexes:
+            return f"Error: Document index '{full_table_name}' not set up. Please call setup_document_index first."
+        info = snapshot_info(document_indexes[full_table_name][2])
+        if info:
+            return read_only_error('Document', full_table_name, info)
+        return "Rebuilt:\n" + "\n".join(_maintain(full_table_name))
+    except Exception as e:
+        return f"Error maintaining document index '{full_table_name}': {str(e)}"
+
+@mcp.tool()
+def schedule_index_maintenance(interval_hours: float) -> str:
+    """Rebuild the embedding indexes of all loaded document indexes periodically in the background.
+
+    Args:
+        interval_hours: Hours between rebuilds; 0 turns scheduled maintenance off.
+    """
+    maintenance.start(interval_hours, _maintain_all)
+    return f"Index maintenance: {maintenance.describe()}"
+
+# Optional scheduled maintenance from the environment, e.g. INDEX_MAINTENANCE_INTERVAL_HOURS=24
+maintenance.start(float(os.environ.get('INDEX_MAINTENANCE_INTERVAL_HOURS', 0)), _maintain_all)
+
+@imports.wrap
+def _export(full_table_name: str, export_path: str) -> dict:
+    """Export a loaded document index to a directory and return the export's manifest."""
+    document_index, chunks_view, config = document_indexes[full_table_name]
+    prepare_export(export_path)
+    document = {'pdf_file': 'Document', 'doc_id': 'String', 'revision': 'Int'}
+    chunk = {'pos': 'Int', 'text': 'String', 'title': 'String', 'heading': 'Json', 'page': 'Int',
+             'section': 'String', 'section_path': 'String', 'content_hash': 'String'}
+    tables = [
+        export_table(export_path, '', document_index, document),
+        export_table(export_path, '_chunks', chunks_view, {**document, **chunk}, embedded=('text',),
+                     embed=embed_texts),
+    ]
+    return write_manifest(export_path, 'doc-index', full_table_name, config, tables)
+
+def _import(export_path: str, manifest: dict, full_table_name: str, table_path: str) -> None:
+    """Import an export as tables under table_path and serve them as the document index full_table_name."""
+    config = imported_config(manifest)
+    tables = import_tables(export_path, manifest, {'': table_path, '_chunks': f'{table_path}_chunks'},
+                           json.dumps(config))
+    document_indexes[full_table_name] = (tables[''], tables['_chunks'], config)
+
+@mcp.tool()
+def export_index(table_name: str, export_path: str) -> str:
+    """Export a document index to a directory, so another server can import it without recomputing it.
+
+    Documents and chunks are written as Parquet and chunk embeddings, taken from the embedding
+    cache, as memory-mappable Arrow files. Document files are referenced by URL, not copied.
+
+    Args:
+        table_name: The name of the document index (e.g., 'reports', 'articles').
+        export_path: Directory to write the export to; created if needed, must not hold an export already.
+
+    Returns:
+        The exported tables with their row and vector counts.
+    """
+    full_table_name = f'{DIRECTORY}.{table_name}'
+    try:
+        if full_table_name in sharded_indexes:
+            return (f"Error: Document index '{full_table_name}' is sharded; "
+                    f"export each shard ({sharded_indexes[full_table_name].describe()}) instead.")
+        if full_table_name not in document_indexes:
+            return f"Error: Document index '{full_table_name}' not set up. Please call setup_document_index first."
+        manifest = _export(full_table_name, export_path)
+        return f"Exported document index '{full_table_name}' to '{export_path}':\n{describe(manifest)}"
+    except Exception as e:
+        return f"Error exporting document index '{full_table_name}': {str(e)}"
+
+@mcp.tool()
+def import_index(export_path: str, table_name: str = '') -> str:
+    """Import a document index exported by export_index, without chunking or embedding anything again.
+
+    The imported index serves query_document and expand_context like the original, but is a
+    read-only snapshot: it does not accept new documents.
+
+    Args:
+        export_path: Directory written by export_index.
+        table_name: Name for the imported index; defaults to the name of the exported one.
+
+    Returns:
+        The imported tables with their row and vector counts.
+    """
+    if replica.enabled:
+        return replica.read_only_error()
+    try:
+        manifest = read_manifest(export_path, 'doc-index')
+        full_table_name = f"{DIRECTORY}.{table_name or manifest['index'].split('.', 1)[1]}"
+        if full_table_name in pxt.list_tables():
+            return f"Error: Document index '{full_table_name}' already exists."
+
+        pxt.create_dir(DIRECTORY, if_exists='ignore')
+        _import(export_path, manifest, full_table_name, full_table_name)
+        return f"Imported '{export_path}' as read-only document index '{full_table_name}':\n{describe(manifest)}"
+    except Exception as e:
+        return f"Error importing document index from '{export_path}': {str(e)}"
+
+@imports.wrap
+def _replicate(export_path: str, table_name: str, table_path: str) -> None:
+    _import(export_path, read_manifest(export_path, 'doc-index'), f'{DIRECTORY}.{table_name}', table_path)
+
+@imports.wrap
+def _published() -> list[str]:
+    """Names of the loaded indexes built by this server, which a writer publishes snapshots of."""
+    return [full_table_name.split('.', 1)[1] for full_table_name, (_, _, config) in list(document_indexes.items())
+            if not snapshot_info(config)]
+
+def _version(table_name: str) -> tuple:
+    """Version of a loaded index; a writer only publishes a new snapshot of it when this changes."""
+    document_index, chunks_view, _ = document_indexes[f'{DIRECTORY}.{table_name}']
+    return table_versions(document_index, chunks_view)
+
+# Read-only replica mode (REPLICA_OF) or snapshot publishing on a writer (SNAPSHOT_DIR); see replica.py
+replica.start(DIRECTORY, _replicate)
+start_publishing(_published, lambda table_name, path: _export(f'{DIRECTORY}.{table_name}', path), _version)
+
 @mcp.tool()
 def list_tables() -> str:
     """List all document indexes currently available.
@@ -134,6 +711,12 @@ def list_tables() -> str:
     Returns:
         A string listing the current document indexes.
     """
+    if replica.enabled:
+        return replica.describe()
     tables = pxt.list_tables()
     document_tables = [t for t in tables if t.startswith(f'{DIRECTORY}.')]
-    return f"Current document indexes: {', '.join(document_tables)}" if document_tables else "No document indexes exist."
\ No newline at end of file
+    if not document_tables:
+        return "No document indexes exist."
+    return f"Current document indexes: {', '.join(document_tables)}" + ''.join(
+        f"\n{table}: {index.describe()}" for table, index in sharded_indexes.items()
+    )
\ No newline at end of file
@@ -0,0 +1,48 @@
+import base64
+import hashlib
+import io
+
+import PIL.Image
+import pixeltable as pxt
+from pixeltable.func import Batch
+
+from openai_scheduler import DEFAULT_MAX_CONCURRENCY, openai_client, scheduler
+
+MAX_OUTPUT_TOKENS = 300
+# Rough per-request token cost of an image: a low-detail tile plus up to four high-detail tiles
+IMAGE_TOKEN_ESTIMATE = 85 + 4 * 170
+
+
+def _encode_image(image: PIL.Image.Image) -> bytes:
+    buffer = io.BytesIO()
+    image.convert('RGB').save(buffer, format='JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def _caption_request(image_bytes: bytes, prompt: str, model: str):
+    data_url = f"data:image/jpeg;base64,{base64.b64encode(image_bytes).decode()}"
+
+    def request() -> str:
+        response = openai_client().chat.completions.create(
+            model=model,
+            max_tokens=MAX_OUTPUT_TOKENS,
+            messages=[{
+                'role': 'user',
+                'content': [
+                    {'type': 'text', 'text': prompt},
+                    {'type': 'image_url', 'image_url': {'url': data_url}},
+                ],
+            }],
+        )
+        return response.choices[0].message.content, response.usage.total_tokens
+
+    key = ('caption', model, prompt, hashlib.sha256(image_bytes).hexdigest())
+    estimated_tokens = len(prompt) // 4 + IMAGE_TOKEN_ESTIMATE + MAX_OUTPUT_TOKENS
+    return key, request, estimated_tokens, lambda result: result[1]
+
+
+@pxt.udf(batch_size=DEFAULT_MAX_CONCURRENCY)
+def caption_image(image: Batch[PIL.Image.Image], *, prompt: str, model: str) -> Batch[str]:
+    """Caption images with an OpenAI vision model, through the shared request scheduler."""
+    requests = [_caption_request(_encode_image(img), prompt, model) for img in image]
+    return [content for content, _ in scheduler.map(requests)]
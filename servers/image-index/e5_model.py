@@ -0,0 +1,64 @@
+"""The e5-large-v2 sentence embedding model shared by every embedding function of a server.
+
+The model is loaded once per process, however many modules embed with it (the content-hash cache
+of native indexes and the snapshot vectors of imported ones). Query embeddings are kept in one
+bounded in-memory LRU that all of them consult, so a query embedded ahead of a search is found
+whichever index the search runs on.
+"""
+import collections
+import hashlib
+import threading
+from functools import lru_cache
+from typing import Any
+
+import numpy as np
+
+EMBEDDING_MODEL = 'intfloat/e5-large-v2'
+EMBEDDING_DIMS = 1024
+# Query embeddings kept in memory (about 4 KB each)
+QUERY_CACHE_SIZE = 1000
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class RecentEmbeddings:
+    """In-memory map from content hash to embedding that evicts the least recently used entries."""
+
+    def __init__(self, max_size: int):
+        self._max_size = max_size
+        self._lock = threading.Lock()
+        self._vectors: collections.OrderedDict[str, np.ndarray] = collections.OrderedDict()
+
+    def get_many(self, hashes: list[str]) -> dict[str, np.ndarray]:
+        found = {}
+        with self._lock:
+            for h in hashes:
+                if h in self._vectors:
+                    self._vectors.move_to_end(h)
+                    found[h] = self._vectors[h]
+        return found
+
+    def put_many(self, items: dict[str, np.ndarray]) -> None:
+        with self._lock:
+            for h, v in items.items():
+                self._vectors[h] = v
+                self._vectors.move_to_end(h)
+            while len(self._vectors) > self._max_size:
+                self._vectors.popitem(last=False)
+
+
+recent_queries = RecentEmbeddings(QUERY_CACHE_SIZE)
+
+
+@lru_cache(maxsize=None)
+def model() -> Any:
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(EMBEDDING_MODEL)
+
+
+def encode(texts: list[str]) -> dict[str, np.ndarray]:
+    """Run the model on texts; returns {content hash: float32 vector}."""
+    vectors = model().encode(texts, convert_to_numpy=True)
+    return dict(zip((content_hash(text) for text in texts), vectors.astype(np.float32)))
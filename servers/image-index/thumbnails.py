@@ -0,0 +1,23 @@
+import PIL.Image
+import PIL.ImageOps
+import pixeltable as pxt
+
+
+@pxt.udf
+def downscale_image(path: str, max_side: int) -> PIL.Image.Image:
+    """Produce a bounded-resolution RGB copy of an image without decoding it at full size.
+
+    For JPEGs, draft mode makes the decoder produce a 1/2, 1/4 or 1/8 scale image directly, so the
+    full-resolution bitmap is never held in memory. Other formats are decoded and then reduced.
+
+    Args:
+        path: Local path of the original image.
+        max_side: Maximum width and height of the result, in pixels.
+    """
+    with PIL.Image.open(path) as img:
+        img.draft('RGB', (max_side, max_side))
+        img.thumbnail((max_side, max_side), reducing_gap=2.0)
+        # Apply the EXIF orientation so previews and captions see the image the right way up; only
+        # after shrinking, since transposing copies the bitmap (a square bound holds either way up)
+        img = PIL.ImageOps.exif_transpose(img)
+        return img.convert('RGB')
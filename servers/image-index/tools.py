@@ -1,70 +1,172 @@
-import pixeltable as pxt
+import io
+import json
 import os
-from mcp.server.fastmcp import FastMCP
-from pixeltable.functions.openai import vision
-from pixeltable.functions.huggingface import sentence_transformer
+import pathlib
+import urllib.request
+import PIL.Image
+from openai_scheduler import scheduler
+from index_maintenance import active_index, format_report, rebuild_embedding_index, scheduler as maintenance
+from lazy_imports import DeferredFastMCP, DeferredImports
+from query_profile import QueryProfile
+from replica import replica, start_publishing, table_versions
 
-mcp = FastMCP("Pixeltable")
+def _load_imports() -> None:
+    """Import Pixeltable and the modules built on it on first use, not at startup (see lazy_imports.py)."""
+    global pxt, pxt_str, clip, sentence_transformer, caption_image, downscale_image, describe
+    global export_table, imported_config, import_tables, prepare_export, read_manifest, read_only_error
+    global snapshot_info, write_manifest
+    import pixeltable as pxt
+    from pixeltable.functions import string as pxt_str
+    from pixeltable.functions.huggingface import clip, sentence_transformer
+    from captioning import caption_image
+    from thumbnails import downscale_image
+    from snapshot import (describe, export_table, imported_config, import_tables, prepare_export, read_manifest,
+                          read_only_error, snapshot_info, write_manifest)
+
+imports = DeferredImports(_load_imports)
+
+mcp = DeferredFastMCP("Pixeltable", imports)
 
 # Base directory for all indexes
 DIRECTORY = 'image_search'
 
+CLIP_MODEL = 'openai/clip-vit-base-patch32'
+CLIP_DIMS = 512
+# Longest side of the preview used for captioning, CLIP and query results
+DEFAULT_PREVIEW_MAX_SIDE = 768
+
+# When image descriptions are computed:
+#   'eager': at insert, stored and indexed for text search
+#   'lazy':  only for the images returned by a query (requires the CLIP index)
+#   'none':  never
+CAPTION_MODES = ('eager', 'lazy', 'none')
+
+# Configuration of indexes created before these options existed
+DEFAULT_CONFIG = {'clip_index': False, 'captions': 'eager', 'preview_max_side': 0}
+
 # Registry to hold all image indexes
+# Format: {full_table_name: (image_index, config)}
 image_indexes = {}
 
+def _load_config(image_index) -> dict:
+    """Read the index configuration stored in the table comment."""
+    comment = image_index.get_metadata().get('comment') or ''
+    try:
+        return {**DEFAULT_CONFIG, **json.loads(comment)}
+    except ValueError:
+        return dict(DEFAULT_CONFIG)
+
+def _image_column_name(config: dict) -> str:
+    """Return the column images are captioned and indexed from: the preview if there is one."""
+    return 'image_preview' if config['preview_max_side'] else 'image_file'
+
+def _image_column(image_index, config: dict):
+    return getattr(image_index, _image_column_name(config))
+
+def _file_url(location: str) -> str:
+    """Normalize a location the way Pixeltable stores it: local paths become file:// URLs."""
+    return location if '://' in location else pathlib.Path(location).absolute().as_uri()
+
+def _open_image(location: str) -> PIL.Image.Image:
+    """Load an example image from a local path or URL."""
+    if '://' in location:
+        with urllib.request.urlopen(location) as response:
+            return PIL.Image.open(io.BytesIO(response.read())).convert('RGB')
+    return PIL.Image.open(location).convert('RGB')
+
 @mcp.tool()
-def setup_image_index(table_name: str, openai_api_key: str) -> str:
+def setup_image_index(table_name: str, openai_api_key: str = '', clip_index: bool = False,
+                      captions: str = 'eager', preview_max_side: int = DEFAULT_PREVIEW_MAX_SIDE) -> str:
     """Set up an image index with the provided name and OpenAI API key.
 
     Args:
         table_name: The name of the image index (e.g., 'photos', 'artwork').
-        openai_api_key: The OpenAI API key required for GPT-4 Vision.
+        openai_api_key: The OpenAI API key required for GPT-4 Vision (not needed if captions is 'none').
+        clip_index: Whether to index the images themselves with CLIP, computed locally on CPU.
+            Images are then searchable by text or by example image as soon as they are inserted.
+        captions: When GPT-4 Vision descriptions are computed (default is 'eager').
+            'eager' describes every image at insert and indexes the descriptions for text search,
+            'lazy' only describes the images returned by a query, 'none' never describes images.
+            'lazy' and 'none' require clip_index.
+        preview_max_side: Longest side in pixels of the downscaled preview that is stored with each image and
+            used for captioning, CLIP and query results (default is 768). 0 uses the original images.
 
     Returns:
         A message indicating whether the index was created, already exists, or failed.
     """
     global image_indexes
+    if replica.enabled:
+        return replica.read_only_error()
     try:
-        # Set the API key
-        os.environ['OPENAI_API_KEY'] = openai_api_key
-
         # Construct full table name
         full_table_name = f'{DIRECTORY}.{table_name}'
 
+        if captions not in CAPTION_MODES:
+            return f"Error: Invalid captions mode '{captions}'. Valid modes are: {', '.join(CAPTION_MODES)}"
+        if captions != 'eager' and not clip_index:
+            return f"Error: captions='{captions}' requires clip_index=True, otherwise images cannot be searched."
+
+        # Set the API key
+        if openai_api_key:
+            os.environ['OPENAI_API_KEY'] = openai_api_key
+
         # Check if the table already exists
         existing_tables = pxt.list_tables()
         if full_table_name in existing_tables:
             image_index = pxt.get_table(full_table_name)
-            image_indexes[full_table_name] = image_index
+            image_indexes[full_table_name] = (image_index, _load_config(image_index))
             return f"Image index '{full_table_name}' already exists and is ready for use."
 
-        # Create directory and table
+        # Create directory and table; the configuration is kept in the table comment
+        config = {'clip_index': clip_index, 'captions': captions, 'preview_max_side': max(preview_max_side, 0)}
         pxt.create_dir(DIRECTORY, if_exists='ignore')
         image_index = pxt.create_table(
             full_table_name, 
             {'image_file': pxt.Image},
+            comment=json.dumps(config),
             if_exists='ignore'
         )
 
-        # Add GPT-4 Vision analysis
-        image_index.add_computed_column(
-            image_description=vision(
-                prompt="Describe the image. Be specific on the colors you see.",
-                image=image_index.image_file,
-                model="gpt-4o-mini"
+        # Store a downscaled preview, decoded from the original file at reduced scale
+        if config['preview_max_side']:
+            image_index.add_computed_column(
+                image_preview=downscale_image(image_index.image_file.localpath, config['preview_max_side'])
+            )
+        source_column = _image_column(image_index, config)
+
+        # Index the images directly with CLIP
+        if clip_index:
+            clip_model = clip.using(model_id=CLIP_MODEL)
+            image_index.add_embedding_index(
+                column=source_column,
+                string_embed=clip_model,
+                image_embed=clip_model,
+                if_exists='ignore'
+            )
+
+        # Add GPT-4 Vision analysis, rate limited and retried by the shared scheduler
+        if captions != 'none':
+            image_index.add_computed_column(
+                image_description=caption_image(
+                    source_column,
+                    prompt="Describe the image. Be specific on the colors you see.",
+                    model="gpt-4o-mini"
+                ),
+                # Lazy descriptions are not stored, so they are only computed for rows a query returns
+                stored=(captions == 'eager')
             )
-        )
 
         # Define the embedding model and create embedding index
-        embed_model = sentence_transformer.using(model_id='intfloat/e5-large-v2')
-        image_index.add_embedding_index(
-            column='image_description', 
-            string_embed=embed_model,
-            if_exists='ignore'
-        )
+        if captions == 'eager':
+            embed_model = sentence_transformer.using(model_id='intfloat/e5-large-v2')
+            image_index.add_embedding_index(
+                column='image_description', 
+                string_embed=embed_model,
+                if_exists='ignore'
+            )
 
         # Store in the registry
-        image_indexes[full_table_name] = image_index
+        image_indexes[full_table_name] = (image_index, config)
         return f"Image index '{full_table_name}' created successfully."
     except Exception as e:
         return f"Error setting up image index '{full_table_name}': {str(e)}"
@@ -84,20 +186,143 @@ def insert_image(table_name: str, image_location: str) -> str:
     try:
         if full_table_name not in image_indexes:
             return f"Error: Image index '{full_table_name}' not set up. Please call setup_image_index first."
-        image_index = image_indexes[full_table_name]
-        image_index.insert([{'image_file': image_location}])
+        image_index, config = image_indexes[full_table_name]
+        info = snapshot_info(config)
+        if info:
+            return read_only_error('Image', full_table_name, info)
+        status = image_index.insert([{'image_file': image_location}], on_error='ignore')
+        if status.num_excs > 0:
+            return (f"Image file '{image_location}' inserted into index '{full_table_name}', but its description "
+                    f"failed. Call retry_failed_descriptions to retry it.")
         return f"Image file '{image_location}' inserted successfully into index '{full_table_name}'."
     except Exception as e:
         return f"Error inserting image file into '{full_table_name}': {str(e)}"
 
 @mcp.tool()
-def query_image(table_name: str, query_text: str, top_n: int = 5) -> str:
-    """Query the specified image index with a text description.
+def retry_failed_descriptions(table_name: str) -> str:
+    """Recompute image descriptions that failed, e.g. after hitting OpenAI rate limits.
+
+    Only rows whose description failed are recomputed; successful rows are left untouched.
+
+    Args:
+        table_name: The name of the image index (e.g., 'photos', 'artwork').
+
+    Returns:
+        A message with the number of rows retried and how many still failed.
+    """
+    full_table_name = f'{DIRECTORY}.{table_name}'
+    try:
+        if full_table_name not in image_indexes:
+            return f"Error: Image index '{full_table_name}' not set up. Please call setup_image_index first."
+        image_index, config = image_indexes[full_table_name]
+        info = snapshot_info(config)
+        if info:
+            return read_only_error('Image', full_table_name, info)
+        if config['captions'] != 'eager':
+            return f"Descriptions in '{full_table_name}' are computed at query time; there is nothing to retry."
+        failed = image_index.where(image_index.image_description.errortype != None).count()
+        if failed == 0:
+            return f"No failed descriptions in '{full_table_name}'."
+        status = image_index.recompute_columns('image_description', errors_only=True)
+        return (f"Retried {failed} failed descriptions in '{full_table_name}'; {status.num_excs} still failing. "
+                f"Scheduler: {scheduler.describe()}")
+    except Exception as e:
+        return f"Error retrying descriptions in '{full_table_name}': {str(e)}"
+
+@mcp.tool()
+def configure_rate_limits(requests_per_minute: int, tokens_per_minute: int, max_concurrency: int = 8) -> str:
+    """Set the OpenAI request budgets used when computing image descriptions.
+
+    Args:
+        requests_per_minute: Maximum OpenAI requests per minute.
+        tokens_per_minute: Maximum OpenAI tokens per minute.
+        max_concurrency: Upper bound on concurrent requests; lowered automatically while rate limited.
+
+    Returns:
+        The new scheduler settings and statistics.
+    """
+    if requests_per_minute < 1 or tokens_per_minute < 1 or max_concurrency < 1:
+        return "Error: requests_per_minute, tokens_per_minute and max_concurrency must be at least 1."
+    scheduler.configure(requests_per_minute, tokens_per_minute, max_concurrency)
+    return f"Rate limits updated: {scheduler.describe()}"
+
+@mcp.tool()
+def delete_image(table_name: str, image_location: str = '', location_prefix: str = '') -> str:
+    """Delete images from the specified image index, with their previews, descriptions and embeddings.
+
+    Args:
+        table_name: The name of the image index (e.g., 'photos', 'artwork').
+        image_location: Delete the image inserted from this URL or path.
+        location_prefix: Delete every image whose URL or path starts with this prefix (e.g. a directory).
+
+    Returns:
+        The number of images deleted.
+    """
+    full_table_name = f'{DIRECTORY}.{table_name}'
+    if not image_location and not location_prefix:
+        return "Error: Provide image_location or location_prefix."
+    try:
+        if full_table_name not in image_indexes:
+            return f"Error: Image index '{full_table_name}' not set up. Please call setup_image_index first."
+        image_index, config = image_indexes[full_table_name]
+        info = snapshot_info(config)
+        if info:
+            return read_only_error('Image', full_table_name, info)
+        fileurl = image_index.image_file.fileurl
+        if image_location:
+            condition = fileurl == _file_url(image_location)
+        else:
+            condition = pxt_str.startswith(fileurl, _file_url(location_prefix))
+        # Embedding index entries are removed with their rows
+        status = image_index.delete(where=condition)
+        return f"Deleted {status.num_rows} images from index '{full_table_name}'."
+    except Exception as e:
+        return f"Error deleting from image index '{full_table_name}': {str(e)}"
+
+@mcp.tool()
+def update_image(table_name: str, image_location: str, new_image_location: str) -> str:
+    """Replace an image in the specified image index; only its preview, description and embeddings are recomputed.
 
     Args:
         table_name: The name of the image index (e.g., 'photos', 'artwork').
-        query_text: The text description to search for in the image descriptions.
+        image_location: The URL or path the image was inserted from.
+        new_image_location: The URL or path of the replacement image.
+
+    Returns:
+        A confirmation message indicating success or failure.
+    """
+    full_table_name = f'{DIRECTORY}.{table_name}'
+    try:
+        if full_table_name not in image_indexes:
+            return f"Error: Image index '{full_table_name}' not set up. Please call setup_image_index first."
+        image_index, config = image_indexes[full_table_name]
+        info = snapshot_info(config)
+        if info:
+            return read_only_error('Image', full_table_name, info)
+        # Updating the media column cascades to the computed columns that depend on it
+        status = image_index.update(
+            {'image_file': new_image_location}, where=image_index.image_file.fileurl == _file_url(image_location)
+        )
+        if status.num_rows == 0:
+            return f"Error: Image '{image_location}' not found in index '{full_table_name}'."
+        return f"Image '{image_location}' replaced with '{new_image_location}' in index '{full_table_name}'."
+    except Exception as e:
+        return f"Error updating image in '{full_table_name}': {str(e)}"
+
+@mcp.tool()
+def query_image(table_name: str, query_text: str = '', top_n: int = 5, query_image_location: str = '',
+                search: str = 'auto', profile: bool = False) -> str:
+    """Query the specified image index with a text description or an example image.
+
+    Args:
+        table_name: The name of the image index (e.g., 'photos', 'artwork').
+        query_text: The text description to search for.
         top_n: Number of top results to return (default is 5).
+        query_image_location: The URL or path of an example image to search for similar images
+            (requires the CLIP index); used instead of query_text.
+        search: What to search (default is 'auto'). 'image' searches the CLIP image index,
+            'description' searches the image descriptions, 'auto' prefers the CLIP index if there is one.
+        profile: Append a summary of the request (filters, index, ordering), row counts and per-stage timings.
 
     Returns:
         A string containing the top matching images and their similarity scores.
@@ -106,28 +331,250 @@ def query_image(table_name: str, query_text: str, top_n: int = 5) -> str:
     try:
         if full_table_name not in image_indexes:
             return f"Error: Image index '{full_table_name}' not set up. Please call setup_image_index first."
-        image_index = image_indexes[full_table_name]
-        
-        # Calculate similarity scores
-        sim = image_index.image_description.similarity(query_text)
+        stale = replica.check(table_name)
+        if stale:
+            return stale
+        image_index, config = image_indexes[full_table_name]
+        if not query_text and not query_image_location:
+            return "Error: Provide either query_text or query_image_location."
+
+        if search == 'auto':
+            search = 'image' if config['clip_index'] else 'description'
+        if search == 'image' and not config['clip_index']:
+            return f"Error: Image index '{full_table_name}' has no CLIP index; use search='description'."
+        if search == 'description' and (config['captions'] != 'eager' or query_image_location):
+            return f"Error: Image index '{full_table_name}' can only be searched by description with a text query " \
+                   f"and eagerly computed descriptions; use search='image'."
+        if search not in ('image', 'description'):
+            return f"Error: Invalid search '{search}'. Valid values are: auto, image, description"
 
-        # Get top results
-        results = (image_index.order_by(sim, asc=False)
-                  .select(image_index.image_file, image_index.image_description, sim=sim)
-                  .limit(top_n)
-                  .collect())
+        query_profile = QueryProfile()
+        with query_profile.stage('build'):
+            # Calculate similarity scores
+            if search == 'image':
+                query = _open_image(query_image_location) if query_image_location else query_text
+                column = _image_column(image_index, config)
+                sim = column.similarity(query, idx=active_index(full_table_name, _image_column_name(config)))
+            else:
+                sim = image_index.image_description.similarity(
+                    query_text, idx=active_index(full_table_name, 'image_description')
+                )
+
+            # Get top results; lazy descriptions are computed here, for these rows only
+            # Return where the original and the cached preview are, without decoding either
+            columns = {'image_file': image_index.image_file.fileurl}
+            if config['preview_max_side']:
+                columns['preview'] = image_index.image_preview.fileurl
+            if config['captions'] != 'none':
+                columns['image_description'] = image_index.image_description
+            top_query = (image_index.order_by(sim, asc=False)
+                         .select(**columns, sim=sim)
+                         .limit(top_n))
+        # The query is embedded when it runs, so 'search' includes embedding, index scan, fetch
+        # and, for lazy captions, describing the returned images
+        with query_profile.stage('search'):
+            results = top_query.collect()
 
         # Format the results
-        result_str = f"Query Results for '{query_text}' in '{full_table_name}':\n\n"
-        for i, row in enumerate(results.to_pandas().itertuples(), 1):
-            result_str += f"{i}. Score: {row.sim:.4f}\n"
-            result_str += f"   Description: {row.image_description}\n"
-            result_str += f"   Image: {row.image_file}\n\n"
-        
+        with query_profile.stage('serialize'):
+            query_label = query_image_location or query_text
+            result_str = f"Query Results for '{query_label}' in '{full_table_name}':\n\n"
+            for i, row in enumerate(results, 1):
+                result_str += f"{i}. Score: {row['sim']:.4f}\n"
+                if config['captions'] != 'none':
+                    result_str += f"   Description: {row['image_description']}\n"
+                result_str += f"   Image: {row['image_file']}\n"
+                if config['preview_max_side']:
+                    result_str += f"   Preview: {row['preview']}\n"
+                result_str += "\n"
+
+        if profile:
+            query_profile.step(f"source: {full_table_name}")
+            query_profile.step(f"order by: similarity({'image' if search == 'image' else 'image_description'}, "
+                               f"{'image' if query_image_location else 'text'} query) desc, limit {top_n}")
+            query_profile.step(f"select: {', '.join(columns)}, sim")
+            query_profile.index = f"CLIP embedding index ({CLIP_MODEL})" if search == 'image' \
+                else "embedding index on image_description (intfloat/e5-large-v2)"
+            query_profile.rows['returned'] = len(results)
+            query_profile.count('indexed', image_index)
+            result_str += f"{query_profile.report()}\n"
+
         return result_str if result_str else "No results found."
     except Exception as e:
         return f"Error querying image index '{full_table_name}': {str(e)}"
 
+def _maintain(full_table_name: str) -> list:
+    """Rebuild the CLIP and description embedding indexes an image index has."""
+    _, config = image_indexes[full_table_name]
+    reports = []
+    if config['clip_index']:
+        clip_model = clip.using(model_id=CLIP_MODEL)
+        column = _image_column_name(config)
+        report = rebuild_embedding_index(full_table_name, column, CLIP_DIMS,
+                                         string_embed=clip_model, image_embed=clip_model)
+        reports.append(format_report(full_table_name, column, report))
+    if config['captions'] == 'eager':
+        embed_model = sentence_transformer.using(model_id='intfloat/e5-large-v2')
+        report = rebuild_embedding_index(full_table_name, 'image_description', 1024, string_embed=embed_model)
+        reports.append(format_report(full_table_name, 'image_description', report))
+    return reports or ["No embedding indexes to rebuild."]
+
+@imports.wrap
+def _maintain_all() -> None:
+    for full_table_name, (_, config) in list(image_indexes.items()):
+        # Imported indexes do not change, so there is nothing to maintain
+        if not snapshot_info(config):
+            _maintain(full_table_name)
+
+@mcp.tool()
+def maintain_index(table_name: str) -> str:
+    """Rebuild the embedding indexes of an image index, e.g. after many inserts and deletions.
+
+    A new index is built alongside the current one, which keeps serving queries until the new
+    index is ready; then queries switch over and the old index is dropped.
+
+    Args:
+        table_name: The name of the image index.
+
+    Returns:
+        Each new index's row count, approximate size and build time.
+    """
+    full_table_name = f'{DIRECTORY}.{table_name}'
+    try:
+        if full_table_name not in image_indexes:
+            return f"Error: Image index '{full_table_name}' not set up. Please call setup_image_index first."
+        info = snapshot_info(image_indexes[full_table_name][1])
+        if info:
+            return read_only_error('Image', full_table_name, info)
+        return "Rebuilt:\n" + "\n".join(_maintain(full_table_name))
+    except Exception as e:
+        return f"Error maintaining image index '{full_table_name}': {str(e)}"
+
+@mcp.tool()
+def schedule_index_maintenance(interval_hours: float) -> str:
+    """Rebuild the embedding indexes of all loaded image indexes periodically in the background.
+
+    Args:
+        interval_hours: Hours between rebuilds; 0 turns scheduled maintenance off.
+    """
+    maintenance.start(interval_hours, _maintain_all)
+    return f"Index maintenance: {maintenance.describe()}"
+
+# Optional scheduled maintenance from the environment, e.g. INDEX_MAINTENANCE_INTERVAL_HOURS=24
+maintenance.start(float(os.environ.get('INDEX_MAINTENANCE_INTERVAL_HOURS', 0)), _maintain_all)
+
+@imports.wrap
+def _export(full_table_name: str, export_path: str) -> dict:
+    """Export a loaded image index to a directory and return the export's manifest."""
+    image_index, config = image_indexes[full_table_name]
+    prepare_export(export_path)
+    # Lazy descriptions are not stored; exporting them would compute them for every image
+    if config['captions'] == 'eager':
+        table = export_table(export_path, '', image_index, {'image_file': 'Image', 'image_description': 'String'},
+                             embedded=('image_description',))
+    else:
+        table = export_table(export_path, '', image_index, {'image_file': 'Image'})
+    return write_manifest(export_path, 'image-index', full_table_name, config, [table])
+
+def _import(export_path: str, manifest: dict, full_table_name: str, table_path: str) -> None:
+    """Import an export as a table at table_path and serve it as the image index full_table_name."""
+    config = imported_config(manifest)
+    image_index = import_tables(export_path, manifest, {'': table_path}, json.dumps(config))['']
+    try:
+        # Recreate what setup_image_index computes without a model call per image
+        if config['preview_max_side']:
+            image_index.add_computed_column(
+                image_preview=downscale_image(image_index.image_file.localpath, config['preview_max_side'])
+            )
+        if config['clip_index']:
+            clip_model = clip.using(model_id=CLIP_MODEL)
+            image_index.add_embedding_index(column=_image_column_name(config), string_embed=clip_model,
+                                            image_embed=clip_model)
+        if config['captions'] == 'lazy':
+            image_index.add_computed_column(
+                image_description=caption_image(
+                    _image_column(image_index, config),
+                    prompt="Describe the image. Be specific on the colors you see.",
+                    model="gpt-4o-mini"
+                ),
+                stored=False
+            )
+    except Exception:
+        pxt.drop_table(table_path)
+        raise
+    image_indexes[full_table_name] = (image_index, config)
+
+@mcp.tool()
+def export_index(table_name: str, export_path: str) -> str:
+    """Export an image index to a directory, so another server can import it without recomputing it.
+
+    Image descriptions are written as Parquet and their embeddings as memory-mappable Arrow files.
+    Images are referenced by URL, not copied.
+
+    Args:
+        table_name: The name of the image index (e.g., 'photos', 'artwork').
+        export_path: Directory to write the export to; created if needed, must not hold an export already.
+
+    Returns:
+        The exported table with its row and vector counts.
+    """
+    full_table_name = f'{DIRECTORY}.{table_name}'
+    try:
+        if full_table_name not in image_indexes:
+            return f"Error: Image index '{full_table_name}' not set up. Please call setup_image_index first."
+        manifest = _export(full_table_name, export_path)
+        return f"Exported image index '{full_table_name}' to '{export_path}':\n{describe(manifest)}"
+    except Exception as e:
+        return f"Error exporting image index '{full_table_name}': {str(e)}"
+
+@mcp.tool()
+def import_index(export_path: str, table_name: str = '') -> str:
+    """Import an image index exported by export_index, without describing or embedding the descriptions again.
+
+    Previews and the CLIP index, if the index has them, are computed locally from the images, which
+    must be reachable at their exported URLs. The imported index serves query_image like the
+    original, but is a read-only snapshot: it does not accept new images.
+
+    Args:
+        export_path: Directory written by export_index.
+        table_name: Name for the imported index; defaults to the name of the exported one.
+
+    Returns:
+        The imported table with its row and vector counts.
+    """
+    if replica.enabled:
+        return replica.read_only_error()
+    try:
+        manifest = read_manifest(export_path, 'image-index')
+        full_table_name = f"{DIRECTORY}.{table_name or manifest['index'].split('.', 1)[1]}"
+        if full_table_name in pxt.list_tables():
+            return f"Error: Image index '{full_table_name}' already exists."
+
+        pxt.create_dir(DIRECTORY, if_exists='ignore')
+        _import(export_path, manifest, full_table_name, full_table_name)
+        return f"Imported '{export_path}' as read-only image index '{full_table_name}':\n{describe(manifest)}"
+    except Exception as e:
+        return f"Error importing image index from '{export_path}': {str(e)}"
+
+@imports.wrap
+def _replicate(export_path: str, table_name: str, table_path: str) -> None:
+    _import(export_path, read_manifest(export_path, 'image-index'), f'{DIRECTORY}.{table_name}', table_path)
+
+@imports.wrap
+def _published() -> list[str]:
+    """Names of the loaded indexes built by this server, which a writer publishes snapshots of."""
+    return [full_table_name.split('.', 1)[1] for full_table_name, (_, config) in list(image_indexes.items())
+            if not snapshot_info(config)]
+
+def _version(table_name: str) -> tuple:
+    """Version of a loaded index; a writer only publishes a new snapshot of it when this changes."""
+    image_index, _ = image_indexes[f'{DIRECTORY}.{table_name}']
+    return table_versions(image_index)
+
+# Read-only replica mode (REPLICA_OF) or snapshot publishing on a writer (SNAPSHOT_DIR); see replica.py
+replica.start(DIRECTORY, _replicate)
+start_publishing(_published, lambda table_name, path: _export(f'{DIRECTORY}.{table_name}', path), _version)
+
 @mcp.tool()
 def list_tables() -> str:
     """List all image indexes currently available.
@@ -135,6 +582,8 @@ def list_tables() -> str:
     Returns:
         A string listing the current image indexes.
     """
+    if replica.enabled:
+        return replica.describe()
     tables = pxt.list_tables()
     image_tables = [t for t in tables if t.startswith(f'{DIRECTORY}.')]
     return f"Current image indexes: {', '.join(image_tables)}" if image_tables else "No image indexes exist."
\ No newline at end of file
@@ -0,0 +1,74 @@
+import contextlib
+import contextvars
+import os
+import shutil
+import subprocess
+import tempfile
+from typing import Iterator, Optional
+
+import pixeltable as pxt
+
+# Whisper resamples everything to 16 kHz mono, so there is no point in keeping more than that
+SPEECH_SAMPLE_RATE = 16000
+
+# Codec to use for each supported output container
+CODECS = {
+    'wav': 'pcm_s16le',
+    'flac': 'flac',
+}
+
+# Directory holding the scratch tracks of the current tool call (see scratch_tracks)
+_scratch_dir: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('scratch_dir', default=None)
+
+
+@pxt.udf
+def extract_speech_track(video: pxt.Video, format: str = 'wav', scratch: bool = False) -> Optional[pxt.Audio]:
+    """Extract the first audio stream of a video as a 16 kHz mono track, without any lossy encode.
+
+    Args:
+        video: The video to extract the audio from.
+        format: Output container, 'wav' (raw PCM) or 'flac' (lossless, roughly half the size).
+        scratch: Whether the track is a scratch file that can be deleted after transcription; scratch
+            tracks must be extracted within a scratch_tracks() block, which deletes them on exit.
+
+    Returns:
+        The path to the extracted track, or None if the video has no audio stream.
+    """
+    if format not in CODECS:
+        raise ValueError(f"Unsupported format '{format}'. Valid formats are: {', '.join(CODECS)}")
+    directory = _scratch_dir.get()
+    if scratch and directory is None:
+        raise RuntimeError("Scratch tracks can only be extracted within a scratch_tracks() block")
+    fd, output_path = tempfile.mkstemp(suffix=f'.{format}', dir=directory if scratch else None)
+    os.close(fd)
+    cmd = [
+        'ffmpeg', '-nostdin', '-loglevel', 'error', '-y',
+        '-i', video,
+        '-map', '0:a:0', '-vn',
+        '-ac', '1', '-ar', str(SPEECH_SAMPLE_RATE),
+        '-c:a', CODECS[format],
+        output_path,
+    ]
+    result = subprocess.run(cmd, capture_output=True)
+    if result.returncode != 0 or os.path.getsize(output_path) == 0:
+        # Most likely the video has no audio stream; mirror extract_audio() and return None
+        os.remove(output_path)
+        return None
+    return output_path
+
+
+@contextlib.contextmanager
+def scratch_tracks() -> Iterator[str]:
+    """Write the scratch tracks extracted within the block to a temp dir of its own, removed on exit.
+
+    Scratch tracks are not stored, so every call that computes chunk audio (insert, update, recomputing
+    failed transcriptions) extracts the track again from the stored video, into its own block. Concurrent
+    calls never share a directory, so one call cannot delete a track another is still transcribing.
+    """
+    directory = tempfile.mkdtemp(prefix='speech_tracks_')
+    token = _scratch_dir.set(directory)
+    try:
+        yield directory
+    finally:
+        _scratch_dir.reset(token)
+        shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,47 @@
+"""Compare transcription backends on local audio files, without Pixeltable or the MCP server.
+
+Usage:
+    python bench_transcription.py sample.wav [more.wav ...] --backends whisper faster-whisper stub
+
+The 'stub' backend makes no model or network calls; it sleeps STUB_LATENCY_SEC per request to stand
+in for the remote API, so the concurrent request path can be measured offline.
+"""
+import argparse
+import subprocess
+import time
+
+from transcription_backends import DEFAULT_MODELS, transcribe_file, transcribe_files
+
+
+def audio_duration(path: str) -> float:
+    result = subprocess.run(
+        ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'csv=p=0', path],
+        capture_output=True, text=True, check=True
+    )
+    return float(result.stdout.strip())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark transcription backends")
+    parser.add_argument("files", nargs="+", help="Audio files to transcribe")
+    parser.add_argument("--backends", nargs="+", default=list(DEFAULT_MODELS), choices=list(DEFAULT_MODELS))
+    args = parser.parse_args()
+
+    total_audio = sum(audio_duration(path) for path in args.files)
+    print(f"{len(args.files)} file(s), {total_audio:.1f}s of audio\n")
+    print(f"{'backend':<16}{'model':<12}{'load (s)':>10}{'total (s)':>12}{'realtime x':>12}")
+    for backend in args.backends:
+        model = DEFAULT_MODELS[backend]
+        # The first call includes model loading; time it separately
+        start = time.perf_counter()
+        transcribe_file(args.files[0], backend, model)
+        load_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        transcribe_files(args.files, backend, model)
+        elapsed = time.perf_counter() - start
+        print(f"{backend:<16}{model:<12}{load_time:>10.2f}{elapsed:>12.2f}{total_audio / elapsed:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
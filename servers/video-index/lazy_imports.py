@@ -0,0 +1,72 @@
+"""Deferred imports of Pixeltable and everything built on it, so a server starts serving first.
+
+Importing pixeltable, its model integrations and the modules built on them (transcription, UDFs,
+iterators) pulls torch, transformers and spacy into the process, which takes many seconds. tools.py
+imports them in a function instead of at module level, and DeferredImports runs that function once:
+when the first tool is called, or earlier in the background once the server is up (warm_up).
+The tool list and the SSE endpoint do not need them, so clients can connect right away.
+
+EAGER_IMPORTS=1 imports everything at startup instead, as before.
+"""
+import functools
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Optional
+
+import anyio
+from mcp.server.fastmcp import FastMCP
+
+logger = logging.getLogger('lazy_imports')
+
+EAGER_IMPORTS = os.environ.get('EAGER_IMPORTS', '') not in ('', '0')
+
+
+class DeferredImports:
+    def __init__(self, load: Callable[[], None]):
+        self._load = load
+        self._lock = threading.Lock()
+        self.loaded = False
+        self.load_sec: Optional[float] = None
+        if EAGER_IMPORTS:
+            self.ensure()
+
+    def ensure(self) -> None:
+        """Run the imports if they have not run yet; concurrent callers wait for the first one."""
+        if self.loaded:
+            return
+        with self._lock:
+            if self.loaded:
+                return
+            start = time.perf_counter()
+            self._load()
+            self.load_sec = time.perf_counter() - start
+            self.loaded = True
+            logger.info(f"Loaded deferred imports in {self.load_sec:.1f}s")
+
+    def warm_up(self) -> None:
+        """Start the imports in a background thread, so the first tool call waits less or not at all."""
+        if not self.loaded:
+            threading.Thread(target=self.ensure, daemon=True, name='deferred-imports').start()
+
+    def wrap(self, fn: Callable[..., Any]) -> Callable[..., Any]:
+        """Wrap a function that background jobs call outside of a tool call, so it runs the imports first."""
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            self.ensure()
+            return fn(*args, **kwargs)
+        return wrapper
+
+
+class DeferredFastMCP(FastMCP):
+    """A FastMCP server that runs the deferred imports before any tool."""
+
+    def __init__(self, name: str, imports: DeferredImports, **settings: Any):
+        super().__init__(name, **settings)
+        self.imports = imports
+
+    async def call_tool(self, name: str, arguments: dict[str, Any]) -> Any:
+        # In a worker thread, so the event loop keeps serving other connections while the imports run
+        await anyio.to_thread.run_sync(self.imports.ensure)
+        return await super().call_tool(name, arguments)
@@ -0,0 +1,84 @@
+"""Minimal local stand-in for the OpenAI API, for exercising the request scheduler offline.
+
+Serves chat completions and audio transcriptions with a fixed latency, and answers a fraction of
+requests with 429 (with a Retry-After header) or 500 so that backoff and retries can be observed.
+
+Usage:
+    python mock_openai.py --port 8999 --latency 0.3 --rate-limit-fraction 0.2
+    OPENAI_BASE_URL=http://localhost:8999/v1 OPENAI_API_KEY=mock python server.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+counts = {'requests': 0, 'rate_limited': 0, 'errors': 0}
+counts_lock = threading.Lock()
+
+
+def make_handler(latency: float, rate_limit_fraction: float, error_fraction: float):
+    class MockOpenAIHandler(BaseHTTPRequestHandler):
+        def _send(self, status: int, body: dict, headers: dict = None) -> None:
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self) -> None:
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            time.sleep(latency)
+            roll = random.random()
+            with counts_lock:
+                counts['requests'] += 1
+                if roll < rate_limit_fraction:
+                    counts['rate_limited'] += 1
+                elif roll < rate_limit_fraction + error_fraction:
+                    counts['errors'] += 1
+            if roll < rate_limit_fraction:
+                self._send(429, {'error': {'message': 'Rate limit reached', 'type': 'requests'}}, {'Retry-After': '1'})
+            elif roll < rate_limit_fraction + error_fraction:
+                self._send(500, {'error': {'message': 'Internal error', 'type': 'server_error'}})
+            elif self.path.endswith('/chat/completions'):
+                self._send(200, {
+                    'id': 'chatcmpl-mock', 'object': 'chat.completion', 'created': int(time.time()), 'model': 'mock',
+                    'choices': [{'index': 0, 'finish_reason': 'stop',
+                                 'message': {'role': 'assistant', 'content': 'A mock description.'}}],
+                    'usage': {'prompt_tokens': 100, 'completion_tokens': 5, 'total_tokens': 105},
+                })
+            elif self.path.endswith('/audio/transcriptions'):
+                self._send(200, {
+                    'text': 'A mock transcription.', 'language': 'english', 'duration': 30.0,
+                    'segments': [{'id': 0, 'start': 0.0, 'end': 30.0, 'text': 'A mock transcription.'}],
+                })
+            else:
+                self._send(404, {'error': {'message': f'Unknown path {self.path}'}})
+
+        def log_message(self, format: str, *args) -> None:
+            pass
+
+    return MockOpenAIHandler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a mock OpenAI API server")
+    parser.add_argument("--host", default="127.0.0.1", help="Host to bind to")
+    parser.add_argument("--port", type=int, default=8999, help="Port to listen on")
+    parser.add_argument("--latency", type=float, default=0.3, help="Seconds to wait before each response")
+    parser.add_argument("--rate-limit-fraction", type=float, default=0.1, help="Fraction of requests answered with 429")
+    parser.add_argument("--error-fraction", type=float, default=0.0, help="Fraction of requests answered with 500")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(
+        (args.host, args.port), make_handler(args.latency, args.rate_limit_fraction, args.error_fraction)
+    )
+    print(f"Mock OpenAI API on http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"Served {counts['requests']} requests ({counts['rate_limited']} rate limited, {counts['errors']} errors)")
@@ -0,0 +1,44 @@
+"""Monthly partitioning of the sentence index by uploaded_at.
+
+A partitioned video index keeps one sentence view, with its own embedding index, per calendar
+month of uploads. Queries with a time filter only search the months that overlap it, and expired
+months can be dropped as a whole instead of deleting rows out of one ever-growing index.
+"""
+from datetime import datetime
+from typing import Iterable, Optional
+
+PARTITIONING_MODES = ('none', 'monthly')
+
+
+def partition_key(timestamp: datetime) -> str:
+    """The partition a timestamp falls in, e.g. '202610' for October 2026."""
+    return f'{timestamp.year:04d}{timestamp.month:02d}'
+
+
+def partition_bounds(key: str) -> tuple[datetime, datetime]:
+    """The [start, end) time range covered by a partition."""
+    year, month = int(key[:4]), int(key[4:])
+    start = datetime(year, month, 1)
+    end = datetime(year + month // 12, month % 12 + 1, 1)
+    return start, end
+
+
+def months_before(timestamp: datetime, months: int) -> str:
+    """The key of the partition the given number of months before timestamp's partition."""
+    index = timestamp.year * 12 + timestamp.month - 1 - months
+    return f'{index // 12:04d}{index % 12 + 1:02d}'
+
+
+def overlapping(keys: Iterable[str], after: Optional[datetime], before: Optional[datetime]) -> list[str]:
+    """The partitions that may hold rows uploaded in [after, before)."""
+    selected = []
+    for key in sorted(keys):
+        start, end = partition_bounds(key)
+        if (after is None or end > after) and (before is None or start < before):
+            selected.append(key)
+    return selected
+
+
+def parse_time(value: str) -> Optional[datetime]:
+    """Parse an ISO date or datetime such as '2026-10-01' or '2026-10-01T12:00'; '' means no bound."""
+    return datetime.fromisoformat(value) if value else None
@@ -0,0 +1,46 @@
+"""Per-query request summary and timing report, returned by query tools called with profile=True.
+
+Pixeltable does not expose the plan it executes, so the report summarizes what the tool asked
+Pixeltable for (source, filters, index, ordering, limit, projection) and says so. It does not show
+which filters Pixeltable pushed down or how it used the index. Row counts come from count() queries
+that only run while profiling, timed as their own stage.
+"""
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+
+class QueryProfile:
+    def __init__(self):
+        self.summary: list[str] = []
+        self.index: str = 'none'
+        self.rows: dict[str, Any] = {}
+        self.timings: dict[str, float] = {}
+
+    def step(self, description: str) -> None:
+        self.summary.append(description)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time a block of work, adding to the stage's total if it runs more than once."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + (time.perf_counter() - start) * 1000
+
+    def count(self, name: str, query: Any) -> None:
+        """Record the number of rows a query matches, without counting the time against other stages."""
+        with self.stage('count'):
+            self.rows[name] = query.count()
+
+    def report(self) -> str:
+        lines = ["Request summary (as requested; not the plan Pixeltable executed):"]
+        lines += [f"  {i}. {step}" for i, step in enumerate(self.summary, 1)]
+        lines.append(f"Index requested: {self.index}")
+        if self.rows:
+            lines.append("Rows: " + ", ".join(f"{name} {count}" for name, count in self.rows.items()))
+        total = sum(ms for name, ms in self.timings.items() if name != 'count')
+        lines.append("Timings: " + ", ".join(f"{name} {ms:.1f} ms" for name, ms in self.timings.items())
+                     + f" (total {total:.1f} ms excluding count)")
+        return "\n".join(lines)
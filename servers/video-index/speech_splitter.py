@@ -0,0 +1,193 @@
+import re
+import subprocess
+import uuid
+from typing import Any, Optional
+
+import pixeltable as pxt
+import pixeltable.type_system as ts
+from pixeltable.env import Env
+from pixeltable.iterators.base import ComponentIterator
+
+SPEECH_SAMPLE_RATE = 16000
+
+_SILENCE_START = re.compile(r'silence_start: (-?[\d.]+)')
+_SILENCE_END = re.compile(r'silence_end: (-?[\d.]+)')
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+
+def _probe_duration(path: str) -> float:
+    """Return the duration of a media file in seconds."""
+    result = subprocess.run(
+        ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'csv=p=0', path],
+        capture_output=True, text=True, check=True
+    )
+    return float(result.stdout.strip())
+
+
+def detect_speech(path: str, noise_db: float = -35.0, min_silence_sec: float = 0.5) -> list[tuple[float, float]]:
+    """Detect the regions of an audio file that are not silence, using ffmpeg's silencedetect filter.
+
+    This is a loudness threshold, not a voice activity detector: music and other noise above noise_db
+    count as speech.
+
+    Args:
+        path: Path to the audio file.
+        noise_db: Level below which audio is considered silence.
+        min_silence_sec: Minimum length of a silence for it to split speech regions.
+
+    Returns:
+        A list of (start, end) tuples in seconds, in order.
+    """
+    duration = _probe_duration(path)
+    result = subprocess.run(
+        ['ffmpeg', '-nostdin', '-hide_banner', '-i', path, '-vn',
+         '-af', f'silencedetect=noise={noise_db}dB:d={min_silence_sec}', '-f', 'null', '-'],
+        capture_output=True, text=True, check=True
+    )
+    regions = []
+    speech_start: Optional[float] = 0.0
+    for line in result.stderr.splitlines():
+        if (match := _SILENCE_START.search(line)) is not None:
+            silence_start = max(float(match.group(1)), 0.0)
+            if speech_start is not None and silence_start > speech_start:
+                regions.append((speech_start, silence_start))
+            speech_start = None
+        elif (match := _SILENCE_END.search(line)) is not None:
+            speech_start = float(match.group(1))
+    # A trailing silence has no silence_end, in which case there is no speech left
+    if speech_start is not None and speech_start < duration:
+        regions.append((speech_start, duration))
+    return regions
+
+
+def pack_speech_regions(
+    regions: list[tuple[float, float]],
+    max_chunk_duration_sec: float,
+    max_gap_sec: float,
+    min_chunk_duration_sec: float,
+    padding_sec: float,
+    duration: Optional[float] = None,
+) -> list[tuple[float, float]]:
+    """Group speech regions into chunks that start and end on speech boundaries.
+
+    Regions separated by at most max_gap_sec are merged into the same chunk as long as it stays
+    within max_chunk_duration_sec; longer pauses start a new chunk and are not transcribed.
+    A single region longer than max_chunk_duration_sec is cut into windows of that length.
+    """
+    chunks: list[tuple[float, float]] = []
+    current: Optional[tuple[float, float]] = None
+    for start, end in regions:
+        start = max(start - padding_sec, 0.0)
+        end = end + padding_sec if duration is None else min(end + padding_sec, duration)
+        if current is not None and start - current[1] <= max_gap_sec and end - current[0] <= max_chunk_duration_sec:
+            current = (current[0], max(current[1], end))
+            continue
+        if current is not None:
+            chunks.append(current)
+        while end - start > max_chunk_duration_sec:
+            chunks.append((start, start + max_chunk_duration_sec))
+            start += max_chunk_duration_sec
+        current = (start, end)
+    if current is not None:
+        chunks.append(current)
+    return [(start, end) for start, end in chunks if end - start >= min_chunk_duration_sec]
+
+
+class SpeechSplitter(ComponentIterator):
+    """Iterator over the speech in an audio file, cut on silence boundaries.
+
+    Drop-in replacement for AudioSplitter: produces the same start_time_sec, end_time_sec and
+    audio_chunk columns, but skips stretches quieter than noise_db and never overlaps chunks. Chunks
+    are 16 kHz mono PCM, which is what Whisper works with internally. They are written to Pixeltable's
+    tmp dir, from which Pixeltable moves stored chunks into its media store, as AudioSplitter does.
+    """
+
+    def __init__(
+        self,
+        audio: str,
+        max_chunk_duration_sec: float = 30.0,
+        max_gap_sec: float = 1.5,
+        min_chunk_duration_sec: float = 1.0,
+        padding_sec: float = 0.2,
+        noise_db: float = -35.0,
+        min_silence_sec: float = 0.5,
+    ):
+        self.audio = audio
+        duration = _probe_duration(audio)
+        regions = detect_speech(audio, noise_db=noise_db, min_silence_sec=min_silence_sec)
+        self.chunks = pack_speech_regions(
+            regions, max_chunk_duration_sec, max_gap_sec, min_chunk_duration_sec, padding_sec, duration=duration
+        )
+        self.next_pos = 0
+
+    @classmethod
+    def input_schema(cls) -> dict[str, ts.ColumnType]:
+        return {
+            'audio': ts.AudioType(nullable=False),
+            'max_chunk_duration_sec': ts.FloatType(nullable=True),
+            'max_gap_sec': ts.FloatType(nullable=True),
+            'min_chunk_duration_sec': ts.FloatType(nullable=True),
+            'padding_sec': ts.FloatType(nullable=True),
+            'noise_db': ts.FloatType(nullable=True),
+            'min_silence_sec': ts.FloatType(nullable=True),
+        }
+
+    @classmethod
+    def output_schema(cls, *args: Any, **kwargs: Any) -> tuple[dict[str, ts.ColumnType], list[str]]:
+        return {
+            'start_time_sec': ts.FloatType(),
+            'end_time_sec': ts.FloatType(),
+            'audio_chunk': ts.AudioType(nullable=True),
+        }, []
+
+    def __next__(self) -> dict[str, Any]:
+        if self.next_pos >= len(self.chunks):
+            raise StopIteration
+        start, end = self.chunks[self.next_pos]
+        self.next_pos += 1
+        output_path = str(Env.get().tmp_dir / f'{uuid.uuid4()}.wav')
+        subprocess.run(
+            ['ffmpeg', '-nostdin', '-loglevel', 'error', '-y',
+             '-ss', f'{start:.3f}', '-t', f'{end - start:.3f}', '-i', self.audio,
+             '-vn', '-ac', '1', '-ar', str(SPEECH_SAMPLE_RATE), '-c:a', 'pcm_s16le', output_path],
+            capture_output=True, check=True
+        )
+        return {'start_time_sec': start, 'end_time_sec': end, 'audio_chunk': output_path}
+
+    def close(self) -> None:
+        pass
+
+    def set_pos(self, pos: int) -> None:
+        self.next_pos = pos
+
+
+def drop_overlap(transcription: dict, start_time_sec: float, end_time_sec: float, overlap_sec: float) -> str:
+    """Drop the part of a chunk transcript that repeats the end of the previous chunk.
+
+    Every chunk except the first starts with overlap_sec of audio that the previous chunk already
+    covered. Segments whose midpoint falls in that leading window are dropped. Transcripts without
+    segment timestamps fall back to dropping the leading sentences that fit in the window, estimated
+    from the average speaking rate of the chunk.
+    """
+    text = transcription.get('text') or ''
+    if start_time_sec <= 0 or overlap_sec <= 0:
+        return text.strip()
+    segments = transcription.get('segments')
+    if segments:
+        kept = [s['text'] for s in segments if (s['start'] + s['end']) / 2 >= overlap_sec]
+        return ''.join(kept).strip()
+    sentences = _SENTENCE_END.split(text.strip())
+    overlap_words = len(text.split()) * overlap_sec / max(end_time_sec - start_time_sec, overlap_sec)
+    words_seen = 0
+    while len(sentences) > 1:
+        words_seen += len(sentences[0].split())
+        if words_seen > overlap_words:
+            break
+        sentences.pop(0)
+    return ' '.join(sentences)
+
+
+@pxt.udf
+def trim_overlap(transcription: dict, start_time_sec: float, end_time_sec: float, overlap_sec: float) -> str:
+    """Pixeltable UDF for drop_overlap."""
+    return drop_overlap(transcription, start_time_sec, end_time_sec, overlap_sec)
@@ -1,33 +1,172 @@
-import pixeltable as pxt
+import heapq
+import json
 import os
-from mcp.server.fastmcp import FastMCP
-from pixeltable.functions import openai
-from pixeltable.functions.huggingface import sentence_transformer
-from pixeltable.functions.video import extract_audio
-from pixeltable.iterators import AudioSplitter
-from pixeltable.iterators.string import StringSplitter
+import pathlib
 from datetime import datetime
+from openai_scheduler import scheduler
+from index_maintenance import active_index, format_report, rebuild_embedding_index, scheduler as maintenance
+from lazy_imports import DeferredFastMCP, DeferredImports
+from query_profile import QueryProfile
+from partitions import PARTITIONING_MODES, months_before, overlapping, parse_time, partition_bounds, partition_key
+from replica import replica, start_publishing, table_versions
 
-mcp = FastMCP("Pixeltable")
+def _load_imports() -> None:
+    """Import Pixeltable and the modules built on it on first use, not at startup (see lazy_imports.py)."""
+    global pxt, pxt_str, sentence_transformer, extract_audio, AudioSplitter, StringSplitter
+    global extract_speech_track, scratch_tracks, SpeechSplitter, trim_overlap, TRANSCRIPTION_MODELS
+    global transcribe, describe, export_table, imported_config, import_tables, prepare_export, read_manifest
+    global read_only_error, snapshot_info, write_manifest
+    import pixeltable as pxt
+    from pixeltable.functions import string as pxt_str
+    from pixeltable.functions.huggingface import sentence_transformer
+    from pixeltable.functions.video import extract_audio
+    from pixeltable.iterators import AudioSplitter
+    from pixeltable.iterators.string import StringSplitter
+    from audio_extraction import extract_speech_track, scratch_tracks
+    from speech_splitter import SpeechSplitter, trim_overlap
+    from transcription import transcribe
+    from transcription_backends import DEFAULT_MODELS as TRANSCRIPTION_MODELS
+    from snapshot import (describe, export_table, imported_config, import_tables, prepare_export, read_manifest,
+                          read_only_error, snapshot_info, write_manifest)
+
+imports = DeferredImports(_load_imports)
+
+mcp = DeferredFastMCP("Pixeltable", imports)
 
 # Base directory for all indexes
 DIRECTORY = 'video_index'
 
+# How the audio track is handed to the splitter:
+#   'stream':  16 kHz mono PCM scratch track, not stored, deleted once the video is transcribed;
+#              anything that recomputes chunk audio later extracts the track from the video again
+#   'compact': 16 kHz mono FLAC track stored alongside the video
+#   'mp3':     full-rate mp3 track stored alongside the video (lossy re-encode)
+AUDIO_MODES = ('stream', 'compact', 'mp3')
+
+# 'fixed' cuts overlapping fixed-length windows, 'vad' cuts on silence and skips it
+CHUNKING_MODES = ('fixed', 'vad')
+CHUNK_DURATION = 30.0
+OVERLAP_DURATION = 2.0
+
+DEFAULT_CONFIG = {'chunking': 'fixed', 'partitioning': 'none'}
+
+# apply_retention modes, with the verb used to report them
+RETENTION_VERBS = {'archive': 'archived', 'drop': 'dropped'}
+
 # Registry to hold all video indexes
 video_indexes = {}
+# Sentence views of partitioned indexes: {full_table_name: {partition key: sentences view}}
+video_partitions = {}
+
+def _load_config(video_index) -> dict:
+    """Read the index configuration stored in the table comment."""
+    comment = video_index.get_metadata().get('comment') or ''
+    try:
+        return {**DEFAULT_CONFIG, **json.loads(comment)}
+    except ValueError:
+        return dict(DEFAULT_CONFIG)
+
+def _create_sentences_view(view_name: str, base, transcript_text):
+    """Split transcripts into sentences and index them for similarity search."""
+    sentences_view = pxt.create_view(
+        view_name,
+        base,
+        iterator=StringSplitter.create(text=transcript_text, separators='sentence'),
+        if_exists='ignore'
+    )
+    embed_model = sentence_transformer.using(model_id='intfloat/e5-large-v2')
+    sentences_view.add_embedding_index(column='text', string_embed=embed_model, if_exists='ignore')
+    return sentences_view
+
+def _partition_prefix(full_table_name: str) -> str:
+    return f'{full_table_name}_sentences_'
+
+def _sentences_view_name(full_table_name: str, key: str) -> str:
+    """Path of a sentence view: key 'all' for unpartitioned indexes, otherwise the partition key."""
+    return f'{full_table_name}_sentence_chunks' if key == 'all' else f'{_partition_prefix(full_table_name)}{key}'
+
+def _load_partitions(full_table_name: str) -> dict:
+    """Find the partition views of an index, e.g. video_index.lectures_sentences_202610."""
+    prefix = _partition_prefix(full_table_name)
+    return {
+        name[len(prefix):]: pxt.get_table(name)
+        for name in pxt.list_tables()
+        if name.startswith(prefix) and name[len(prefix):].isdigit()
+    }
+
+def _ensure_partition(full_table_name: str, key: str):
+    """Return the sentence view of a partition, creating it (and indexing its rows) if needed."""
+    partitions = video_partitions[full_table_name]
+    if key not in partitions:
+        video_index, chunks_view, _ = video_indexes[full_table_name]
+        config = _load_config(video_index)
+        transcript_text = chunks_view.transcription.text if config['chunking'] == 'vad' else chunks_view.transcript
+        start, end = partition_bounds(key)
+        partitions[key] = _create_sentences_view(
+            f'{_partition_prefix(full_table_name)}{key}',
+            chunks_view.where((chunks_view.uploaded_at >= start) & (chunks_view.uploaded_at < end)),
+            transcript_text
+        )
+    return partitions[key]
+
+def _file_url(location: str) -> str:
+    """Normalize a location the way Pixeltable stores it: local paths become file:// URLs."""
+    return location if '://' in location else pathlib.Path(location).absolute().as_uri()
+
+def _audio_source(video_index, audio_mode: str):
+    """Return the audio expression to split for the given extraction mode."""
+    if audio_mode == 'stream':
+        # Evaluated on the fly by the splitter; nothing is written to the table
+        return extract_speech_track(video_index.video_file, format='wav', scratch=True)
+    if audio_mode == 'compact':
+        video_index.add_computed_column(
+            audio_extract=extract_speech_track(video_index.video_file, format='flac')
+        )
+    else:
+        video_index.add_computed_column(
+            audio_extract=extract_audio(video_index.video_file, format='mp3')
+        )
+    return video_index.audio_extract
 
 @mcp.tool()
-def setup_video_index(table_name: str, openai_api_key: str) -> str:
+def setup_video_index(table_name: str, openai_api_key: str, audio_mode: str = 'stream',
+                      chunking: str = 'fixed', transcription_backend: str = 'openai',
+                      transcription_model: str = None, partitioning: str = 'none') -> str:
     """Set up a video index with the provided name and OpenAI API key.
 
     Args:
         table_name: The name of the video index (e.g., 'lectures', 'interviews').
         openai_api_key: The OpenAI API key required for transcription.
+        audio_mode: How audio is extracted for transcription (default is 'stream').
+            'stream' feeds a 16 kHz mono PCM track to the splitter and deletes it after transcription,
+            'compact' stores a 16 kHz mono FLAC track, 'mp3' stores a full mp3 track.
+        chunking: How audio is cut before transcription (default is 'fixed').
+            'fixed' uses overlapping 30-second windows and drops the repeated overlap from transcripts,
+            'vad' cuts on silent stretches and skips them; silence is detected by loudness, so music is kept.
+        transcription_backend: Where transcription runs (default is 'openai').
+            'openai' calls the OpenAI API with concurrent, retrying requests, 'whisper' runs openai-whisper
+            locally, 'faster-whisper' runs an int8 model locally on CPU.
+        transcription_model: The model to use; defaults to 'whisper-1' for 'openai' and 'base.en' for local backends.
+        partitioning: How the sentence index is laid out (default is 'none').
+            'monthly' keeps a separate sentence index per month of uploaded_at, so time-filtered queries
+            only search matching months and apply_retention can drop old months as a whole.
 
     Returns:
         A message indicating whether the index was created, already exists, or failed.
     """
     global video_indexes
+    if replica.enabled:
+        return replica.read_only_error()
+    if audio_mode not in AUDIO_MODES:
+        return f"Error: Invalid audio_mode '{audio_mode}'. Valid modes are: {', '.join(AUDIO_MODES)}"
+    if chunking not in CHUNKING_MODES:
+        return f"Error: Invalid chunking mode '{chunking}'. Valid modes are: {', '.join(CHUNKING_MODES)}"
+    if transcription_backend not in TRANSCRIPTION_MODELS:
+        return (f"Error: Invalid transcription backend '{transcription_backend}'. "
+                f"Valid backends are: {', '.join(TRANSCRIPTION_MODELS)}")
+    if partitioning not in PARTITIONING_MODES:
+        return f"Error: Invalid partitioning '{partitioning}'. Valid modes are: {', '.join(PARTITIONING_MODES)}"
+    transcription_model = transcription_model or TRANSCRIPTION_MODELS[transcription_backend]
     try:
         # Set the API key
         os.environ['OPENAI_API_KEY'] = openai_api_key
@@ -42,52 +181,65 @@ def setup_video_index(table_name: str, openai_api_key: str) -> str:
         if full_table_name in existing_tables:
             video_index = pxt.get_table(full_table_name)
             chunks_view = pxt.get_table(chunks_view_name)
-            sentences_view = pxt.get_table(sentences_view_name)
+            if _load_config(video_index)['partitioning'] == 'none':
+                sentences_view = pxt.get_table(sentences_view_name)
+            else:
+                sentences_view = None
+                video_partitions[full_table_name] = _load_partitions(full_table_name)
             video_indexes[full_table_name] = (video_index, chunks_view, sentences_view)
             return f"Video index '{full_table_name}' already exists and is ready for use."
 
-        # Create directory and table
+        # Create directory and table; the configuration is kept in the table comment
+        config = {'chunking': chunking, 'partitioning': partitioning}
         pxt.create_dir(DIRECTORY, if_exists='ignore')
         video_index = pxt.create_table(
             full_table_name, 
             {'video_file': pxt.Video, 'uploaded_at': pxt.Timestamp},
+            comment=json.dumps(config),
             if_exists='ignore'
         )
 
         # Extract audio from video
-        video_index.add_computed_column(
-            audio_extract=extract_audio(video_index.video_file, format='mp3')
-        )
+        audio_source = _audio_source(video_index, audio_mode)
 
         # Create view for audio chunks
-        chunks_view = pxt.create_view(
-            chunks_view_name,
-            video_index,
-            iterator=AudioSplitter.create(
-                audio=video_index.audio_extract,
-                chunk_duration_sec=30.0,
-                overlap_sec=2.0,
+        if chunking == 'vad':
+            iterator = SpeechSplitter.create(audio=audio_source, max_chunk_duration_sec=CHUNK_DURATION)
+        else:
+            iterator = AudioSplitter.create(
+                audio=audio_source,
+                chunk_duration_sec=CHUNK_DURATION,
+                overlap_sec=OVERLAP_DURATION,
                 min_chunk_duration_sec=5.0
-            ),
-            if_exists='ignore'
-        )
+            )
+        chunks_view = pxt.create_view(chunks_view_name, video_index, iterator=iterator, if_exists='ignore')
 
         # Add transcription to chunks
         chunks_view.add_computed_column(
-            transcription=openai.transcriptions(audio=chunks_view.audio_chunk, model='whisper-1')
+            transcription=transcribe(
+                chunks_view.audio_chunk, backend=transcription_backend, model=transcription_model
+            )
         )
 
-        # Create view that chunks transcriptions into sentences
-        sentences_view = pxt.create_view(
-            sentences_view_name,
-            chunks_view,
-            iterator=StringSplitter.create(text=chunks_view.transcription.text, separators='sentence'),
-            if_exists='ignore'
-        )
+        # Speech chunks never overlap; fixed windows repeat the overlap at the start of every chunk
+        if chunking == 'vad':
+            transcript_text = chunks_view.transcription.text
+        else:
+            chunks_view.add_computed_column(
+                transcript=trim_overlap(
+                    chunks_view.transcription, chunks_view.start_time_sec, chunks_view.end_time_sec,
+                    OVERLAP_DURATION
+                )
+            )
+            transcript_text = chunks_view.transcript
 
-        # Define the embedding model and create embedding index
-        embed_model = sentence_transformer.using(model_id='intfloat/e5-large-v2')
-        sentences_view.add_embedding_index(column='text', string_embed=embed_model)
+        # Create view that chunks transcriptions into sentences, with an embedding index;
+        # partitioned indexes get one such view per month, created as videos arrive
+        if partitioning == 'none':
+            sentences_view = _create_sentences_view(sentences_view_name, chunks_view, transcript_text)
+        else:
+            sentences_view = None
+            video_partitions[full_table_name] = {}
 
         # Store in the registry
         video_indexes[full_table_name] = (video_index, chunks_view, sentences_view)
@@ -96,12 +248,13 @@ def setup_video_index(table_name: str, openai_api_key: str) -> str:
         return f"Error setting up video index '{full_table_name}': {str(e)}"
 
 @mcp.tool()
-def insert_video(table_name: str, video_location: str) -> str:
+def insert_video(table_name: str, video_location: str, uploaded_at: str = '') -> str:
     """Insert a video file into the specified video index.
 
     Args:
         table_name: The name of the video index (e.g., 'lectures', 'interviews').
         video_location: The URL or path to the video file to insert (e.g., local path or S3 URL).
+        uploaded_at: Optional upload time as an ISO date or datetime, for backfilling; defaults to now.
 
     Returns:
         A confirmation message indicating success or failure.
@@ -111,19 +264,163 @@ def insert_video(table_name: str, video_location: str) -> str:
         if full_table_name not in video_indexes:
             return f"Error: Video index '{full_table_name}' not set up. Please call setup_video_index first."
         video_index, _, _ = video_indexes[full_table_name]
-        video_index.insert([{'video_file': video_location, 'uploaded_at': datetime.now()}])
+        info = snapshot_info(_load_config(video_index))
+        if info:
+            return read_only_error('Video', full_table_name, info)
+        uploaded = parse_time(uploaded_at) or datetime.now()
+        if full_table_name in video_partitions:
+            # The partition's view must exist before the insert so the new sentences are indexed in it
+            _ensure_partition(full_table_name, partition_key(uploaded))
+        # Transcription runs as part of the insert, so scratch audio is removed right after it
+        with scratch_tracks():
+            status = video_index.insert([{'video_file': video_location, 'uploaded_at': uploaded}],
+                                        on_error='ignore')
+        if status.num_excs > 0:
+            return (f"Video file '{video_location}' inserted into index '{full_table_name}', but "
+                    f"{status.num_excs} values failed to compute. Call retry_failed_transcriptions to retry them.")
         return f"Video file '{video_location}' inserted successfully into index '{full_table_name}'."
     except Exception as e:
         return f"Error inserting video file into '{full_table_name}': {str(e)}"
 
 @mcp.tool()
-def query_video(table_name: str, query_text: str, top_n: int = 5) -> str:
+def delete_video(table_name: str, video_location: str = '', location_prefix: str = '',
+                 uploaded_after: str = '', uploaded_before: str = '') -> str:
+    """Delete videos from the specified video index, with their chunks, sentences and embeddings.
+
+    All given criteria must match; at least one is required.
+
+    Args:
+        table_name: The name of the video index (e.g., 'lectures', 'interviews').
+        video_location: Delete the video inserted from this URL or path.
+        location_prefix: Delete videos whose URL or path starts with this prefix (e.g. a directory).
+        uploaded_after: Delete videos uploaded at or after this ISO date or datetime.
+        uploaded_before: Delete videos uploaded before this ISO date or datetime.
+
+    Returns:
+        The number of videos deleted.
+    """
+    full_table_name = f'{DIRECTORY}.{table_name}'
+    if not (video_location or location_prefix or uploaded_after or uploaded_before):
+        return "Error: Provide at least one of video_location, location_prefix, uploaded_after, uploaded_before."
+    try:
+        if full_table_name not in video_indexes:
+            return f"Error: Video index '{full_table_name}' not set up. Please call setup_video_index first."
+        video_index, _, _ = video_indexes[full_table_name]
+        info = snapshot_info(_load_config(video_index))
+        if info:
+            return read_only_error('Video', full_table_name, info)
+        fileurl = video_index.video_file.fileurl
+        conditions = []
+        if video_location:
+            conditions.append(fileurl == _file_url(video_location))
+        if location_prefix:
+            conditions.append(pxt_str.startswith(fileurl, _file_url(location_prefix)))
+        if uploaded_after:
+            conditions.append(video_index.uploaded_at >= parse_time(uploaded_after))
+        if uploaded_before:
+            conditions.append(video_index.uploaded_at < parse_time(uploaded_before))
+        condition = conditions[0]
+        for c in conditions[1:]:
+            condition = condition & c
+        # Chunk and sentence views (and partitions), and their embedding indexes, drop the derived rows
+        status = video_index.delete(where=condition)
+        return f"Deleted {status.num_rows} videos from index '{full_table_name}'."
+    except Exception as e:
+        return f"Error deleting from video index '{full_table_name}': {str(e)}"
+
+@mcp.tool()
+def update_video(table_name: str, video_location: str, new_video_location: str) -> str:
+    """Replace a video in the specified video index; only its chunks are re-transcribed and re-embedded.
+
+    The video keeps its upload time, and so its partition.
+
+    Args:
+        table_name: The name of the video index (e.g., 'lectures', 'interviews').
+        video_location: The URL or path the video was inserted from.
+        new_video_location: The URL or path of the replacement video.
+
+    Returns:
+        A confirmation message indicating success or failure.
+    """
+    full_table_name = f'{DIRECTORY}.{table_name}'
+    try:
+        if full_table_name not in video_indexes:
+            return f"Error: Video index '{full_table_name}' not set up. Please call setup_video_index first."
+        video_index, _, _ = video_indexes[full_table_name]
+        info = snapshot_info(_load_config(video_index))
+        if info:
+            return read_only_error('Video', full_table_name, info)
+        # Updating the media column cascades to the computed columns and views that depend on it
+        with scratch_tracks():
+            status = video_index.update(
+                {'video_file': new_video_location}, where=video_index.video_file.fileurl == _file_url(video_location)
+            )
+        if status.num_rows == 0:
+            return f"Error: Video '{video_location}' not found in index '{full_table_name}'."
+        return f"Video '{video_location}' replaced with '{new_video_location}' in index '{full_table_name}'."
+    except Exception as e:
+        return f"Error updating video in '{full_table_name}': {str(e)}"
+
+@mcp.tool()
+def retry_failed_transcriptions(table_name: str) -> str:
+    """Recompute chunk transcriptions that failed, e.g. after hitting OpenAI rate limits.
+
+    Only chunks whose transcription failed are recomputed; successful chunks are left untouched.
+
+    Args:
+        table_name: The name of the video index (e.g., 'lectures', 'interviews').
+
+    Returns:
+        A message with the number of chunks retried and how many still failed.
+    """
+    full_table_name = f'{DIRECTORY}.{table_name}'
+    try:
+        if full_table_name not in video_indexes:
+            return f"Error: Video index '{full_table_name}' not set up. Please call setup_video_index first."
+        video_index, chunks_view, _ = video_indexes[full_table_name]
+        info = snapshot_info(_load_config(video_index))
+        if info:
+            return read_only_error('Video', full_table_name, info)
+        failed = chunks_view.where(chunks_view.transcription.errortype != None).count()
+        if failed == 0:
+            return f"No failed transcriptions in '{full_table_name}'."
+        # In 'stream' mode the chunk audio is recomputed too, from a freshly extracted track
+        with scratch_tracks():
+            status = chunks_view.recompute_columns('transcription', errors_only=True)
+        return (f"Retried {failed} failed transcriptions in '{full_table_name}'; {status.num_excs} still failing. "
+                f"Scheduler: {scheduler.describe()}")
+    except Exception as e:
+        return f"Error retrying transcriptions in '{full_table_name}': {str(e)}"
+
+@mcp.tool()
+def configure_rate_limits(requests_per_minute: int, tokens_per_minute: int, max_concurrency: int = 8) -> str:
+    """Set the OpenAI request budgets used when transcribing with the 'openai' backend.
+
+    Args:
+        requests_per_minute: Maximum OpenAI requests per minute.
+        tokens_per_minute: Maximum OpenAI tokens per minute.
+        max_concurrency: Upper bound on concurrent requests; lowered automatically while rate limited.
+
+    Returns:
+        The new scheduler settings and statistics.
+    """
+    if requests_per_minute < 1 or tokens_per_minute < 1 or max_concurrency < 1:
+        return "Error: requests_per_minute, tokens_per_minute and max_concurrency must be at least 1."
+    scheduler.configure(requests_per_minute, tokens_per_minute, max_concurrency)
+    return f"Rate limits updated: {scheduler.describe()}"
+
+@mcp.tool()
+def query_video(table_name: str, query_text: str, top_n: int = 5, profile: bool = False,
+                uploaded_after: str = '', uploaded_before: str = '') -> str:
     """Query the specified video index with a text question.
 
     Args:
         table_name: The name of the video index (e.g., 'lectures', 'interviews').
         query_text: The question or text to search for in the video content.
         top_n: Number of top results to return (default is 5).
+        profile: Append a summary of the request (filters, index, ordering), row counts and per-stage timings.
+        uploaded_after: Only search videos uploaded at or after this ISO date or datetime.
+        uploaded_before: Only search videos uploaded before this ISO date or datetime.
 
     Returns:
         A string containing the top matching sentences and their similarity scores.
@@ -132,29 +429,313 @@ def query_video(table_name: str, query_text: str, top_n: int = 5) -> str:
     try:
         if full_table_name not in video_indexes:
             return f"Error: Video index '{full_table_name}' not set up. Please call setup_video_index first."
+        stale = replica.check(table_name)
+        if stale:
+            return stale
         _, _, sentences_view = video_indexes[full_table_name]
-        # Calculate similarity scores between query and sentences
-        sim = sentences_view.text.similarity(query_text)
+        after, before = parse_time(uploaded_after), parse_time(uploaded_before)
+
+        # Route the query: a partitioned index only searches the months overlapping the time filter
+        if full_table_name in video_partitions:
+            partitions = video_partitions[full_table_name]
+            searched = {key: partitions[key] for key in overlapping(partitions, after, before)}
+        else:
+            searched = {'all': sentences_view}
 
-        # Get top results
-        results = (sentences_view.order_by(sim, asc=False)
-                  .select(sentences_view.text, sim=sim, video_file=sentences_view.video_file, 
-                         uploaded_at=sentences_view.uploaded_at)
-                  .limit(top_n)
-                  .collect())
+        query_profile = QueryProfile()
+        queries = {}
+        with query_profile.stage('build'):
+            for key, view in searched.items():
+                # Calculate similarity scores between query and sentences
+                sim = view.text.similarity(
+                    query_text, idx=active_index(_sentences_view_name(full_table_name, key), 'text')
+                )
+                query = view
+                if after is not None:
+                    query = query.where(view.uploaded_at >= after)
+                if before is not None:
+                    query = query.where(view.uploaded_at < before)
+
+                # Get top results
+                queries[key] = (query.order_by(sim, asc=False)
+                                .select(view.text, sim=sim, video_file=view.video_file, uploaded_at=view.uploaded_at)
+                                .limit(top_n))
+        # The query text is embedded when the query runs, so 'search' includes embedding, index scan and fetch
+        with query_profile.stage('search'):
+            rows = [row for query in queries.values() for row in query.collect()]
+            # Each partition returns its own top_n; keep the best overall
+            rows = heapq.nlargest(top_n, rows, key=lambda row: row['sim'])
 
         # Format the results
-        result_str = f"Query Results for '{query_text}' in '{full_table_name}':\n\n"
-        for i, row in enumerate(results.to_pandas().itertuples(), 1):
-            result_str += f"{i}. Score: {row.sim:.4f}\n"
-            result_str += f"   Text: {row.text}\n"
-            result_str += f"   From video: {row.video_file}\n"
-            result_str += f"   Uploaded: {row.uploaded_at}\n\n"
-        
-        return result_str if result_str else "No results found."
+        with query_profile.stage('serialize'):
+            result_str = f"Query Results for '{query_text}' in '{full_table_name}':\n\n"
+            for i, row in enumerate(rows, 1):
+                result_str += f"{i}. Score: {row['sim']:.4f}\n"
+                result_str += f"   Text: {row['text']}\n"
+                result_str += f"   From video: {row['video_file']}\n"
+                result_str += f"   Uploaded: {row['uploaded_at']}\n\n"
+
+        if profile:
+            if full_table_name in video_partitions:
+                query_profile.step(f"partitions: {', '.join(searched) or 'none'} "
+                                   f"of {len(video_partitions[full_table_name])}")
+            else:
+                query_profile.step(f"source: {full_table_name}_sentence_chunks")
+            if after is not None or before is not None:
+                query_profile.step(f"filter: uploaded_at in [{uploaded_after or '-'}, {uploaded_before or '-'})")
+            query_profile.step(f"order by: similarity(text, query) desc, limit {top_n} per partition, merged")
+            query_profile.step("select: text, sim, video_file, uploaded_at")
+            query_profile.index = f"embedding index on text (intfloat/e5-large-v2), {len(searched)} searched"
+            query_profile.rows['returned'] = len(rows)
+            for key, view in searched.items():
+                query_profile.count(f'indexed ({key})', view)
+            result_str += f"{query_profile.report()}\n"
+
+        return result_str if rows else "No results found."
     except Exception as e:
         return f"Error querying video index '{full_table_name}': {str(e)}"
 
+@mcp.tool()
+def list_partitions(table_name: str) -> str:
+    """List the monthly partitions of a partitioned video index.
+
+    Args:
+        table_name: The name of the video index (e.g., 'lectures', 'interviews').
+
+    Returns:
+        Each month with its number of videos and whether its sentences are indexed or archived.
+    """
+    full_table_name = f'{DIRECTORY}.{table_name}'
+    try:
+        if full_table_name not in video_partitions:
+            return f"Error: Video index '{full_table_name}' is not set up or not partitioned."
+        video_index, _, _ = video_indexes[full_table_name]
+        partitions = video_partitions[full_table_name]
+        uploads = video_index.select(video_index.uploaded_at).collect()
+        videos = {}
+        for uploaded in uploads['uploaded_at']:
+            key = partition_key(uploaded)
+            videos[key] = videos.get(key, 0) + 1
+        result_str = f"Partitions of '{full_table_name}':\n"
+        for key in sorted(set(videos) | set(partitions)):
+            status = 'indexed' if key in partitions else 'archived'
+            result_str += f"  {key[:4]}-{key[4:]}: {videos.get(key, 0)} videos, {status}\n"
+        return result_str
+    except Exception as e:
+        return f"Error listing partitions of '{full_table_name}': {str(e)}"
+
+@mcp.tool()
+def apply_retention(table_name: str, keep_months: int, mode: str = 'archive') -> str:
+    """Expire the partitions of a partitioned video index older than the retention period.
+
+    Args:
+        table_name: The name of the video index (e.g., 'lectures', 'interviews').
+        keep_months: Number of months to keep searchable, including the current month.
+        mode: 'archive' drops the expired months' sentence indexes but keeps the videos and transcripts;
+            inserting into an archived month indexes it again. 'drop' also deletes the videos.
+
+    Returns:
+        The partitions that were archived or dropped.
+    """
+    full_table_name = f'{DIRECTORY}.{table_name}'
+    if mode not in RETENTION_VERBS:
+        return f"Error: Invalid mode '{mode}'. Valid modes are: {', '.join(RETENTION_VERBS)}"
+    if keep_months < 1:
+        return "Error: keep_months must be at least 1."
+    try:
+        if full_table_name not in video_partitions:
+            return f"Error: Video index '{full_table_name}' is not set up or not partitioned."
+        video_index, _, _ = video_indexes[full_table_name]
+        info = snapshot_info(_load_config(video_index))
+        if info:
+            return read_only_error('Video', full_table_name, info)
+        partitions = video_partitions[full_table_name]
+        oldest_kept = months_before(datetime.now(), keep_months - 1)
+
+        # Dropping a partition's view drops its sentences and their embeddings
+        expired = sorted(key for key in partitions if key < oldest_kept)
+        for key in expired:
+            pxt.drop_table(f'{_partition_prefix(full_table_name)}{key}')
+            del partitions[key]
+
+        result_str = f"Retention for '{full_table_name}' (keeping {oldest_kept[:4]}-{oldest_kept[4:]} onwards): "
+        result_str += f"{RETENTION_VERBS[mode]} {len(expired)} partitions ({', '.join(expired) or 'none'})"
+        if mode == 'drop':
+            # Delete the expired videos too, including those of months archived earlier; chunks follow
+            status = video_index.delete(where=video_index.uploaded_at < partition_bounds(oldest_kept)[0])
+            result_str += f" and deleted {status.num_rows} videos"
+        return result_str + "."
+    except Exception as e:
+        return f"Error applying retention to '{full_table_name}': {str(e)}"
+
+def _maintain(full_table_name: str) -> list:
+    """Rebuild the sentence embedding index of a video index, or of each of its partitions."""
+    keys = sorted(video_partitions[full_table_name]) if full_table_name in video_partitions else ['all']
+    embed_model = sentence_transformer.using(model_id='intfloat/e5-large-v2')
+    reports = []
+    for key in keys:
+        view_name = _sentences_view_name(full_table_name, key)
+        report = rebuild_embedding_index(view_name, 'text', 1024, string_embed=embed_model)
+        reports.append(format_report(view_name, 'text', report))
+    return reports
+
+@imports.wrap
+def _maintain_all() -> None:
+    for full_table_name, (video_index, _, _) in list(video_indexes.items()):
+        # Imported indexes do not change, so there is nothing to maintain
+        if not snapshot_info(_load_config(video_index)):
+            _maintain(full_table_name)
+
+@mcp.tool()
+def maintain_index(table_name: str) -> str:
+    """Rebuild the embedding indexes of a video index, e.g. after many inserts and deletions.
+
+    A new index is built alongside the current one, which keeps serving queries until the new
+    index is ready; then queries switch over and the old index is dropped.
+
+    Args:
+        table_name: The name of the video index.
+
+    Returns:
+        Each new index's row count, approximate size and build time.
+    """
+    full_table_name = f'{DIRECTORY}.{table_name}'
+    try:
+        if full_table_name not in video_indexes:
+            return f"Error: Video index '{full_table_name}' not set up. Please call setup_video_index first."
+        info = snapshot_info(_load_config(video_indexes[full_table_name][0]))
+        if info:
+            return read_only_error('Video', full_table_name, info)
+        return "Rebuilt:\n" + "\n".join(_maintain(full_table_name))
+    except Exception as e:
+        return f"Error maintaining video index '{full_table_name}': {str(e)}"
+
+@mcp.tool()
+def schedule_index_maintenance(interval_hours: float) -> str:
+    """Rebuild the embedding indexes of all loaded video indexes periodically in the background.
+
+    Args:
+        interval_hours: Hours between rebuilds; 0 turns scheduled maintenance off.
+    """
+    maintenance.start(interval_hours, _maintain_all)
+    return f"Index maintenance: {maintenance.describe()}"
+
+# Optional scheduled maintenance from the environment, e.g. INDEX_MAINTENANCE_INTERVAL_HOURS=24
+maintenance.start(float(os.environ.get('INDEX_MAINTENANCE_INTERVAL_HOURS', 0)), _maintain_all)
+
+@imports.wrap
+def _export(full_table_name: str, export_path: str) -> dict:
+    """Export a loaded video index to a directory and return the export's manifest."""
+    video_index, chunks_view, sentences_view = video_indexes[full_table_name]
+    if full_table_name in video_partitions:
+        sentence_views = video_partitions[full_table_name]
+    else:
+        sentence_views = {'all': sentences_view}
+
+    prepare_export(export_path)
+    location = {'video_file': 'Video', 'uploaded_at': 'Timestamp', 'start_time_sec': 'Float',
+                'end_time_sec': 'Float'}
+    tables = [
+        export_table(export_path, '', video_index, {'video_file': 'Video', 'uploaded_at': 'Timestamp'}),
+        export_table(export_path, '_chunks', chunks_view,
+                     {**location, 'transcription': 'Json', 'transcript': 'String'}),
+    ]
+    for key, view in sorted(sentence_views.items()):
+        name = _sentences_view_name(full_table_name, key)[len(full_table_name):]
+        tables.append(export_table(export_path, name, view, {**location, 'pos': 'Int', 'text': 'String'},
+                                   embedded=('text',)))
+    return write_manifest(export_path, 'video-index', full_table_name, _load_config(video_index), tables)
+
+def _import(export_path: str, manifest: dict, full_table_name: str, table_path: str) -> None:
+    """Import an export as tables under table_path and serve them as the video index full_table_name."""
+    tables = import_tables(
+        export_path, manifest,
+        {entry['name']: f"{table_path}{entry['name']}" for entry in manifest['tables']},
+        json.dumps(imported_config(manifest))
+    )
+    if manifest['config']['partitioning'] == 'none':
+        sentences_view = tables['_sentence_chunks']
+    else:
+        sentences_view = None
+        video_partitions[full_table_name] = _load_partitions(table_path)
+    video_indexes[full_table_name] = (tables[''], tables['_chunks'], sentences_view)
+
+@mcp.tool()
+def export_index(table_name: str, export_path: str) -> str:
+    """Export a video index to a directory, so another server can import it without recomputing it.
+
+    Transcripts and sentences (of every partition) are written as Parquet and sentence embeddings as
+    memory-mappable Arrow files. Videos are referenced by URL, not copied.
+
+    Args:
+        table_name: The name of the video index (e.g., 'lectures', 'interviews').
+        export_path: Directory to write the export to; created if needed, must not hold an export already.
+
+    Returns:
+        The exported tables with their row and vector counts.
+    """
+    full_table_name = f'{DIRECTORY}.{table_name}'
+    try:
+        if full_table_name not in video_indexes:
+            return f"Error: Video index '{full_table_name}' not set up. Please call setup_video_index first."
+        manifest = _export(full_table_name, export_path)
+        return f"Exported video index '{full_table_name}' to '{export_path}':\n{describe(manifest)}"
+    except Exception as e:
+        return f"Error exporting video index '{full_table_name}': {str(e)}"
+
+@mcp.tool()
+def import_index(export_path: str, table_name: str = '') -> str:
+    """Import a video index exported by export_index, without transcribing or embedding anything again.
+
+    The imported index serves query_video and list_partitions like the original, but is a read-only
+    snapshot: it does not accept new videos.
+
+    Args:
+        export_path: Directory written by export_index.
+        table_name: Name for the imported index; defaults to the name of the exported one.
+
+    Returns:
+        The imported tables with their row and vector counts.
+    """
+    if replica.enabled:
+        return replica.read_only_error()
+    try:
+        manifest = read_manifest(export_path, 'video-index')
+        full_table_name = f"{DIRECTORY}.{table_name or manifest['index'].split('.', 1)[1]}"
+        if full_table_name in pxt.list_tables():
+            return f"Error: Video index '{full_table_name}' already exists."
+
+        pxt.create_dir(DIRECTORY, if_exists='ignore')
+        _import(export_path, manifest, full_table_name, full_table_name)
+        return f"Imported '{export_path}' as read-only video index '{full_table_name}':\n{describe(manifest)}"
+    except Exception as e:
+        return f"Error importing video index from '{export_path}': {str(e)}"
+
+@imports.wrap
+def _replicate(export_path: str, table_name: str, table_path: str) -> None:
+    _import(export_path, read_manifest(export_path, 'video-index'), f'{DIRECTORY}.{table_name}', table_path)
+
+@imports.wrap
+def _published() -> list[str]:
+    """Names of the loaded indexes built by this server, which a writer publishes snapshots of."""
+    return [full_table_name.split('.', 1)[1] for full_table_name, (video_index, _, _) in list(video_indexes.items())
+            if not snapshot_info(_load_config(video_index))]
+
+def _version(table_name: str) -> tuple:
+    """Version of a loaded index; a writer only publishes a new snapshot of it when this changes."""
+    full_table_name = f'{DIRECTORY}.{table_name}'
+    video_index, chunks_view, sentences_view = video_indexes[full_table_name]
+    if full_table_name in video_partitions:
+        # Monthly partitions come and go, which changes the number of versions as well
+        sentence_views = [view for _, view in sorted(video_partitions[full_table_name].items())]
+    else:
+        sentence_views = [sentences_view]
+    return table_versions(video_index, chunks_view, *sentence_views)
+
+# Read-only replica mode (REPLICA_OF) or snapshot publishing on a writer (SNAPSHOT_DIR); see replica.py
+replica.start(DIRECTORY, _replicate)
+start_publishing(_published, lambda table_name, path: _export(f'{DIRECTORY}.{table_name}', path), _version)
+
 @mcp.tool()
 def list_tables() -> str:
     """List all video indexes currently available.
@@ -162,6 +743,20 @@ def list_tables() -> str:
     Returns:
         A string listing the current video indexes.
     """
+    if replica.enabled:
+        return replica.describe()
     tables = pxt.list_tables()
     video_tables = [t for t in tables if t.startswith(f'{DIRECTORY}.')]
+    # Partition views are listed with the index they belong to, not as indexes of their own
+    months = {}
+    for t in video_tables:
+        for parent in video_tables:
+            key = t[len(_partition_prefix(parent)):]
+            if t.startswith(_partition_prefix(parent)) and key.isdigit():
+                months.setdefault(parent, []).append(key)
+    partition_views = {_sentences_view_name(parent, key) for parent, keys in months.items() for key in keys}
+    video_tables = [
+        f"{t} (partitions: {', '.join(sorted(months[t]))})" if t in months else t
+        for t in video_tables if t not in partition_views
+    ]
     return f"Current video indexes: {', '.join(video_tables)}" if video_tables else "No video indexes exist."
\ No newline at end of file
@@ -0,0 +1,11 @@
+import pixeltable as pxt
+from pixeltable.func import Batch
+
+from openai_scheduler import DEFAULT_MAX_CONCURRENCY
+from transcription_backends import transcribe_files
+
+
+@pxt.udf(batch_size=DEFAULT_MAX_CONCURRENCY)
+def transcribe(audio: Batch[pxt.Audio], *, backend: str, model: str) -> Batch[dict]:
+    """Transcribe audio chunks with the given backend."""
+    return transcribe_files(audio, backend, model)
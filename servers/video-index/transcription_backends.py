@@ -0,0 +1,105 @@
+"""Transcription backends, usable without Pixeltable (see transcription.py for the Pixeltable UDF).
+
+Local backends run a Whisper model in this process; remote ones go through the shared OpenAI
+request scheduler, which bounds and retries concurrent requests.
+"""
+import hashlib
+import os
+import time
+from functools import lru_cache
+from typing import Any
+
+from openai_scheduler import openai_client, scheduler
+
+# Available transcription backends and the model each one uses by default
+DEFAULT_MODELS = {
+    'whisper': 'base.en',         # openai-whisper, runs locally
+    'faster-whisper': 'base.en',  # CTranslate2 with int8 weights, runs locally on CPU
+    'openai': 'whisper-1',        # OpenAI transcription API
+    'stub': 'stub',               # No model; sleeps STUB_LATENCY_SEC to stand in for a remote API offline
+}
+# Backends that are network-bound and benefit from concurrent requests
+REMOTE_BACKENDS = ('openai', 'stub')
+
+STUB_LATENCY_SEC = float(os.environ.get('STUB_LATENCY_SEC', '0.5'))
+
+
+@lru_cache(maxsize=None)
+def _whisper_model(model: str) -> Any:
+    import whisper
+    return whisper.load_model(model, device='cpu')
+
+
+@lru_cache(maxsize=None)
+def _faster_whisper_model(model: str) -> Any:
+    from faster_whisper import WhisperModel
+    return WhisperModel(model, device='cpu', compute_type='int8')
+
+
+def _transcribe_whisper(path: str, model: str) -> dict:
+    result = _whisper_model(model).transcribe(path, fp16=False)
+    segments = [{'start': s['start'], 'end': s['end'], 'text': s['text']} for s in result['segments']]
+    return {'text': result['text'], 'segments': segments, 'language': result.get('language')}
+
+
+def _transcribe_faster_whisper(path: str, model: str) -> dict:
+    segments, info = _faster_whisper_model(model).transcribe(path, beam_size=1)
+    segments = [{'start': s.start, 'end': s.end, 'text': s.text} for s in segments]
+    return {'text': ''.join(s['text'] for s in segments), 'segments': segments, 'language': info.language}
+
+
+def _transcribe_openai(path: str, model: str) -> dict:
+    with open(path, 'rb') as audio_file:
+        response = openai_client().audio.transcriptions.create(
+            model=model, file=audio_file, response_format='verbose_json'
+        )
+    result = response.model_dump()
+    segments = [{'start': s['start'], 'end': s['end'], 'text': s['text']} for s in result.get('segments') or []]
+    return {'text': result['text'], 'segments': segments, 'language': result.get('language')}
+
+
+def _transcribe_stub(path: str, model: str) -> dict:
+    time.sleep(STUB_LATENCY_SEC)
+    return {'text': '', 'segments': [], 'language': None}
+
+
+_BACKENDS = {
+    'whisper': _transcribe_whisper,
+    'faster-whisper': _transcribe_faster_whisper,
+    'openai': _transcribe_openai,
+    'stub': _transcribe_stub,
+}
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _remote_request(path: str, backend: str, model: str):
+    # Transcription is billed per minute of audio, so only the request budget applies
+    key = None if backend == 'stub' else ('transcription', model, _file_digest(path))
+    return key, lambda: _BACKENDS[backend](path, model), 0, None
+
+
+def transcribe_file(path: str, backend: str, model: str) -> dict:
+    """Transcribe a single audio file outside of Pixeltable, e.g. for benchmarking.
+
+    Returns:
+        A dict with 'text', 'segments' (each with 'start', 'end' and 'text') and 'language'.
+    """
+    if backend not in _BACKENDS:
+        raise ValueError(f"Unknown transcription backend '{backend}'. Valid backends are: {', '.join(_BACKENDS)}")
+    if backend in REMOTE_BACKENDS:
+        return scheduler.run(*_remote_request(path, backend, model))
+    return _BACKENDS[backend](path, model)
+
+
+def transcribe_files(paths: list[str], backend: str, model: str) -> list[dict]:
+    """Transcribe a batch of audio files; remote backends go through the shared OpenAI request scheduler."""
+    if backend in REMOTE_BACKENDS:
+        return scheduler.map([_remote_request(path, backend, model) for path in paths])
+    return [_BACKENDS[backend](path, model) for path in paths]
@@ -0,0 +1,9 @@
+import pathlib
+import sys
+
+SERVERS_DIR = pathlib.Path(__file__).resolve().parent.parent / 'servers'
+
+# Server modules import each other by bare name, as they do in their Docker images. Shared modules are
+# identical in every server that has them (see test_shared_modules.py), so one copy of each is tested.
+for server in ('base-sdk', 'video-index', 'audio-index'):
+    sys.path.insert(0, str(SERVERS_DIR / server))
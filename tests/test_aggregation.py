@@ -0,0 +1,39 @@
+import pytest
+
+pytest.importorskip('pixeltable')
+
+from aggregation import Aggregate, DistinctValues, parse_aggregates  # noqa: E402
+
+COLUMNS = ['city', 'age', 'tags']
+
+
+def test_aggregates_are_parsed_and_named():
+    parsed = parse_aggregates(['count(*)', 'AVG(age)', ' count_distinct( city ) '], COLUMNS)
+    assert parsed == [Aggregate('count', None), Aggregate('avg', 'age'), Aggregate('count_distinct', 'city')]
+    assert [agg.name for agg in parsed] == ['count', 'avg_age', 'count_distinct_city']
+
+
+@pytest.mark.parametrize('spec, message', [
+    ('median(age)', "Invalid aggregate"),
+    ('avg(*)', "only count accepts"),
+    ('sum(height)', "Column 'height' not found"),
+    ('count(age, city)', "Invalid aggregate"),
+    ('avg(age) + 1', "Invalid aggregate"),
+])
+def test_invalid_aggregates_are_rejected(spec, message):
+    with pytest.raises(ValueError, match=message):
+        parse_aggregates([spec], COLUMNS)
+
+
+def test_distinct_values_skip_nulls():
+    distinct = DistinctValues()
+    for val in ['a', None, 'b', 'a', None]:
+        distinct.add(val)
+    assert len(distinct) == 2
+
+
+def test_distinct_values_of_json_compare_by_content():
+    distinct = DistinctValues()
+    for val in [{'a': 1, 'b': 2}, {'b': 2, 'a': 1}, [1, 2], [1, 2], [2, 1]]:
+        distinct.add(val)
+    assert len(distinct) == 3
@@ -0,0 +1,168 @@
+import pytest
+
+from expressions import ExpressionError, compile_expression, compile_query, to_expr
+
+
+def _text(value):
+    return value.text if isinstance(value, Expr) else repr(value)
+
+
+def _binary(symbol):
+    return lambda self, other: Expr(f"({self.text} {symbol} {_text(other)})")
+
+
+def _reflected(symbol):
+    return lambda self, other: Expr(f"({_text(other)} {symbol} {self.text})")
+
+
+class Expr:
+    """Stands in for a Pixeltable expression, recording what was built as text."""
+
+    def __init__(self, text):
+        self.text = text
+
+    __add__, __sub__, __mul__ = _binary('+'), _binary('-'), _binary('*')
+    __truediv__, __floordiv__, __mod__ = _binary('/'), _binary('//'), _binary('%')
+    __radd__, __rsub__, __rmul__ = _reflected('+'), _reflected('-'), _reflected('*')
+    __and__, __or__ = _binary('&'), _binary('|')
+    __eq__, __ne__ = _binary('=='), _binary('!=')
+    __lt__, __le__, __gt__, __ge__ = _binary('<'), _binary('<='), _binary('>'), _binary('>=')
+    __hash__ = object.__hash__
+
+    def __neg__(self):
+        return Expr(f"-{self.text}")
+
+    def __invert__(self):
+        return Expr(f"~{self.text}")
+
+    def __getitem__(self, key):
+        return Expr(f"{self.text}[{key!r}]")
+
+    def __getattr__(self, name):
+        return Expr(f"{self.text}.{name}")
+
+    def isin(self, values):
+        return Expr(f"{self.text} in {values!r}")
+
+
+class Table:
+    """Stands in for a Pixeltable table: columns are attributes, query methods are recorded."""
+
+    def __init__(self, calls=()):
+        self.calls = list(calls)
+
+    def __getattr__(self, name):
+        return Expr(name)
+
+    def _call(self, method, *args, **kwargs):
+        args = [_text(arg) for arg in args]
+        kwargs = {name: _text(value) if isinstance(value, Expr) else value for name, value in kwargs.items()}
+        return Table(self.calls + [(method, args, kwargs)])
+
+    def where(self, *args, **kwargs):
+        return self._call('where', *args, **kwargs)
+
+    def select(self, *args, **kwargs):
+        return self._call('select', *args, **kwargs)
+
+    def order_by(self, *args, **kwargs):
+        return self._call('order_by', *args, **kwargs)
+
+    def limit(self, *args, **kwargs):
+        return self._call('limit', *args, **kwargs)
+
+
+COLUMNS = ['age', 'name', 'is_active', 'pop_2022', 'pop_2023', 'metadata', 'video']
+
+
+def build(text, params=None):
+    compiled = compile_expression('dir.users', text)
+    compiled.check_columns(COLUMNS)
+    return compiled.build(Table(), params).text
+
+
+@pytest.mark.parametrize('text, expected', [
+    ("table.age >= 18", "(age >= 18)"),
+    ("users.age >= 18", "(age >= 18)"),
+    ("table.pop_2023 - table.pop_2022", "(pop_2023 - pop_2022)"),
+    ("table.age > 18 and table.is_active == True", "((age > 18) & (is_active == True))"),
+    ("table.age < 13 or not table.is_active", "((age < 13) | ~is_active)"),
+    ("18 <= table.age < 65", "((age >= 18) & (age < 65))"),
+    ("table.name in ['a', 'b']", "name in ['a', 'b']"),
+    ("table.name not in ('a',)", "~name in ['a']"),
+    ("table.metadata['author'] == 'x'", "(metadata['author'] == 'x')"),
+    ("table.video.fileurl", "video.fileurl"),
+    ("table.age > -1", "(age > -1)"),
+])
+def test_supported_expressions(text, expected):
+    assert build(text) == expected
+
+
+@pytest.mark.parametrize('text, message', [
+    ("__import__('os').system('ls')", "Expected a literal value"),
+    ("table.age.__class__", "Unsupported attribute"),
+    ("table.__dict__", "Invalid column name"),
+    ("other.age > 1", "Unknown name 'other'"),
+    ("len(table.name)", "Expected a literal value"),
+    ("(lambda: 1)()", "Expected a literal value"),
+    ("table.age ** 2", "Unsupported operator Pow"),
+    ("table.age is None", "Unsupported comparison Is"),
+    ("table.name in table.name", "'in' requires a list"),
+    ("[x for x in table.name]", "Expected a literal value"),
+    ("table.age >", "Invalid syntax"),
+])
+def test_rejected_expressions(text, message):
+    with pytest.raises(ExpressionError, match=message):
+        compile_expression('dir.users', text)
+
+
+def test_unknown_columns_are_reported():
+    with pytest.raises(ExpressionError, match="Unknown column"):
+        to_expr('dir.users', Table(), "table.height > 2", COLUMNS)
+
+
+def test_parameters_are_substituted_when_built():
+    assert build("table.age > params.min_age", {'min_age': 30}) == "(age > 30)"
+    with pytest.raises(ExpressionError, match="Missing value for parameter 'min_age'"):
+        build("table.age > params.min_age")
+
+
+def test_compiled_expressions_are_cached():
+    assert compile_expression('dir.users', "table.age > 1") is compile_expression('dir.users', "table.age > 1")
+
+
+def test_query_chain():
+    query = compile_query('dir.users', "users.where(users.age > params.min_age).select(users.name, "
+                                       "years=users.age).order_by(users.age, asc=False).limit(10)")
+    assert query.columns == {'age', 'name'}
+    assert query.params == {'min_age'}
+    assert query.build(Table(), {'min_age': 30}).calls == [
+        ('where', ['(age > 30)'], {}),
+        ('select', ['name'], {'years': 'age'}),
+        ('order_by', ['age'], {'asc': False}),
+        ('limit', ['10'], {}),
+    ]
+
+
+def test_query_accepts_a_leading_return():
+    assert compile_query('users', "return table.limit(5)").build(Table()).calls == [('limit', ['5'], {})]
+
+
+def test_query_requires_all_parameters():
+    query = compile_query('users', "table.where(table.age > params.min_age)")
+    with pytest.raises(ExpressionError, match="Missing value"):
+        query.build(Table())
+
+
+@pytest.mark.parametrize('text, message', [
+    ("table.delete()", "Unsupported call"),
+    ("table.where(table.age > 1).collect()", "Unsupported call"),
+    ("other.where(other.age > 1)", "must start from the table"),
+    ("table", "must call at least one"),
+    ("table.limit(table.age)", "limit\\(\\) takes a single integer"),
+    ("table.order_by(table.age, desc=True)", "only accepts the keyword asc"),
+    ("table.where(table.age > 1, table.age < 2)", "where\\(\\) takes a single filter"),
+])
+def test_rejected_queries(text, message):
+    with pytest.raises(ExpressionError, match=message):
+        compile_query('users', text)
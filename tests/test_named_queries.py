@@ -0,0 +1,25 @@
+from named_queries import NamedQueryRegistry, format_stats
+
+
+def registry(tmp_path):
+    queries = NamedQueryRegistry(str(tmp_path / 'named_queries.json'), flush_sec=3600)
+    queries.define('adults', 'users', "users.where(users.age >= 18)")
+    return queries
+
+
+def test_stats_of_successful_runs(tmp_path):
+    queries = registry(tmp_path)
+    queries.record('adults', 10.0, 3)
+    stats = queries.record('adults', 20.0, 5)
+    assert format_stats(stats).startswith("2 runs, 0 errors, avg 15.0 ms, last 20.0 ms / 5 rows at ")
+
+
+def test_a_failed_last_run_is_shown_as_an_error(tmp_path):
+    queries = registry(tmp_path)
+    queries.record('adults', 10.0, 3)
+    stats = queries.record('adults', 4.0, None, error=True)
+    assert format_stats(stats).startswith("2 runs, 1 errors, avg 7.0 ms, last 4.0 ms / error at ")
+
+
+def test_never_run():
+    assert format_stats({'runs': 0}) == "never run"
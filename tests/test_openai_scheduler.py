@@ -0,0 +1,150 @@
+from types import SimpleNamespace
+
+import pytest
+
+import openai_scheduler
+from openai_scheduler import MAX_RETRIES, SUCCESSES_PER_INCREASE, RequestScheduler, _TokenBucket
+
+
+class APIError(Exception):
+    def __init__(self, status_code: int, retry_after: float = None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        headers = {} if retry_after is None else {'retry-after': str(retry_after)}
+        self.response = SimpleNamespace(headers=headers)
+
+
+def failing(*errors):
+    """A request that raises the given errors in turn, then returns 'ok'."""
+    remaining = list(errors)
+
+    def request():
+        if remaining:
+            raise remaining.pop(0)
+        return 'ok'
+    return request
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record backoff sleeps instead of sleeping, without jitter."""
+    delays = []
+    monkeypatch.setattr(openai_scheduler.time, 'sleep', delays.append)
+    monkeypatch.setattr(openai_scheduler.random, 'uniform', lambda low, high: low)
+    return delays
+
+
+def test_bucket_starts_full():
+    bucket = _TokenBucket(60)
+    assert bucket.wait_time(60, bucket.updated) == 0.0
+
+
+def test_bucket_waits_for_refill():
+    bucket = _TokenBucket(60)
+    now = bucket.updated
+    bucket.take(60)
+    # 60 per minute refills one per second
+    assert bucket.wait_time(3, now) == pytest.approx(3.0)
+    assert bucket.wait_time(3, now + 3.0) == 0.0
+
+
+def test_bucket_refill_is_capped_at_capacity():
+    bucket = _TokenBucket(60)
+    now = bucket.updated
+    bucket.wait_time(1, now + 600.0)
+    assert bucket.tokens == 60.0
+
+
+def test_bucket_lets_oversized_requests_through_when_full():
+    bucket = _TokenBucket(10)
+    assert bucket.wait_time(1000, bucket.updated) == 0.0
+
+
+def test_rate_limits_back_off_exponentially(sleeps):
+    scheduler = RequestScheduler(rpm=10000, tpm=10**9, max_concurrency=4)
+    assert scheduler.run(None, failing(APIError(429), APIError(429), APIError(503))) == 'ok'
+    assert sleeps == [1.0, 2.0, 4.0]
+    assert scheduler.stats.retries == 3
+    assert scheduler.stats.rate_limited == 2
+
+
+def test_retry_after_overrides_backoff(sleeps):
+    scheduler = RequestScheduler(rpm=10000, tpm=10**9, max_concurrency=4)
+    scheduler.run(None, failing(APIError(429, retry_after=7)))
+    assert sleeps == [7.0]
+
+
+def test_backoff_is_capped(sleeps):
+    scheduler = RequestScheduler(rpm=10000, tpm=10**9, max_concurrency=4)
+    with pytest.raises(APIError):
+        scheduler.run(None, failing(*[APIError(500)] * (MAX_RETRIES + 1)))
+    assert len(sleeps) == MAX_RETRIES
+    assert max(sleeps) <= openai_scheduler.MAX_BACKOFF_SEC
+    assert scheduler.stats.failures == 1
+
+
+def test_client_errors_are_not_retried(sleeps):
+    scheduler = RequestScheduler(rpm=10000, tpm=10**9, max_concurrency=4)
+    with pytest.raises(APIError):
+        scheduler.run(None, failing(APIError(400)))
+    assert sleeps == []
+
+
+def test_rate_limits_halve_concurrency_and_successes_restore_it(sleeps):
+    scheduler = RequestScheduler(rpm=10000, tpm=10**9, max_concurrency=8)
+    scheduler.run(None, failing(APIError(429)))
+    assert scheduler.concurrency == 4
+    for _ in range(SUCCESSES_PER_INCREASE):
+        scheduler.run(None, failing())
+    assert scheduler.concurrency == 5
+
+
+def test_results_are_reused_by_key():
+    scheduler = RequestScheduler(rpm=10000, tpm=10**9, max_concurrency=4)
+    calls = []
+    request = lambda: calls.append(1) or len(calls)  # noqa: E731
+    assert scheduler.run('chunk-1', request) == 1
+    assert scheduler.run('chunk-1', request) == 1
+    assert scheduler.run(None, request) == 2
+    assert scheduler.stats.cache_hits == 1
+
+
+def test_token_estimates_are_corrected_by_usage():
+    scheduler = RequestScheduler(rpm=10000, tpm=1000, max_concurrency=4)
+    scheduler.run(None, lambda: {'tokens': 300}, estimated_tokens=100, usage=lambda result: result['tokens'])
+    assert scheduler._tokens.tokens == pytest.approx(700, abs=1)
+    assert scheduler.stats.tokens == 300
+
+
+def test_map_attempts_every_request_before_raising(sleeps):
+    scheduler = RequestScheduler(rpm=10000, tpm=10**9, max_concurrency=4)
+    calls = []
+
+    def ok(i):
+        return lambda: calls.append(i) or i
+
+    with pytest.raises(APIError):
+        scheduler.map([(1, ok(1), 0, None), (2, failing(APIError(400)), 0, None), (3, ok(3), 0, None)])
+    assert sorted(calls) == [1, 3]
+    # The successful results are cached, so a retry of the batch only re-sends the failed request
+    assert scheduler.map([(1, ok(1), 0, None), (2, failing(), 0, None), (3, ok(3), 0, None)]) == [1, 'ok', 3]
+    assert sorted(calls) == [1, 3]
+
+
+@pytest.mark.parametrize('rpm, tpm', [(0, 1000), (60, 0), (-1, -1)])
+def test_empty_budgets_are_rejected(rpm, tpm):
+    scheduler = RequestScheduler(rpm=60, tpm=1000, max_concurrency=4)
+    with pytest.raises(ValueError, match="at least 1"):
+        scheduler.configure(rpm, tpm, 4)
+    assert scheduler.describe().startswith("concurrency 4/4, 60 RPM, 1000 TPM")
+
+
+def test_client_follows_the_api_key(monkeypatch):
+    pytest.importorskip('openai')
+    monkeypatch.setenv('OPENAI_API_KEY', 'key-1')
+    first = openai_scheduler.openai_client()
+    assert openai_scheduler.openai_client() is first
+    monkeypatch.setenv('OPENAI_API_KEY', 'key-2')
+    second = openai_scheduler.openai_client()
+    assert second is not first
+    assert second.api_key == 'key-2'
@@ -0,0 +1,69 @@
+import datetime
+
+import pytest
+
+from projection import base_type, format_offset, parse_offset, project
+
+
+class Column:
+    def __init__(self, name):
+        self.name = name
+        self.fileurl = f'{name}.fileurl'
+
+
+class Table:
+    def __getattr__(self, name):
+        return Column(name)
+
+
+SCHEMA = {'id': 'Int', 'photo': 'Optional[Image[(224, 224)]]', 'meta': 'Json', 'vec': 'Array[(3,), Float]',
+          'name': 'Required[String]'}
+
+
+@pytest.mark.parametrize('type_name, expected', [
+    ('Int', 'int'),
+    ('Required[String]', 'string'),
+    ('Optional[Image[(224, 224)]]', 'image'),
+    ('Array[(3,), Float]', 'array'),
+    ('Optional[Timestamp]', 'timestamp'),
+])
+def test_base_type(type_name, expected):
+    assert base_type(type_name) == expected
+
+
+def test_default_projection_returns_media_urls_and_omits_large_columns():
+    selected, omitted = project(Table(), SCHEMA)
+    assert {name: getattr(value, 'name', value) for name, value in selected.items()} == {
+        'id': 'id', 'photo': 'photo.fileurl', 'name': 'name'}
+    assert omitted == ['meta', 'vec']
+
+
+def test_explicit_projection_keeps_large_columns():
+    selected, omitted = project(Table(), SCHEMA, ['meta', 'photo'])
+    assert list(selected) == ['meta', 'photo']
+    assert selected['photo'] == 'photo.fileurl'
+    assert omitted == []
+
+
+@pytest.mark.parametrize('value, type_name', [
+    (1200, 'Int'),
+    (2.5, 'Float'),
+    ("O'Brien", 'String'),
+    ('', 'String'),
+    (datetime.datetime(2026, 10, 19, 8, 30, tzinfo=datetime.timezone.utc), 'Optional[Timestamp]'),
+    (datetime.date(2026, 10, 19), 'Date'),
+])
+def test_printed_offsets_round_trip(value, type_name):
+    assert parse_offset(format_offset(value), type_name) == value
+
+
+def test_offsets_given_as_json_numbers_are_converted():
+    assert parse_offset('1200', 'Int') == 1200
+    assert parse_offset(1200, 'Float') == 1200.0
+
+
+def test_invalid_offsets_are_reported():
+    with pytest.raises(ValueError, match="Invalid offset 'abc' for a int column"):
+        parse_offset('abc', 'Int')
+    with pytest.raises(ValueError, match="for a timestamp column"):
+        parse_offset('yesterday', 'Timestamp')
@@ -0,0 +1,67 @@
+import pytest
+
+import replica
+
+
+class Table:
+    def __init__(self, version=0):
+        self.version = version
+
+    def get_metadata(self):
+        return {'version': self.version}
+
+
+@pytest.fixture
+def publish_job(monkeypatch):
+    """Start publishing with a recorded publish(), returning the periodic job and the published names."""
+    jobs, published = [], []
+    monkeypatch.setattr(replica, 'SNAPSHOT_DIR', '/snapshots')
+    monkeypatch.setattr(replica.publisher, 'start', lambda interval_hours, job: jobs.append(job))
+    monkeypatch.setattr(replica, 'publish', lambda snapshot_dir, table_name, export: published.append(table_name))
+    tables = {'podcasts': (Table(), Table()), 'lectures': (Table(),)}
+    replica.start_publishing(lambda: list(tables), lambda table_name, path: None,
+                             lambda table_name: replica.table_versions(*tables[table_name]))
+    return jobs[0], published, tables
+
+
+def test_table_versions():
+    assert replica.table_versions(Table(3), Table(5)) == (3, 5)
+
+
+def test_every_index_is_published_once_after_a_start(publish_job):
+    job, published, _ = publish_job
+    job()
+    assert sorted(published) == ['lectures', 'podcasts']
+
+
+def test_unchanged_indexes_are_not_published_again(publish_job):
+    job, published, tables = publish_job
+    job()
+    published.clear()
+    job()
+    assert published == []
+    # A change to any table of an index, a view included, publishes that index only
+    tables['podcasts'][1].version += 1
+    job()
+    assert published == ['podcasts']
+
+
+def test_failed_publishes_are_retried(publish_job, monkeypatch):
+    job, published, _ = publish_job
+
+    def failing(snapshot_dir, table_name, export):
+        raise OSError("volume full")
+
+    monkeypatch.setattr(replica, 'publish', failing)
+    job()
+    monkeypatch.setattr(replica, 'publish', lambda snapshot_dir, table_name, export: published.append(table_name))
+    job()
+    assert sorted(published) == ['lectures', 'podcasts']
+
+
+def test_nothing_is_published_without_a_snapshot_dir(monkeypatch):
+    jobs = []
+    monkeypatch.setattr(replica, 'SNAPSHOT_DIR', '')
+    monkeypatch.setattr(replica.publisher, 'start', lambda interval_hours, job: jobs.append(job))
+    replica.start_publishing(lambda: ['podcasts'], lambda table_name, path: None, lambda table_name: 0)
+    assert jobs == []
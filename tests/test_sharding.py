@@ -0,0 +1,166 @@
+import json
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import pytest
+
+from sharding import ShardClient, ShardedIndex, join_results, merge_top, rows_json, shard_name
+
+
+def shard_rows(*sims):
+    return json.dumps([{'text': f'row {sim}', 'sim': sim} for sim in sims])
+
+
+def test_merge_keeps_the_overall_top_rows():
+    results = [(0, shard_rows(0.9, 0.5, 0.1)), (1, shard_rows(0.8, 0.7)), (2, shard_rows())]
+    rows, errors = merge_top(results, 3)
+    assert [(row['sim'], row['shard']) for row in rows] == [(0.9, 0), (0.8, 1), (0.7, 1)]
+    assert errors == []
+
+
+def test_merge_returns_fewer_rows_than_top_n_if_shards_have_fewer():
+    rows, _ = merge_top([(0, shard_rows(0.2)), (1, shard_rows(0.4))], 5)
+    assert [row['sim'] for row in rows] == [0.4, 0.2]
+
+
+def test_merge_reports_failed_shards_and_keeps_the_others():
+    results = [(0, shard_rows(0.3)), (1, "Error querying shard: connection refused")]
+    rows, errors = merge_top(results, 5)
+    assert [row['sim'] for row in rows] == [0.3]
+    assert errors == ["shard 1: Error querying shard: connection refused"]
+
+
+def test_merge_orders_by_the_given_key():
+    results = [(0, json.dumps([{'score': 1}, {'score': 3}])), (1, json.dumps([{'score': 2}]))]
+    rows, _ = merge_top(results, 2, key='score')
+    assert [row['score'] for row in rows] == [3, 2]
+
+
+def test_rows_json_serializes_numpy_scalars_and_timestamps():
+    class Scalar:
+        def item(self):
+            return 0.5
+
+    rows = json.loads(rows_json([{'sim': Scalar(), 'at': datetime(2026, 10, 19)}]))
+    assert rows == [{'sim': 0.5, 'at': '2026-10-19 00:00:00'}]
+
+
+def test_hash_routing_is_stable_and_in_range():
+    index = ShardedIndex('podcasts', 4)
+    keys = [f's3://bucket/episode{i}.mp3' for i in range(100)]
+    shards = [index.route(key) for key in keys]
+    assert shards == [ShardedIndex('podcasts', 4).route(key) for key in keys]
+    assert set(shards) == {0, 1, 2, 3}
+
+
+def test_layout_round_trips_through_the_config():
+    index = ShardedIndex('podcasts', 2, ['http://a/sse', 'http://b/sse'])
+    assert ShardedIndex.from_config('podcasts', index.config()) == index
+
+
+def test_local_shards_are_called_with_their_own_table_names():
+    calls = []
+
+    def query(table_name, query_text):
+        calls.append(table_name)
+        return f"{table_name}: {query_text}"
+
+    client = ShardClient({'query': query})
+    index = ShardedIndex('podcasts', 3)
+    assert client.scatter(index, 'query', query_text='q') == [
+        (0, 'podcasts_shard0: q'), (1, 'podcasts_shard1: q'), (2, 'podcasts_shard2: q')]
+    assert client.call(index, 1, 'query', query_text='r') == 'podcasts_shard1: r'
+    assert calls == [shard_name('podcasts', i) for i in (0, 1, 2, 1)]
+
+
+def test_gather_passes_each_shard_its_own_arguments():
+    client = ShardClient({'insert': lambda table_name, locations: f"{table_name} {len(locations)}"})
+    index = ShardedIndex('podcasts', 3)
+    results = client.gather(index, 'insert', {2: {'locations': ['a']}, 0: {'locations': ['b', 'c']}})
+    assert results == [(0, 'podcasts_shard0 2'), (2, 'podcasts_shard2 1')]
+
+
+def test_shard_exceptions_become_error_results():
+    def broken(table_name):
+        raise RuntimeError("store is locked")
+
+    client = ShardClient({'list': broken})
+    results = client.scatter(ShardedIndex('podcasts', 2), 'list')
+    assert results == [(0, "Error calling list on shard 0: store is locked"),
+                       (1, "Error calling list on shard 1: store is locked")]
+    assert join_results(results) == ("  shard 0: Error calling list on shard 0: store is locked\n"
+                                     "  shard 1: Error calling list on shard 1: store is locked")
+
+
+SHARD_SERVER = '''
+import os, sys, time
+import uvicorn
+from mcp.server.fastmcp import FastMCP
+
+mcp = FastMCP('shard')
+
+@mcp.tool()
+def query_audio(table_name: str, query_text: str) -> str:
+    time.sleep(1.0)
+    return f"{table_name} {os.getpid()}: {query_text}"
+
+uvicorn.run(mcp.sse_app(), host='127.0.0.1', port=int(sys.argv[1]), log_level='error')
+'''
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(process, port, timeout=20.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and process.poll() is None:
+        with socket.socket() as sock:
+            if sock.connect_ex(('127.0.0.1', port)) == 0:
+                return
+        time.sleep(0.1)
+    raise TimeoutError(f"shard server on port {port} did not start")
+
+
+@pytest.fixture
+def shard_servers():
+    """Three shard servers, each a process of its own serving MCP over SSE."""
+    pytest.importorskip('mcp')
+    pytest.importorskip('uvicorn')
+    ports = [free_port() for _ in range(3)]
+    processes = [subprocess.Popen([sys.executable, '-c', SHARD_SERVER, str(port)]) for port in ports]
+    try:
+        for process, port in zip(processes, ports):
+            wait_for_port(process, port)
+        yield [f'http://127.0.0.1:{port}/sse' for port in ports]
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+
+def test_remote_shards_are_called_in_parallel(shard_servers):
+    index = ShardedIndex('podcasts', 3, shard_servers)
+    start = time.monotonic()
+    results = ShardClient({}).scatter(index, 'query_audio', query_text='q')
+    elapsed = time.monotonic() - start
+
+    assert [shard for shard, _ in results] == [0, 1, 2]
+    names = [result.split()[0] for _, result in results]
+    pids = {result.split()[1] for _, result in results}
+    assert names == [shard_name('podcasts', shard) for shard in range(3)]
+    assert len(pids) == 3
+    # Each shard takes a second; called one after another they would take three
+    assert elapsed < 2.5
+
+
+def test_unreachable_remote_shards_become_error_results(shard_servers):
+    index = ShardedIndex('podcasts', 2, [shard_servers[0], f'http://127.0.0.1:{free_port()}/sse'])
+    results = ShardClient({}).scatter(index, 'query_audio', query_text='q')
+    assert results[0][1].startswith('podcasts_shard0 ')
+    assert results[1][1].startswith("Error calling query_audio on shard 1:")
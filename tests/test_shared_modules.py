@@ -0,0 +1,49 @@
+"""Modules shared by several servers are copied into each server directory, since every server is built
+as its own Docker image from its own directory. The copies must stay identical: edit one and copy it
+over the others.
+"""
+import itertools
+
+import pytest
+
+from conftest import SERVERS_DIR
+
+SHARED_MODULES = {
+    'bench_startup.py': ('audio-index', 'doc-index', 'image-index', 'video-index'),
+    'bench_transcription.py': ('audio-index', 'video-index'),
+    'e5_model.py': ('audio-index', 'doc-index', 'image-index', 'video-index'),
+    'index_maintenance.py': ('audio-index', 'doc-index', 'image-index', 'video-index'),
+    'lazy_imports.py': ('audio-index', 'doc-index', 'image-index', 'video-index'),
+    'mock_openai.py': ('image-index', 'video-index'),
+    'openai_scheduler.py': ('audio-index', 'image-index', 'video-index'),
+    'query_profile.py': ('audio-index', 'base-sdk', 'doc-index', 'image-index', 'video-index'),
+    'replica.py': ('audio-index', 'doc-index', 'image-index', 'video-index'),
+    'sharding.py': ('audio-index', 'doc-index'),
+    'snapshot.py': ('audio-index', 'doc-index', 'image-index', 'video-index'),
+    'speech_splitter.py': ('audio-index', 'video-index'),
+    'transcription.py': ('audio-index', 'video-index'),
+    'transcription_backends.py': ('audio-index', 'video-index'),
+}
+
+# Present in every server, with different contents
+PER_SERVER_MODULES = {'server.py', 'tools.py', 'test.py'}
+
+
+@pytest.mark.parametrize('module', sorted(SHARED_MODULES))
+def test_copies_are_identical(module):
+    servers = SHARED_MODULES[module]
+    contents = {server: (SERVERS_DIR / server / module).read_text() for server in servers}
+    for first, second in itertools.combinations(servers, 2):
+        assert contents[first] == contents[second], f"{first}/{module} and {second}/{module} differ"
+
+
+def test_every_copied_module_is_listed():
+    servers = {}
+    for path in SERVERS_DIR.glob('*/*.py'):
+        servers.setdefault(path.name, set()).add(path.parent.name)
+    for module, found in servers.items():
+        if module in PER_SERVER_MODULES:
+            continue
+        if len(found) > 1 or module in SHARED_MODULES:
+            assert found == set(SHARED_MODULES.get(module, ())), \
+                f"{module} is in {sorted(found)}; list it in SHARED_MODULES with those servers"
@@ -0,0 +1,53 @@
+import pytest
+
+pytest.importorskip('pixeltable')
+
+import e5_model  # noqa: E402
+import numpy as np  # noqa: E402
+import snapshot  # noqa: E402
+
+
+def fake_embed(texts):
+    return [np.full(4, len(text), dtype=np.float32) for text in texts]
+
+
+@pytest.fixture(autouse=True)
+def no_loaded_vectors(monkeypatch):
+    monkeypatch.setattr(snapshot, '_vectors', {})
+    monkeypatch.setattr(snapshot, '_exported', {})
+
+
+def export(tmp_path, name, texts, index='dir.podcasts'):
+    path = tmp_path / name
+    path.mkdir()
+    snapshot._write_vectors(str(path / '_chunks.text.arrow'), texts, fake_embed)
+    snapshot.write_manifest(str(path), 'test', index, {}, [])
+    return str(path)
+
+
+def test_exported_vectors_are_reused(tmp_path, monkeypatch):
+    export(tmp_path, 'first', ['one', 'three'])
+    monkeypatch.setattr(e5_model, 'model', lambda: pytest.fail("the model should not run"))
+    assert [vector[0] for vector in snapshot.embed_texts(['three', 'one'])] == [5.0, 3.0]
+
+
+def test_a_new_export_releases_the_vectors_of_the_previous_one(tmp_path):
+    first = export(tmp_path, 'first', ['one', 'two'])
+    other = export(tmp_path, 'other', ['four'], index='dir.lectures')
+    second = export(tmp_path, 'second', ['two', 'three'])
+    assert set(snapshot._vectors) == {other, second}
+    assert first not in snapshot._vectors
+
+
+def test_released_generations_are_forgotten(tmp_path):
+    path = export(tmp_path, 'first', ['one'])
+    snapshot.load_vectors(f'{path}/_chunks.text.arrow')
+    snapshot.release_vectors(path)
+    assert snapshot._vectors == {}
+
+
+def test_queries_embedded_ahead_of_a_search_are_reused(monkeypatch):
+    vector = np.ones(4, dtype=np.float32)
+    e5_model.recent_queries.put_many({e5_model.content_hash('what was said'): vector})
+    monkeypatch.setattr(e5_model, 'model', lambda: pytest.fail("the model should not run"))
+    assert snapshot.embed_texts(['what was said'])[0] is vector
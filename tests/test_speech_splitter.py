@@ -0,0 +1,64 @@
+import pytest
+
+pytest.importorskip('pixeltable')
+
+from speech_splitter import drop_overlap, pack_speech_regions  # noqa: E402
+
+
+def pack(regions, max_chunk=30.0, max_gap=1.0, min_chunk=0.0, padding=0.0, duration=None):
+    return pack_speech_regions(regions, max_chunk, max_gap, min_chunk, padding, duration)
+
+
+def test_short_pauses_are_merged():
+    assert pack([(0.0, 5.0), (5.5, 10.0)]) == [(0.0, 10.0)]
+
+
+def test_long_pauses_start_a_new_chunk():
+    assert pack([(0.0, 5.0), (10.0, 15.0)]) == [(0.0, 5.0), (10.0, 15.0)]
+
+
+def test_merging_stops_at_the_maximum_chunk_length():
+    assert pack([(0.0, 20.0), (20.5, 40.0)]) == [(0.0, 20.0), (20.5, 40.0)]
+
+
+def test_long_regions_are_cut_into_windows():
+    assert pack([(0.0, 70.0)]) == [(0.0, 30.0), (30.0, 60.0), (60.0, 70.0)]
+
+
+def test_padding_is_clamped_to_the_file():
+    chunks = pack([(0.1, 5.0), (8.0, 9.9)], padding=0.2, duration=10.0)
+    assert chunks == [(0.0, pytest.approx(5.2)), (pytest.approx(7.8), 10.0)]
+
+
+def test_short_chunks_are_dropped():
+    assert pack([(0.0, 0.3), (10.0, 15.0)], min_chunk=1.0) == [(10.0, 15.0)]
+
+
+def test_no_speech_gives_no_chunks():
+    assert pack([]) == []
+
+
+def test_first_chunk_is_kept_whole():
+    assert drop_overlap({'text': ' Hello there. '}, 0.0, 30.0, 2.0) == 'Hello there.'
+
+
+def test_segments_in_the_overlap_are_dropped():
+    transcription = {
+        'text': ' repeated new words',
+        'segments': [
+            {'start': 0.0, 'end': 1.0, 'text': ' repeated'},
+            {'start': 1.5, 'end': 3.0, 'text': ' new'},
+            {'start': 3.0, 'end': 4.0, 'text': ' words'},
+        ],
+    }
+    assert drop_overlap(transcription, 28.0, 58.0, 2.0) == 'new words'
+
+
+def test_without_segments_leading_sentences_within_the_overlap_are_dropped():
+    rest = ' '.join(['word'] * 28) + '.'
+    # 30 words over 10 seconds: the 2-second overlap holds about 6 words, so only "Hi there." goes
+    assert drop_overlap({'text': f'Hi there. {rest}'}, 8.0, 18.0, 2.0) == rest
+
+
+def test_without_segments_the_last_sentence_is_always_kept():
+    assert drop_overlap({'text': 'Only one sentence.'}, 8.0, 10.0, 2.0) == 'Only one sentence.'
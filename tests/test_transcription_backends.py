@@ -0,0 +1,26 @@
+import subprocess
+import sys
+
+import pytest
+
+import transcription_backends
+from conftest import SERVERS_DIR
+from transcription_backends import transcribe_file, transcribe_files
+
+
+@pytest.mark.parametrize('server', ['audio-index', 'video-index'])
+def test_benchmark_runs_without_pixeltable(server):
+    # A None entry in sys.modules makes importing pixeltable fail, whether or not it is installed
+    code = "import sys; sys.modules['pixeltable'] = None; import bench_transcription"
+    subprocess.run([sys.executable, '-c', code], cwd=SERVERS_DIR / server, check=True)
+
+
+def test_stub_requests_run_concurrently(monkeypatch):
+    monkeypatch.setattr(transcription_backends, 'STUB_LATENCY_SEC', 0.0)
+    results = transcribe_files(['a.wav', 'b.wav', 'c.wav'], 'stub', 'stub')
+    assert results == [{'text': '', 'segments': [], 'language': None}] * 3
+
+
+def test_unknown_backends_are_rejected():
+    with pytest.raises(ValueError, match="Unknown transcription backend 'whisperx'"):
+        transcribe_file('a.wav', 'whisperx', 'base.en')